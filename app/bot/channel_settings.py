@@ -0,0 +1,142 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from psycopg import sql
+
+from app.core.cache import TTLCache
+from app.core.invalidation import get_invalidation_bus
+from app.core.settings import get_settings
+from app.db import queries
+from app.db.pool import get_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = (
+    "header_enabled",
+    "header_text",
+    "footer_enabled",
+    "footer_text",
+    "parse_mode",
+)
+
+
+class ChannelSettings:
+    """One ``channel_settings`` row (header/footer config of a user's channel)."""
+
+    __slots__ = ("user_id", "channel_id") + COLUMNS
+
+    def __init__(
+        self,
+        user_id: int,
+        channel_id: int,
+        header_enabled: bool = False,
+        header_text: Optional[str] = None,
+        footer_enabled: bool = False,
+        footer_text: Optional[str] = None,
+        parse_mode: str = "markdown",
+    ) -> None:
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.header_enabled = header_enabled
+        self.header_text = header_text
+        self.footer_enabled = footer_enabled
+        self.footer_text = footer_text
+        self.parse_mode = parse_mode
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in COLUMNS}
+
+
+# علامة لصف غير موجود حتى لا نكرر الاستعلام عنه
+_NO_ROW = object()
+
+_settings = get_settings()
+_cache: TTLCache[Tuple[int, int], Any] = TTLCache(maxsize=_settings.cache_maxsize, ttl=_settings.cache_ttl)
+
+NAMESPACE = "channel_settings"
+
+
+def _on_invalidate(key: Optional[str]) -> None:
+    if key is None:
+        _cache.clear()
+        return
+    user_id, channel_id = key.split(":")
+    _cache.pop((int(user_id), int(channel_id)))
+
+
+get_invalidation_bus().subscribe(NAMESPACE, _on_invalidate)
+
+
+class ChannelSettingsStore:
+    """Read-through, write-through access to ``channel_settings``.
+
+    The whole row is loaded once per (user_id, channel_id) and kept in process
+    memory, so repeated reads (menus, post decoration) never touch the pool.
+    Writes go to the database first and the returned row replaces the cached
+    one; other processes drop their copy through the invalidation bus.
+    """
+
+    @staticmethod
+    def cached(user_id: int, channel_id: int) -> Optional[ChannelSettings]:
+        """Return the cached row without any I/O (None when absent or not loaded)."""
+        row = _cache.get((user_id, channel_id))
+        return None if row is _NO_ROW else row
+
+    @staticmethod
+    async def get(user_id: int, channel_id: int) -> Optional[ChannelSettings]:
+        key = (user_id, channel_id)
+        row = _cache.get(key)
+        if row is not None:
+            return None if row is _NO_ROW else row
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await queries.execute(cur, queries.CHANNEL_SETTINGS, (user_id, channel_id))
+                result = await cur.fetchone()
+        row = ChannelSettings(user_id, channel_id, *result) if result else None
+        _cache.set(key, _NO_ROW if row is None else row)
+        return row
+
+    @staticmethod
+    async def update(user_id: int, channel_id: int, **fields: Any) -> ChannelSettings:
+        """Upsert the given columns and cache the resulting row."""
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown channel_settings columns: {sorted(unknown)}")
+        names = list(fields)
+        query = sql.SQL(
+            """
+            INSERT INTO channel_settings (user_id, channel_id, {columns})
+            VALUES (%s, %s, {values})
+            ON CONFLICT (user_id, channel_id) DO UPDATE SET
+                {assignments},
+                updated_at = NOW()
+            RETURNING header_enabled, header_text, footer_enabled, footer_text, parse_mode
+            """
+        ).format(
+            columns=sql.SQL(", ").join(map(sql.Identifier, names)),
+            values=sql.SQL(", ").join(sql.Placeholder() * len(names)),
+            assignments=sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name)) for name in names
+            ),
+        )
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            async with conn.cursor() as cur:
+                # نص العبارة ثابت لكل مجموعة أعمدة، فتُحضّر مرة لكل مجموعة
+                await queries.execute(cur, query, (user_id, channel_id, *fields.values()))
+                result = await cur.fetchone()
+                await conn.commit()
+        row = ChannelSettings(user_id, channel_id, *result)
+        await get_invalidation_bus().publish(NAMESPACE, f"{user_id}:{channel_id}")
+        _cache.set((user_id, channel_id), row)
+        return row
+
+    @staticmethod
+    async def invalidate(user_id: int, channel_id: int) -> None:
+        await get_invalidation_bus().publish(NAMESPACE, f"{user_id}:{channel_id}")
+
+
+__all__ = ["ChannelSettings", "ChannelSettingsStore"]
@@ -4,34 +4,32 @@
 """
 
 import re
+import asyncio
 import logging
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from pyrogram import Client, filters
 from pyrogram.types import (
     Message, 
     InlineKeyboardButton, 
     InlineKeyboardMarkup,
-    CallbackQuery,
-    Chat
-)
-from pyrogram.enums import ParseMode, ChatType, ChatMemberStatus
-from pyrogram.errors import (
-    UserNotParticipant,
-    ChatAdminRequired,
-    PeerIdInvalid,
-    UsernameNotOccupied,
-    ChannelPrivate,
-    UsernameInvalid,
-    ChannelInvalid,
-    ChatInvalid
+    CallbackQuery
 )
+from pyrogram.enums import ParseMode, ChatType
 
+from app.core.cache import create_cache
+from app.core.settings import get_settings
+from app.db import queries
 from app.db.pool import get_pool
-from app.bot.header import HeaderManager
-from app.bot.footer import FooterManager
+from app.bot.channel_settings import ChannelSettingsStore
+from app.bot.resolver import ResolvedChat, chat_resolver
+from app.bot.router import callback_router
+from app.bot.sender import SendScheduler, get_sender
 
 logger = logging.getLogger(__name__)
 
+# كاش قوائم وأعداد القنوات لكل مستخدم (يُبطل عند الإضافة والحذف)
+_channel_cache = create_cache("channels")
+
 
 class ChannelManager:
     """مدير القنوات للمستخدمين"""
@@ -93,68 +91,27 @@ class ChannelManager:
         return channels
     
     @staticmethod
-    async def check_bot_admin(client: Client, channel_id: Union[int, str]) -> tuple[bool, Optional[Chat]]:
-        """التحقق من أن البوت مشرف في القناة"""
+    async def check_bot_admin(client: Client, channel_id: Union[int, str]) -> tuple[bool, Optional[ResolvedChat]]:
+        """التحقق من أن البوت مشرف في القناة (من الكاش إن أمكن)"""
         try:
-            # تنظيف معرف القناة إذا كان username
-            if isinstance(channel_id, str):
-                # إذا كان يبدأ بـ @ فهو معرف مستخدم صحيح
-                if channel_id.startswith('@'):
-                    pass  # لا نحتاج لتغيير شيء
-                # إذا كان رقمي فهو ID
-                elif channel_id.lstrip('-').isdigit():
-                    pass  # لا نحتاج لتغيير شيء
-                # إذا لم يبدأ بـ @ وليس رقمي، فأضف @
-                else:
-                    channel_id = f"@{channel_id}"
-            
-            logger.info(f"محاولة الوصول للقناة: {channel_id}")
-            chat = await client.get_chat(channel_id)
-            logger.info(f"تم العثور على: {chat.title} (ID: {chat.id}, Type: {chat.type})")
+            chat = await chat_resolver.resolve(client, channel_id)
+            if chat is None:
+                return False, None
             
             # التحقق من أن هذه قناة وليست مجموعة عادية
             if chat.type not in [ChatType.CHANNEL, ChatType.SUPERGROUP]:
                 logger.warning(f"النوع غير صحيح: {chat.type}")
                 return False, None
-                
-            # التحقق من صلاحيات البوت
-            logger.info(f"التحقق من صلاحيات البوت في {chat.id}")
-            bot_member = await client.get_chat_member(chat.id, "me")
-            logger.info(f"حالة البوت: {bot_member.status}")
             
             # التحقق من أن البوت مشرف
-            if bot_member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]:
+            if chat.is_admin:
                 logger.info(f"✅ البوت مشرف في {chat.title}")
                 return True, chat
             else:
-                logger.warning(f"❌ البوت ليس مشرفاً في {chat.title} (Status: {bot_member.status})")
+                logger.warning(f"❌ البوت ليس مشرفاً في {chat.title} (Status: {chat.bot_status})")
             
             return False, chat
             
-        except UserNotParticipant as e:
-            logger.error(f"البوت ليس عضواً في القناة {channel_id}: {e}")
-            return False, None
-        except ChatAdminRequired as e:
-            logger.error(f"البوت يحتاج صلاحيات مشرف في {channel_id}: {e}")
-            return False, None
-        except PeerIdInvalid as e:
-            logger.error(f"معرف القناة غير صالح {channel_id}: {e}")
-            return False, None
-        except UsernameNotOccupied as e:
-            logger.error(f"اسم المستخدم غير موجود {channel_id}: {e}")
-            return False, None
-        except ChannelPrivate as e:
-            logger.error(f"القناة خاصة {channel_id}: {e}")
-            return False, None
-        except UsernameInvalid as e:
-            logger.error(f"اسم المستخدم غير صالح {channel_id}: {e}")
-            return False, None
-        except ChannelInvalid as e:
-            logger.error(f"القناة غير صالحة {channel_id}: {e}")
-            return False, None
-        except ChatInvalid as e:
-            logger.error(f"المحادثة غير صالحة {channel_id}: {e}")
-            return False, None
         except Exception as e:
             error_type = type(e).__name__
             logger.error(f"خطأ غير متوقع في التحقق من القناة {channel_id}: {error_type}: {e}")
@@ -176,24 +133,49 @@ class ChannelManager:
             pool = await get_pool()
             async with pool.connection() as conn:
                 async with conn.cursor() as cur:
-                    await cur.execute(
-                        """
-                        INSERT INTO channels (user_id, channel_id, channel_username, channel_title, is_admin)
-                        VALUES (%s, %s, %s, %s, TRUE)
-                        ON CONFLICT (user_id, channel_id) DO UPDATE SET
-                            channel_username = EXCLUDED.channel_username,
-                            channel_title = EXCLUDED.channel_title,
-                            is_admin = TRUE,
-                            updated_at = NOW()
-                        """,
+                    await queries.execute(
+                        cur,
+                        queries.UPSERT_CHANNEL,
                         (user_id, channel_id, channel_username, channel_title)
                     )
                     await conn.commit()
+            await ChannelManager.invalidate_user(user_id)
             return True
         except Exception as e:
             logger.error(f"خطأ في إضافة القناة: {e}")
             return False
     
+    @staticmethod
+    async def add_channels(user_id: int, chats: List[ResolvedChat]) -> bool:
+        """إضافة عدة قنوات مع إعداداتها الافتراضية بعبارة واحدة في معاملة واحدة"""
+        # إزالة التكرار: ON CONFLICT لا يقبل تعديل نفس الصف مرتين في عبارة واحدة
+        chats = list({chat.id: chat for chat in chats}.values())
+        if not chats:
+            return True
+        try:
+            pool = await get_pool()
+            async with pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    # الدفعة كلها (50 قناة كحد أقصى) تُمرر كمصفوفات في رحلة واحدة لقاعدة البيانات
+                    await queries.execute(
+                        cur,
+                        queries.UPSERT_CHANNELS_FROM_ARRAYS,
+                        {
+                            "user_id": user_id,
+                            "ids": [chat.id for chat in chats],
+                            "usernames": [chat.username for chat in chats],
+                            "titles": [chat.title for chat in chats],
+                        }
+                    )
+                    await conn.commit()
+            for chat in chats:
+                await ChannelSettingsStore.invalidate(user_id, chat.id)
+            await ChannelManager.invalidate_user(user_id)
+            return True
+        except Exception as e:
+            logger.error(f"خطأ في إضافة القنوات: {e}")
+            return False
+    
     @staticmethod
     async def remove_channel(user_id: int, channel_id: int) -> bool:
         """حذف قناة من قائمة المستخدم"""
@@ -201,35 +183,36 @@ class ChannelManager:
             pool = await get_pool()
             async with pool.connection() as conn:
                 async with conn.cursor() as cur:
-                    await cur.execute(
-                        "DELETE FROM channels WHERE user_id = %s AND channel_id = %s",
-                        (user_id, channel_id)
-                    )
+                    await queries.execute(cur, queries.DELETE_CHANNEL, (user_id, channel_id))
                     await conn.commit()
-                    return cur.rowcount > 0
+                    removed = cur.rowcount > 0
+            await ChannelManager.invalidate_user(user_id)
+            return removed
         except Exception as e:
             logger.error(f"خطأ في حذف القناة: {e}")
             return False
     
+    @staticmethod
+    async def invalidate_user(user_id: int) -> None:
+        """إبطال الكاش الخاص بقنوات المستخدم"""
+        await _channel_cache.delete(f"list:{user_id}", f"count:{user_id}")
+    
     @staticmethod
     async def get_user_channels(user_id: int) -> List[dict]:
         """الحصول على قنوات المستخدم"""
+        cached = await _channel_cache.get(f"list:{user_id}")
+        if cached is not None:
+            return cached
         try:
             pool = await get_pool()
             async with pool.connection() as conn:
                 async with conn.cursor() as cur:
-                    await cur.execute(
-                        """
-                        SELECT channel_id, channel_username, channel_title, is_admin, created_at
-                        FROM channels
-                        WHERE user_id = %s
-                        ORDER BY created_at DESC
-                        """,
-                        (user_id,)
-                    )
+                    await queries.execute(cur, queries.USER_CHANNELS, (user_id,))
                     rows = await cur.fetchall()
                     columns = [desc[0] for desc in cur.description]
-                    return [dict(zip(columns, row)) for row in rows]
+                    channels = [dict(zip(columns, row)) for row in rows]
+            await _channel_cache.set(f"list:{user_id}", channels)
+            return channels
         except Exception as e:
             logger.error(f"خطأ في جلب القنوات: {e}")
             return []
@@ -237,37 +220,38 @@ class ChannelManager:
     @staticmethod
     async def get_channel_count(user_id: int) -> int:
         """الحصول على عدد قنوات المستخدم"""
+        cached = await _channel_cache.get(f"count:{user_id}")
+        if cached is not None:
+            return cached
+        channels = await _channel_cache.get(f"list:{user_id}")
+        if channels is not None:
+            return len(channels)
         try:
             pool = await get_pool()
             async with pool.connection() as conn:
                 async with conn.cursor() as cur:
-                    await cur.execute(
-                        "SELECT COUNT(*) FROM channels WHERE user_id = %s",
-                        (user_id,)
-                    )
+                    # العدد محفوظ في صف المستخدم وتحدّثه مشغلات جدول channels
+                    await queries.execute(cur, queries.USER_CHANNEL_COUNT, (user_id,))
                     result = await cur.fetchone()
-                    return result[0] if result else 0
+                    count = result[0] if result else 0
+            await _channel_cache.set(f"count:{user_id}", count)
+            return count
         except Exception as e:
             logger.error(f"خطأ في حساب القنوات: {e}")
             return 0
 
 
 # معالجات الأوامر والأزرار
-async def channels_menu(client: Client, message: Message) -> None:
-    """عرض قائمة إدارة القنوات"""
-    user_id = message.from_user.id
-    count = await ChannelManager.get_channel_count(user_id)
-    
+def channels_menu_markup(count: int) -> tuple[str, InlineKeyboardMarkup]:
+    """نص ولوحة مفاتيح قائمة إدارة القنوات"""
     keyboard = [
         [
-            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add")
-        ],
-        [
-            InlineKeyboardButton("📋 عرض قنواتي", callback_data="channels_list"),
-            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete")
+            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add"),
+            InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list")
         ],
         [
-            InlineKeyboardButton("📊 إحصائيات القنوات", callback_data="channel_stats")
+            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete"),
+            InlineKeyboardButton("📊 الإحصائيات", callback_data="channel_stats")
         ],
         [InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="main_menu")]
     ]
@@ -294,22 +278,65 @@ async def channels_menu(client: Client, message: Message) -> None:
 
 ⬇️ **اختر من القائمة:**
 """
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+def delete_menu_markup(channels: List[dict]) -> InlineKeyboardMarkup:
+    """لوحة مفاتيح اختيار القناة المراد حذفها"""
+    keyboard = []
+    for channel in channels:
+        title = channel['channel_title'] or f"ID: {channel['channel_id']}"
+        keyboard.append([
+            InlineKeyboardButton(
+                f"🗑 {title}",
+                callback_data=f"delete_channel_{channel['channel_id']}"
+            )
+        ])
     
-    await message.reply_text(
+    keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+DELETE_MENU_TEXT = """╭━━━━━━━━━━━━━━━━━━━━━╮
+    🗑 **حذف القنوات**
+╰━━━━━━━━━━━━━━━━━━━━━╯
+
+⚠️ **اختر القناة التي تريد حذفها:**
+"""
+
+
+async def channels_menu(client: Client, message: Message) -> None:
+    """عرض قائمة إدارة القنوات"""
+    user_id = message.from_user.id
+    count = await ChannelManager.get_channel_count(user_id)
+    text, markup = channels_menu_markup(count)
+    
+    await get_sender().send_message(
+        message.chat.id,
         text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=markup,
         parse_mode=ParseMode.MARKDOWN
     )
 
 
-async def handle_channels_callback(client: Client, callback_query: CallbackQuery) -> None:
-    """معالج أزرار القنوات"""
-    data = callback_query.data
-    user_id = callback_query.from_user.id
-    
-    if data == "channels_add":
-        await callback_query.message.edit_text(
-            """
+@callback_router.exact("channels_menu", ack_early=True)
+async def channels_menu_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """إظهار قائمة القنوات مكان الرسالة الحالية"""
+    count = await ChannelManager.get_channel_count(callback_query.from_user.id)
+    text, markup = channels_menu_markup(count)
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=markup,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.exact("channels_add", ack_early=True)
+async def channels_add_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض تعليمات إضافة القنوات وتعيين حالة الانتظار"""
+    await callback_query.message.edit_text(
+        """
 ╭━━━━━━━━━━━━━━━━━━━━━╮
     ➕ **إضافة قنوات جديدة**
 ╰━━━━━━━━━━━━━━━━━━━━━╯
@@ -330,88 +357,98 @@ async def handle_channels_callback(client: Client, callback_query: CallbackQuery
 ━━━━━━━━━━━━━━━━━━━━━
 ❌ للإلغاء أرسل: /cancel
 """,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        # تعيين حالة المستخدم لانتظار القنوات
-        await client.set_user_state(user_id, "waiting_channels")
-        
-    elif data == "channels_list":
-        channels = await ChannelManager.get_user_channels(user_id)
-        
-        if not channels:
-            await callback_query.answer("لا توجد قنوات مضافة بعد!", show_alert=True)
-            return
-        
-        text = """╭━━━━━━━━━━━━━━━━━━━━━╮
+        parse_mode=ParseMode.MARKDOWN
+    )
+    # تعيين حالة المستخدم لانتظار القنوات
+    await client.set_user_state(callback_query.from_user.id, "waiting_channels")
+    await callback_query.answer()
+
+
+@callback_router.exact("channels_list")
+async def channels_list_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض قنوات المستخدم"""
+    channels = await ChannelManager.get_user_channels(callback_query.from_user.id)
+    
+    if not channels:
+        await callback_query.answer("لا توجد قنوات مضافة بعد!", show_alert=True)
+        return
+    
+    text = """╭━━━━━━━━━━━━━━━━━━━━━╮
     📋 **قنواتك المضافة**
 ╰━━━━━━━━━━━━━━━━━━━━━╯\n\n"""
+    
+    for i, channel in enumerate(channels, 1):
+        title = channel['channel_title'] or "بدون اسم"
+        username = channel['channel_username'] or ""
+        channel_id = channel['channel_id']
         
-        for i, channel in enumerate(channels, 1):
-            title = channel['channel_title'] or "بدون اسم"
-            username = channel['channel_username'] or ""
-            channel_id = channel['channel_id']
-            
-            text += f"**{i}.** {title}\n"
-            if username:
-                text += f"   └ @{username}\n"
-            text += f"   └ ID: `{channel_id}`\n"
-            text += "━━━━━━━━━━━━━━━━━━━━━\n"
-        
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
-        
+        text += f"**{i}.** {title}\n"
+        if username:
+            text += f"   └ @{username}\n"
+        text += f"   └ ID: `{channel_id}`\n"
+        text += "━━━━━━━━━━━━━━━━━━━━━\n"
+    
+    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
+    
+    await callback_query.message.edit_text(
+        text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.exact("channels_delete")
+async def channels_delete_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض قائمة الحذف"""
+    channels = await ChannelManager.get_user_channels(callback_query.from_user.id)
+    
+    if not channels:
+        await callback_query.answer("لا توجد قنوات لحذفها!", show_alert=True)
+        return
+    
+    await callback_query.message.edit_text(
+        DELETE_MENU_TEXT,
+        reply_markup=delete_menu_markup(channels),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.prefix("delete_channel_")
+async def delete_channel_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """حذف قناة ثم تحديث قائمة الحذف"""
+    user_id = callback_query.from_user.id
+    channel_id = int(callback_query.data.replace("delete_channel_", ""))
+    
+    if await ChannelManager.remove_channel(user_id, channel_id):
+        await callback_query.answer("✅ تم حذف القناة بنجاح!", show_alert=True)
+    else:
+        await callback_query.answer("❌ فشل حذف القناة!", show_alert=True)
+    
+    # إعادة فتح قائمة الحذف لتحديثها
+    channels = await ChannelManager.get_user_channels(user_id)
+    if not channels:
+        # العودة للقائمة إذا لم يتبق قنوات
         await callback_query.message.edit_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode=ParseMode.MARKDOWN
+            "لا توجد قنوات متبقية.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]])
         )
-        
-    elif data == "channels_delete":
-        channels = await ChannelManager.get_user_channels(user_id)
-        
-        if not channels:
-            await callback_query.answer("لا توجد قنوات لحذفها!", show_alert=True)
-            return
-        
-        keyboard = []
-        for channel in channels:
-            title = channel['channel_title'] or f"ID: {channel['channel_id']}"
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"🗑 {title}",
-                    callback_data=f"delete_channel_{channel['channel_id']}"
-                )
-            ])
-        
-        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")])
-        
+    else:
         await callback_query.message.edit_text(
-            """╭━━━━━━━━━━━━━━━━━━━━━╮
-    🗑 **حذف القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
-
-⚠️ **اختر القناة التي تريد حذفها:**
-""",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            DELETE_MENU_TEXT,
+            reply_markup=delete_menu_markup(channels),
             parse_mode=ParseMode.MARKDOWN
         )
-        
-    elif data.startswith("delete_channel_"):
-        channel_id = int(data.replace("delete_channel_", ""))
-        
-        if await ChannelManager.remove_channel(user_id, channel_id):
-            await callback_query.answer("✅ تم حذف القناة بنجاح!", show_alert=True)
-        else:
-            await callback_query.answer("❌ فشل حذف القناة!", show_alert=True)
-        
-        # العودة لقائمة الحذف
-        await handle_channels_callback(client, callback_query)
-        
-    elif data == "channel_stats":
-        # عرض إحصائيات القنوات
-        channels = await ChannelManager.get_user_channels(user_id)
-        count = len(channels)
-        
-        stats_text = f"""╭━━━━━━━━━━━━━━━━━━━━━╮
+
+
+@callback_router.exact("channel_stats", ack_early=True)
+async def channel_stats_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض إحصائيات القنوات"""
+    channels = await ChannelManager.get_user_channels(callback_query.from_user.id)
+    count = len(channels)
+    
+    stats_text = f"""╭━━━━━━━━━━━━━━━━━━━━━╮
     📊 **إحصائيات القنوات**
 ╰━━━━━━━━━━━━━━━━━━━━━╯
 
@@ -423,31 +460,38 @@ async def handle_channels_callback(client: Client, callback_query: CallbackQuery
 
 ━━━━━━━━━━━━━━━━━━━━━
 """
+    
+    if channels:
+        stats_text += "\n📋 **تفاصيل القنوات:**\n\n"
+        for i, channel in enumerate(channels[:5], 1):
+            title = channel['channel_title'] or "بدون اسم"
+            stats_text += f"{i}. {title}\n"
         
-        if channels:
-            stats_text += "\n📋 **تفاصيل القنوات:**\n\n"
-            for i, channel in enumerate(channels[:5], 1):
-                title = channel['channel_title'] or "بدون اسم"
-                stats_text += f"{i}. {title}\n"
-            
-            if count > 5:
-                stats_text += f"\n... و {count - 5} قناة أخرى"
-        
-        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
-        
-        await callback_query.message.edit_text(
-            stats_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode=ParseMode.MARKDOWN
-        )
-        
-    elif data == "channels_menu":
-        await channels_menu(client, callback_query.message)
+        if count > 5:
+            stats_text += f"\n... و {count - 5} قناة أخرى"
+    
+    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
+    
+    await callback_query.message.edit_text(
+        stats_text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+async def handle_channels_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """معالج أزرار القنوات (يمر عبر الموجّه المشترك)"""
+    if not await callback_router.dispatch(client, callback_query):
+        await callback_query.answer()
 
 
 async def handle_channel_input(client: Client, message: Message) -> None:
     """معالج إدخال القنوات من المستخدم"""
     user_id = message.from_user.id
+    # الردود تمر عبر المجدول المشترك لتجنب FloodWait
+    sender = get_sender()
+    chat_id = message.chat.id
     
     # التحقق من حالة المستخدم
     user_state = await client.get_user_state(user_id)
@@ -457,12 +501,9 @@ async def handle_channel_input(client: Client, message: Message) -> None:
     # إلغاء العملية
     if message.text and message.text.startswith("/cancel"):
         await client.set_user_state(user_id, None)
-        await message.reply_text("❌ تم إلغاء العملية")
+        await sender.send_message(chat_id, "❌ تم إلغاء العملية")
         return
     
-    added_channels = []
-    failed_channels = []
-    
     # معالجة الرسائل المحولة
     if message.forward_from_chat:
         chat = message.forward_from_chat
@@ -470,7 +511,8 @@ async def handle_channel_input(client: Client, message: Message) -> None:
             channels_to_check = [chat.id]
             logger.info(f"تم استخراج قناة من رسالة محولة: {chat.title} (ID: {chat.id})")
         else:
-            await message.reply_text(
+            await sender.send_message(
+                chat_id,
                 f"⚠️ هذه ليست قناة! نوع المحادثة: {chat.type}\n"
                 f"يرجى توجيه رسالة من قناة أو سوبر جروب."
             )
@@ -482,25 +524,77 @@ async def handle_channel_input(client: Client, message: Message) -> None:
         channels_to_check = await ChannelManager.extract_channel_info(message.text)
         
         if not channels_to_check:
-            await message.reply_text("⚠️ لم أتمكن من استخراج أي قنوات من النص المرسل!")
+            await sender.send_message(chat_id, "⚠️ لم أتمكن من استخراج أي قنوات من النص المرسل!")
             return
     else:
-        await message.reply_text("⚠️ يرجى إرسال نص أو توجيه رسالة من قناة!")
+        await sender.send_message(chat_id, "⚠️ يرجى إرسال نص أو توجيه رسالة من قناة!")
         return
     
+    await add_channels_from_input(client, user_id, chat_id, channels_to_check)
+
+
+def _result_text(added_channels: List[str], failed_channels: List[str]) -> str:
+    """نص نتيجة عملية الإضافة"""
+    result_text = """╭━━━━━━━━━━━━━━━━━━━━━╮
+    📊 **نتيجة العملية**
+╰━━━━━━━━━━━━━━━━━━━━━╯
+
+"""
+    
+    if added_channels:
+        result_text += f"✅ **تم إضافة بنجاح: {len(added_channels)}**\n"
+        for channel in added_channels:
+            result_text += f"  └ {channel}\n"
+        result_text += "\n"
+    
+    if failed_channels:
+        result_text += f"❌ **فشل الإضافة: {len(failed_channels)}**\n"
+        for channel in failed_channels:
+            result_text += f"  └ {channel}\n"
+        result_text += "\n"
+    
+    if not added_channels and not failed_channels:
+        result_text += "⚠️ **لم يتم إضافة أي قناة!**\n"
+    
+    result_text += "━━━━━━━━━━━━━━━━━━━━━"
+    return result_text
+
+
+async def _edit_progress(sender: SendScheduler, chat_id: int, message_id: int, done: int, total: int) -> None:
+    try:
+        await sender.edit_message_text(chat_id, message_id, f"⏳ جاري معالجة القنوات... ({done}/{total})")
+    except Exception as e:
+        logger.debug(f"تعذر تحديث رسالة التقدم: {e}")
+
+
+async def add_channels_from_input(
+    client: Any,
+    user_id: int,
+    chat_id: int,
+    channels_to_check: List[Union[int, str]],
+) -> None:
+    """التحقق من القنوات المرسلة بالتوازي ثم حفظ المقبول منها دفعة واحدة
+    
+    يُستخدم من مسار Pyrogram ومن مسار الـ webhook معاً.
+    """
+    sender = get_sender()
+    # إزالة التكرار مع الحفاظ على الترتيب
+    channels_to_check = list(dict.fromkeys(channels_to_check))
+    
     # التحقق من الحد الأقصى للقنوات
     current_count = await ChannelManager.get_channel_count(user_id)
     max_channels = 50
     
     if current_count >= max_channels:
-        await message.reply_text(f"⚠️ لقد وصلت للحد الأقصى من القنوات ({max_channels} قناة)!")
+        await sender.send_message(chat_id, f"⚠️ لقد وصلت للحد الأقصى من القنوات ({max_channels} قناة)!")
         await client.set_user_state(user_id, None)
         return
     
     # التحقق من عدد القنوات الجديدة
     remaining_slots = max_channels - current_count
     if len(channels_to_check) > remaining_slots:
-        await message.reply_text(
+        await sender.send_message(
+            chat_id,
             f"⚠️ يمكنك إضافة {remaining_slots} قناة فقط!\n"
             f"لديك {current_count} قناة من أصل {max_channels}"
         )
@@ -508,78 +602,65 @@ async def handle_channel_input(client: Client, message: Message) -> None:
         return
     
     # معالجة القنوات
-    processing_msg = await message.reply_text("⏳ جاري معالجة القنوات...")
+    processing_msg = await sender.send_message(chat_id, "⏳ جاري معالجة القنوات...")
     
-    for channel_info in channels_to_check:
+    total = len(channels_to_check)
+    results: List[tuple[bool, Optional[ResolvedChat]]] = [(False, None)] * total
+    done = 0
+    progress: Optional[asyncio.Task] = None
+    semaphore = asyncio.Semaphore(get_settings().channel_check_concurrency)
+    
+    async def verify(index: int, channel_info: Union[int, str]) -> None:
+        nonlocal done, progress
         logger.info(f"معالجة القناة: {channel_info}")
-        is_admin, chat = await ChannelManager.check_bot_admin(client, channel_info)
-        
+        async with semaphore:
+            # الاستعلامات تمر عبر محدد معدل القراءة في المجدول
+            results[index] = await ChannelManager.check_bot_admin(sender, channel_info)
+        done += 1
+        # تعديل واحد قيد التنفيذ في كل لحظة لرسالة التقدم
+        if progress is None or progress.done():
+            progress = asyncio.create_task(_edit_progress(sender, chat_id, processing_msg.id, done, total))
+    
+    await asyncio.gather(*(verify(i, info) for i, info in enumerate(channels_to_check)))
+    
+    added_channels = []
+    failed_channels = []
+    accepted: Dict[int, ResolvedChat] = {}
+    for channel_info, (is_admin, chat) in zip(channels_to_check, results):
         if not chat:
             error_msg = f"{channel_info} - قناة غير موجودة أو لا يمكن الوصول إليها"
             logger.error(f"❌ {error_msg}")
             failed_channels.append(error_msg)
-            continue
-        
-        if not is_admin:
+        elif not is_admin:
             error_msg = f"{chat.title} - البوت ليس مشرفاً"
             logger.warning(f"⚠️ {error_msg}")
             failed_channels.append(error_msg)
-            continue
-        
-        # إضافة القناة
-        logger.info(f"إضافة القناة: {chat.title} (ID: {chat.id})")
-        success = await ChannelManager.add_channel(
-            user_id,
-            chat.id,
-            chat.username,
-            chat.title
-        )
-        
-        if success:
+        else:
+            accepted.setdefault(chat.id, chat)
+    
+    # حفظ كل القنوات المقبولة مع إعداداتها الافتراضية في معاملة واحدة
+    if await ChannelManager.add_channels(user_id, list(accepted.values())):
+        for chat in accepted.values():
             added_channels.append(chat.title)
             logger.info(f"✅ تمت إضافة القناة: {chat.title}")
-            # تهيئة افتراضية للهيدر/الفوتر للسجل الجديد
-            try:
-                await HeaderManager.upsert(user_id, chat.id, None, False, "markdown")
-                await FooterManager.upsert(user_id, chat.id, None, False, "markdown")
-            except Exception as e:
-                logger.warning(f"تعذر تهيئة إعدادات القناة {chat.id}: {e}")
-        else:
+    else:
+        for chat in accepted.values():
             error_msg = f"{chat.title} - خطأ في الحفظ"
             logger.error(f"❌ {error_msg}")
             failed_channels.append(error_msg)
     
-    # إنشاء رسالة النتيجة
-    result_text = """╭━━━━━━━━━━━━━━━━━━━━━╮
-    📊 **نتيجة العملية**
-╰━━━━━━━━━━━━━━━━━━━━━╯
-
-"""
-    
-    if added_channels:
-        result_text += f"✅ **تم إضافة بنجاح: {len(added_channels)}**\n"
-        for channel in added_channels:
-            result_text += f"  └ {channel}\n"
-        result_text += "\n"
-    
-    if failed_channels:
-        result_text += f"❌ **فشل الإضافة: {len(failed_channels)}**\n"
-        for channel in failed_channels:
-            result_text += f"  └ {channel}\n"
-        result_text += "\n"
-    
-    if not added_channels and not failed_channels:
-        result_text += "⚠️ **لم يتم إضافة أي قناة!**\n"
-    
-    result_text += "━━━━━━━━━━━━━━━━━━━━━"
-    
     # إعادة تعيين حالة المستخدم
     await client.set_user_state(user_id, None)
     
     keyboard = [[InlineKeyboardButton("🔙 رجوع للقنوات", callback_data="channels_menu")]]
     
-    await processing_msg.edit_text(
-        result_text,
+    # ننتظر آخر تحديث للتقدم حتى لا يُرسل بعد النتيجة
+    if progress is not None:
+        await progress
+    await sender.edit_message_text(
+        chat_id,
+        processing_msg.id,
+        _result_text(added_channels, failed_channels),
         reply_markup=InlineKeyboardMarkup(keyboard),
         parse_mode=ParseMode.MARKDOWN
     )
@@ -589,6 +670,8 @@ async def handle_channel_input(client: Client, message: Message) -> None:
 __all__ = [
     'ChannelManager',
     'channels_menu',
+    'channels_menu_markup',
+    'add_channels_from_input',
     'handle_channels_callback',
     'handle_channel_input'
 ]
\ No newline at end of file
@@ -4,8 +4,11 @@ from typing import Optional
 
 from pyrogram import Client, idle
 
+from app.bot.storage import PostgresStorage
 from app.core.settings import get_settings
+from app.core.startup import Startup
 from app.db.migrate import run_migrations
+from app.db.pool import get_pool
 
 
 logger = logging.getLogger(__name__)
@@ -24,31 +27,44 @@ def get_bot_client() -> Client:
             api_hash=settings.api_hash,
             bot_token=settings.bot_token,
             workdir="/app/.pyrogram",
-            in_memory=True,
         )
+        # الجلسة والـ peers في Postgres: لا إعادة تسجيل دخول بعد كل تشغيل،
+        # والجلسة مرتبطة بمعرف البوت حتى لا تُستخدم مع توكن بوت آخر
+        _client.storage = PostgresStorage(f"bot:{settings.bot_token.split(':', 1)[0]}")
     return _client
 
 
 async def main():
     """الدالة الرئيسية لتشغيل البوت"""
-    # تشغيل migrations
-    logger.info("Running database migrations...")
-    await run_migrations()
-    
     # استيراد المعالجات (handlers)
     from app.bot import handlers  # noqa: F401
-    
+    from app.core.invalidation import get_invalidation_bus
+    from app.workers.peer_warmup import start_peer_warmup, stop_peer_warmup
+
     # الحصول على البوت وتشغيله
     bot = get_bot_client()
-    
+
+    async def start_bot() -> None:
+        await bot.start()
+        # تحليل القنوات المحفوظة في الخلفية
+        start_peer_warmup(bot)
+
+    # نفس منسق الإقلاع المستخدم في وضع الـ webhook
+    startup = Startup()
+    startup.add("pool", get_pool)
+    startup.add("migrations", run_migrations, after=("pool",))
+    startup.add("bot", start_bot, after=("migrations",))
+    startup.add("invalidation", get_invalidation_bus().start, critical=False)
     logger.info("Starting bot...")
-    await bot.start()
+    await startup.run()
     logger.info("Bot started successfully!")
-    
+
     # إبقاء البوت يعمل
     await idle()
     
     # إيقاف البوت
+    await stop_peer_warmup()
+    await get_invalidation_bus().stop()
     await bot.stop()
     logger.info("Bot stopped.")
 
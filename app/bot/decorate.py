@@ -0,0 +1,164 @@
+"""
+تطبيق الهيدر والفوتر على المنشورات الصادرة إلى القنوات
+"""
+
+import html
+import logging
+import re
+from typing import Any, Optional, Tuple
+
+from pyrogram.enums import ParseMode
+
+from app.bot.channel_settings import ChannelSettings, ChannelSettingsStore
+from app.core.cache import TTLCache
+from app.core.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# حدود Telegram بعد تحليل التنسيق (بوحدات UTF-16)
+TEXT_LIMIT = 4096
+CAPTION_LIMIT = 1024
+
+PARSE_MODES = {
+    "markdown": ParseMode.MARKDOWN,
+    "html": ParseMode.HTML,
+}
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+# روابط [نص](رابط) ثم رموز التنسيق التي يدعمها Pyrogram
+_MD_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_MD_DELIMITERS = re.compile(r"\*\*|__|~~|\|\||```|`")
+
+
+class PostTooLongError(ValueError):
+    def __init__(self, length: int, limit: int) -> None:
+        super().__init__(f"Decorated post is {length} characters; limit is {limit}")
+        self.length = length
+        self.limit = limit
+
+
+def visible_length(text: str, parse_mode: str) -> int:
+    """Length Telegram counts against its limits: UTF-16 units with markup removed."""
+    if parse_mode == "html":
+        text = html.unescape(_HTML_TAG.sub("", text))
+    else:
+        text = _MD_DELIMITERS.sub("", _MD_LINK.sub(r"\1", text))
+    return len(text.encode("utf-16-le")) // 2
+
+
+class Decoration:
+    """Header/footer of one channel, compiled once into plain prefix/suffix strings."""
+
+    __slots__ = ("settings", "prefix", "suffix", "parse_mode", "extra_length")
+
+    def __init__(self, settings: ChannelSettings) -> None:
+        self.settings = settings
+        header = settings.header_text if settings.header_enabled and settings.header_text else ""
+        footer = settings.footer_text if settings.footer_enabled and settings.footer_text else ""
+        self.prefix = f"{header}\n\n" if header else ""
+        self.suffix = f"\n\n{footer}" if footer else ""
+        self.parse_mode = settings.parse_mode
+        self.extra_length = visible_length(self.prefix + self.suffix, self.parse_mode)
+
+    def apply(self, body: str, caption: bool = False) -> Tuple[str, Any]:
+        """Return ``(text, parse_mode)`` for sending, or raise ``PostTooLongError``."""
+        limit = CAPTION_LIMIT if caption else TEXT_LIMIT
+        # التنسيق لا يقصّر النص، فالطول الخام حدّ أعلى يغني عن التحليل في الغالب
+        length = len(body.encode("utf-16-le")) // 2 + self.extra_length
+        if length > limit:
+            length = visible_length(body, self.parse_mode) + self.extra_length
+            if length > limit:
+                raise PostTooLongError(length, limit)
+        return f"{self.prefix}{body}{self.suffix}", PARSE_MODES.get(self.parse_mode, ParseMode.MARKDOWN)
+
+
+# علامة مصدر التجميع لقناة بلا صف إعدادات (بلا هيدر ولا فوتر)
+_NO_ROW = object()
+
+_settings = get_settings()
+# (كائن الصف أو _NO_ROW, التجميع الناتج عنه)
+_compiled: TTLCache[Tuple[int, int], Tuple[Any, Decoration]] = TTLCache(
+    maxsize=_settings.cache_maxsize, ttl=_settings.cache_ttl
+)
+
+
+async def get_decoration(user_id: int, channel_id: int) -> Decoration:
+    """Compiled decoration for a channel; recompiled only when its settings row changes."""
+    row = ChannelSettingsStore.cached(user_id, channel_id)
+    if row is None:
+        row = await ChannelSettingsStore.get(user_id, channel_id)
+    source = _NO_ROW if row is None else row
+    key = (user_id, channel_id)
+    compiled = _compiled.get(key)
+    # الكتابة عبر ChannelSettingsStore تستبدل كائن الصف، فيُعاد التجميع تلقائياً
+    if compiled is None or compiled[0] is not source:
+        compiled = (source, Decoration(row or ChannelSettings(user_id, channel_id)))
+        _compiled.set(key, compiled)
+    return compiled[1]
+
+
+class PostPipeline:
+    """Decorate posts for a channel and publish them through ``sender``.
+
+    ``sender`` is anything exposing Pyrogram's ``send_message`` and
+    ``copy_message`` coroutines (the bot client, or a rate-limited wrapper).
+    """
+
+    def __init__(self, sender: Any) -> None:
+        self._sender = sender
+
+    async def decorate(self, user_id: int, channel_id: int, body: str, caption: bool = False) -> Tuple[str, Any]:
+        decoration = await get_decoration(user_id, channel_id)
+        return decoration.apply(body, caption=caption)
+
+    async def publish(
+        self,
+        user_id: int,
+        channel_id: int,
+        body: str,
+        source: Optional[Tuple[int, int]] = None,
+    ) -> Optional[Any]:
+        """Send a text post, or copy the media message ``source`` with a decorated caption.
+
+        Returns the sent message, or None when the decorated post exceeds the limit.
+        """
+        try:
+            text, parse_mode = await self.decorate(user_id, channel_id, body, caption=source is not None)
+        except PostTooLongError as exc:
+            logger.warning("Skipping post for channel %s: %s", channel_id, exc)
+            return None
+        if source is None:
+            return await self._sender.send_message(chat_id=channel_id, text=text, parse_mode=parse_mode)
+        from_chat_id, message_id = source
+        return await self._sender.copy_message(
+            chat_id=channel_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            caption=text,
+            parse_mode=parse_mode,
+        )
+
+
+_pipeline: Optional[PostPipeline] = None
+
+
+def get_post_pipeline() -> PostPipeline:
+    """The pipeline publishing through the shared rate-limited ``SendScheduler``."""
+    global _pipeline
+    if _pipeline is None:
+        from app.bot.sender import get_sender
+
+        _pipeline = PostPipeline(get_sender())
+    return _pipeline
+
+
+__all__ = [
+    "Decoration",
+    "PostPipeline",
+    "PostTooLongError",
+    "get_decoration",
+    "get_post_pipeline",
+    "visible_length",
+]
@@ -5,7 +5,8 @@ from pyrogram import Client
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, CallbackQuery
 from pyrogram.enums import ParseMode
 
-from app.db.pool import get_pool
+from app.bot.channel_settings import ChannelSettingsStore
+from app.bot.router import callback_router
 
 
 logger = logging.getLogger(__name__)
@@ -16,40 +17,20 @@ class HeaderManager:
 
     @staticmethod
     async def upsert(user_id: int, channel_id: int, text: Optional[str], enabled: bool, parse_mode: str = "markdown") -> None:
-        pool = await get_pool()
-        async with pool.connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    """
-                    INSERT INTO channel_settings (user_id, channel_id, header_enabled, header_text, parse_mode)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (user_id, channel_id) DO UPDATE SET
-                        header_enabled = EXCLUDED.header_enabled,
-                        header_text = EXCLUDED.header_text,
-                        parse_mode = EXCLUDED.parse_mode,
-                        updated_at = NOW()
-                    """,
-                    (user_id, channel_id, enabled, text, parse_mode)
-                )
-                await conn.commit()
+        await ChannelSettingsStore.update(
+            user_id,
+            channel_id,
+            header_enabled=enabled,
+            header_text=text,
+            parse_mode=parse_mode,
+        )
 
     @staticmethod
     async def get(user_id: int, channel_id: int) -> Optional[dict]:
-        pool = await get_pool()
-        async with pool.connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    """
-                    SELECT header_enabled, header_text, parse_mode
-                    FROM channel_settings
-                    WHERE user_id = %s AND channel_id = %s
-                    """,
-                    (user_id, channel_id)
-                )
-                row = await cur.fetchone()
-                if not row:
-                    return None
-                return {"header_enabled": row[0], "header_text": row[1], "parse_mode": row[2]}
+        row = await ChannelSettingsStore.get(user_id, channel_id)
+        if row is None:
+            return None
+        return {"header_enabled": row.header_enabled, "header_text": row.header_text, "parse_mode": row.parse_mode}
 
 
 async def header_menu(client: Client, message: Message, user_id: int, channel_id: int) -> None:
@@ -79,30 +60,49 @@ async def header_menu(client: Client, message: Message, user_id: int, channel_id
     await message.edit_text(body, reply_markup=InlineKeyboardMarkup(kb), parse_mode=ParseMode.MARKDOWN)
 
 
-async def handle_header_callback(client: Client, callback_query: CallbackQuery) -> None:
-    data = callback_query.data
-    user_id = callback_query.from_user.id
-    if data.startswith("header_edit_"):
-        channel_id = int(data.split("_")[-1])
-        await callback_query.message.edit_text(
-            """
+@callback_router.prefix("header_menu_", ack_early=True)
+async def header_menu_callback(client: Client, callback_query: CallbackQuery) -> None:
+    channel_id = int(callback_query.data.split("_")[-1])
+    await header_menu(client, callback_query.message, callback_query.from_user.id, channel_id)
+    await callback_query.answer()
+
+
+@callback_router.prefix("header_edit_")
+async def header_edit_callback(client: Client, callback_query: CallbackQuery) -> None:
+    channel_id = int(callback_query.data.split("_")[-1])
+    await callback_query.message.edit_text(
+        """
 أرسل نص الهيدر الجديد. لإلغاء: /cancel
 """,
-            parse_mode=ParseMode.MARKDOWN,
-        )
-        await client.set_user_state(user_id, f"header_edit:{channel_id}")
-    elif data.startswith("header_toggle_"):
-        channel_id = int(data.split("_")[-1])
-        current = await HeaderManager.get(user_id, channel_id) or {"header_enabled": False, "header_text": None, "parse_mode": "markdown"}
-        await HeaderManager.upsert(user_id, channel_id, current.get("header_text"), not current.get("header_enabled", False), current.get("parse_mode", "markdown"))
-        await callback_query.answer("تم التبديل")
-        await header_menu(client, callback_query.message, user_id, channel_id)
-    elif data.startswith("header_clear_"):
-        channel_id = int(data.split("_")[-1])
-        current = await HeaderManager.get(user_id, channel_id) or {"parse_mode": "markdown"}
-        await HeaderManager.upsert(user_id, channel_id, None, False, current.get("parse_mode", "markdown"))
-        await callback_query.answer("تم حذف النص")
-        await header_menu(client, callback_query.message, user_id, channel_id)
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    await client.set_user_state(callback_query.from_user.id, f"header_edit:{channel_id}")
+    await callback_query.answer()
+
+
+@callback_router.prefix("header_toggle_")
+async def header_toggle_callback(client: Client, callback_query: CallbackQuery) -> None:
+    user_id = callback_query.from_user.id
+    channel_id = int(callback_query.data.split("_")[-1])
+    current = await HeaderManager.get(user_id, channel_id) or {"header_enabled": False, "header_text": None, "parse_mode": "markdown"}
+    await HeaderManager.upsert(user_id, channel_id, current.get("header_text"), not current.get("header_enabled", False), current.get("parse_mode", "markdown"))
+    await callback_query.answer("تم التبديل")
+    await header_menu(client, callback_query.message, user_id, channel_id)
+
+
+@callback_router.prefix("header_clear_")
+async def header_clear_callback(client: Client, callback_query: CallbackQuery) -> None:
+    user_id = callback_query.from_user.id
+    channel_id = int(callback_query.data.split("_")[-1])
+    current = await HeaderManager.get(user_id, channel_id) or {"parse_mode": "markdown"}
+    await HeaderManager.upsert(user_id, channel_id, None, False, current.get("parse_mode", "markdown"))
+    await callback_query.answer("تم حذف النص")
+    await header_menu(client, callback_query.message, user_id, channel_id)
+
+
+async def handle_header_callback(client: Client, callback_query: CallbackQuery) -> None:
+    if not await callback_router.dispatch(client, callback_query):
+        await callback_query.answer()
 
 
 async def handle_header_text_input(client: Client, message: Message) -> None:
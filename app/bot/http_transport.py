@@ -0,0 +1,187 @@
+"""
+إرسال الرسائل عبر Bot API (HTTP) بدلاً من MTProto بنفس واجهة Pyrogram
+
+يُستخدم مع SEND_TRANSPORT=http: الإرسال والتعديل ونسخ الرسائل والرد على الأزرار
+تمر عبر عميل HTTP المشترك، وبقية الاستدعاءات (get_chat ...) تبقى عبر Pyrogram.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pyrogram import Client, raw
+from pyrogram.enums import ParseMode
+from pyrogram.errors import FloodWait
+from pyrogram.parser import Parser
+from pyrogram.types import InlineKeyboardMarkup
+
+from app.core.botapi import BotAPI, BotAPIError
+
+
+# أنواع الكيانات في Pyrogram وما يقابلها في Bot API
+_ENTITY_TYPES = {
+    raw.types.MessageEntityBold: "bold",
+    raw.types.MessageEntityItalic: "italic",
+    raw.types.MessageEntityUnderline: "underline",
+    raw.types.MessageEntityStrike: "strikethrough",
+    raw.types.MessageEntitySpoiler: "spoiler",
+    raw.types.MessageEntityCode: "code",
+    raw.types.MessageEntityPre: "pre",
+    raw.types.MessageEntityTextUrl: "text_link",
+    raw.types.MessageEntityBlockquote: "blockquote",
+    raw.types.MessageEntityCustomEmoji: "custom_emoji",
+}
+
+
+class HttpMessage:
+    """The part of a sent message callers use (its id), from a Bot API ``Message``."""
+
+    __slots__ = ("id", "chat_id", "text")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.id: int = data["message_id"]
+        self.chat_id: Optional[int] = (data.get("chat") or {}).get("id")
+        self.text: Optional[str] = data.get("text")
+
+
+def _markup(reply_markup: Optional[InlineKeyboardMarkup]) -> Optional[Dict[str, Any]]:
+    if reply_markup is None:
+        return None
+    rows = []
+    for row in reply_markup.inline_keyboard:
+        buttons = []
+        for button in row:
+            item: Dict[str, Any] = {"text": button.text}
+            if button.callback_data is not None:
+                data = button.callback_data
+                item["callback_data"] = data.decode() if isinstance(data, bytes) else data
+            if button.url is not None:
+                item["url"] = button.url
+            buttons.append(item)
+        rows.append(buttons)
+    return {"inline_keyboard": rows}
+
+
+async def _parse(text: str, parse_mode: Optional[ParseMode]) -> Dict[str, Any]:
+    """Parse Pyrogram markdown/HTML locally so the HTTP path renders exactly like MTProto."""
+    parsed = await Parser(None).parse(text, parse_mode or ParseMode.DEFAULT)
+    entities: List[Dict[str, Any]] = []
+    for entity in parsed["entities"] or []:
+        kind = _ENTITY_TYPES.get(type(entity))
+        if kind is None:
+            continue
+        item: Dict[str, Any] = {"type": kind, "offset": entity.offset, "length": entity.length}
+        if kind == "text_link":
+            item["url"] = entity.url
+        elif kind == "pre" and entity.language:
+            item["language"] = entity.language
+        elif kind == "custom_emoji":
+            item["custom_emoji_id"] = str(entity.document_id)
+        entities.append(item)
+    return {"text": parsed["message"], "entities": entities or None}
+
+
+class HttpTransport:
+    """Pyrogram-compatible sender that goes through the Bot API.
+
+    ``FloodWait``-style 429 responses are raised as Pyrogram ``FloodWait`` so
+    ``SendScheduler`` reschedules them exactly like MTProto ones. Any other
+    attribute is forwarded to the Pyrogram client.
+    """
+
+    def __init__(self, api: BotAPI, client: Client) -> None:
+        self._api = api
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    async def _call(self, method: Any, **kwargs: Any) -> Any:
+        try:
+            return await method(**kwargs)
+        except BotAPIError as exc:
+            if exc.retry_after is not None:
+                raise FloodWait(value=exc.retry_after) from exc
+            raise
+
+    async def send_message(
+        self,
+        chat_id: Any,
+        text: str,
+        parse_mode: Optional[ParseMode] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        disable_web_page_preview: Optional[bool] = None,
+        **_: Any,
+    ) -> HttpMessage:
+        parsed = await _parse(text, parse_mode)
+        result = await self._call(
+            self._api.send_message,
+            chat_id=chat_id,
+            text=parsed["text"],
+            entities=parsed["entities"],
+            reply_markup=_markup(reply_markup),
+            disable_web_page_preview=disable_web_page_preview,
+        )
+        return HttpMessage(result)
+
+    async def edit_message_text(
+        self,
+        chat_id: Any,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[ParseMode] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        disable_web_page_preview: Optional[bool] = None,
+        **_: Any,
+    ) -> Any:
+        parsed = await _parse(text, parse_mode)
+        result = await self._call(
+            self._api.edit_message_text,
+            chat_id=chat_id,
+            message_id=message_id,
+            text=parsed["text"],
+            entities=parsed["entities"],
+            reply_markup=_markup(reply_markup),
+            disable_web_page_preview=disable_web_page_preview,
+        )
+        return HttpMessage(result) if isinstance(result, dict) else result
+
+    async def copy_message(
+        self,
+        chat_id: Any,
+        from_chat_id: Any,
+        message_id: int,
+        caption: Optional[str] = None,
+        parse_mode: Optional[ParseMode] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        **_: Any,
+    ) -> HttpMessage:
+        parsed = await _parse(caption, parse_mode) if caption is not None else {"text": None, "entities": None}
+        result = await self._call(
+            self._api.copy_message,
+            chat_id=chat_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            caption=parsed["text"],
+            caption_entities=parsed["entities"],
+            reply_markup=_markup(reply_markup),
+        )
+        return HttpMessage(result)
+
+    async def answer_callback_query(
+        self,
+        callback_query_id: str,
+        text: Optional[str] = None,
+        show_alert: Optional[bool] = None,
+        url: Optional[str] = None,
+        cache_time: Optional[int] = None,
+    ) -> bool:
+        return await self._call(
+            self._api.answer_callback_query,
+            callback_query_id=callback_query_id,
+            text=text,
+            show_alert=show_alert,
+            url=url,
+            cache_time=cache_time,
+        )
+
+
+__all__ = ["HttpTransport", "HttpMessage"]
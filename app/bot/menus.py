@@ -0,0 +1,221 @@
+"""
+القوائم العامة للبوت (القائمة الرئيسية، الإحصائيات، المساعدة، الإعدادات)
+استيراد هذه الوحدة يسجّل كل مسارات الأزرار في الموجّه المشترك
+"""
+
+from pyrogram import Client
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
+from pyrogram.enums import ParseMode
+
+from app.db import queries
+from app.db.pool import get_pool
+from app.bot.router import callback_router
+from app.bot.channels import ChannelManager
+# استيراد الوحدات التالية يسجّل مسارات القنوات والهيدر والفوتر
+from app.bot import channels as _channels  # noqa: F401
+from app.bot import header as _header  # noqa: F401
+from app.bot import footer as _footer  # noqa: F401
+
+
+def main_menu_keyboard() -> InlineKeyboardMarkup:
+    """لوحة المفاتيح الرئيسية"""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("📡 قنواتي", callback_data="channels_menu"),
+            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add")
+        ],
+        [
+            InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list"),
+            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete")
+        ],
+        [
+            InlineKeyboardButton("📊 الإحصائيات", callback_data="stats"),
+            InlineKeyboardButton("⚙️ الإعدادات", callback_data="settings")
+        ],
+        [
+            InlineKeyboardButton("📖 المساعدة", callback_data="help"),
+            InlineKeyboardButton("ℹ️ حول البوت", callback_data="about")
+        ]
+    ])
+
+
+BACK_TO_MAIN = InlineKeyboardMarkup([[InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")]])
+
+
+@callback_router.exact("main_menu", ack_early=True)
+async def main_menu_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """العودة للقائمة الرئيسية"""
+    user = callback_query.from_user
+    channel_count = await ChannelManager.get_channel_count(user.id)
+
+    main_menu_text = f"""
+╭━━━━━━━━━━━━━━━━━━━━━╮
+    🤖 **القائمة الرئيسية**
+╰━━━━━━━━━━━━━━━━━━━━━╯
+
+👤 **المستخدم:** {user.first_name or ''}
+📡 **القنوات المضافة:** {channel_count}
+
+━━━━━━━━━━━━━━━━━━━━━
+⬇️ **اختر من القائمة أدناه:**
+"""
+
+    await callback_query.message.edit_text(
+        main_menu_text,
+        reply_markup=main_menu_keyboard(),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.exact("stats", ack_early=True)
+async def stats_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض إحصائيات المستخدم العامة"""
+    user = callback_query.from_user
+
+    # تاريخ أول استخدام وعدد القنوات من صف المستخدم
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await queries.execute(cur, queries.USER_STATS, (user.id,))
+            user_data = await cur.fetchone()
+            created_at, channel_count = user_data if user_data else (None, 0)
+
+    stats_text = f"""
+📊 **الإحصائيات الخاصة بك**
+
+👤 **الاسم:** {user.first_name or ''}
+🆔 **المعرف:** `{user.id}`
+📡 **عدد القنوات:** {channel_count}
+📅 **تاريخ التسجيل:** {created_at.strftime('%Y-%m-%d') if created_at else 'غير معروف'}
+
+━━━━━━━━━━━━━━━━━━━━━
+"""
+
+    await callback_query.message.edit_text(
+        stats_text,
+        reply_markup=BACK_TO_MAIN,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.exact("help", ack_early=True)
+async def help_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """عرض المساعدة"""
+    help_text = """
+📖 **دليل الاستخدام**
+
+━━━━━━━━━━━━━━━━━━━━━
+🔹 **الأوامر المتاحة:**
+
+• /start - بدء البوت وعرض القائمة
+• /channels - إدارة القنوات
+• /cancel - إلغاء العملية الحالية
+
+━━━━━━━━━━━━━━━━━━━━━
+🔹 **كيفية إضافة قناة:**
+
+1. اضغط على "➕ إضافة قناة"
+2. أرسل معرف القناة بإحدى الطرق:
+   • @username
+   • رابط القناة
+   • ID القناة
+   • توجيه رسالة من القناة
+
+⚠️ **ملاحظة:** يجب أن يكون البوت مشرفاً في القناة
+
+━━━━━━━━━━━━━━━━━━━━━
+🔹 **للدعم والمساعدة:**
+تواصل مع المطور: @YourUsername
+"""
+
+    await callback_query.message.edit_text(
+        help_text,
+        reply_markup=BACK_TO_MAIN,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+@callback_router.exact("about", ack_early=True)
+async def about_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """معلومات عن البوت"""
+    about_text = """
+ℹ️ **حول البوت**
+
+━━━━━━━━━━━━━━━━━━━━━
+🤖 **بوت إدارة القنوات**
+الإصدار: 1.0.0
+
+هذا البوت يساعدك في:
+• إدارة قنواتك بسهولة
+• تنظيم المحتوى
+• متابعة الإحصائيات
+
+━━━━━━━━━━━━━━━━━━━━━
+👨‍💻 **تطوير:**
+تم التطوير بواسطة فريق التطوير
+
+📅 **آخر تحديث:**
+2025-09-10
+
+━━━━━━━━━━━━━━━━━━━━━
+"""
+
+    await callback_query.message.edit_text(
+        about_text,
+        reply_markup=BACK_TO_MAIN,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    await callback_query.answer()
+
+
+# "settings_menu" هو زر الرجوع في قوائم الهيدر/الفوتر
+@callback_router.exact("settings", "settings_menu")
+async def settings_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """فتح قائمة اختيار القناة لإدارة الإعدادات"""
+    channels = await ChannelManager.get_user_channels(callback_query.from_user.id)
+    if not channels:
+        await callback_query.answer("لا توجد قنوات لإعدادها", show_alert=True)
+        return
+    keyboard = []
+    for channel in channels:
+        cid = channel["channel_id"]
+        display = channel["channel_title"] or f"{cid}"
+        keyboard.append([InlineKeyboardButton(f"⚙️ {display}", callback_data=f"settings_channel_{cid}")])
+    keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")])
+    await callback_query.message.edit_text(
+        """
+╭━━━━━━━━━━━━━━━━━━━━━╮
+   ⚙️ إعدادات القنوات
+╰━━━━━━━━━━━━━━━━━━━━━╯
+
+اختر قناة لإدارة الهيدر/الفوتر
+""",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    await callback_query.answer()
+
+
+@callback_router.prefix("settings_channel_", ack_early=True)
+async def settings_channel_callback(client: Client, callback_query: CallbackQuery) -> None:
+    """قائمة إعدادات القناة"""
+    channel_id = int(callback_query.data.split("_")[-1])
+    keyboard = [
+        [InlineKeyboardButton("🧩 الهيدر", callback_data=f"header_menu_{channel_id}")],
+        [InlineKeyboardButton("🧩 الفوتر", callback_data=f"footer_menu_{channel_id}")],
+        [InlineKeyboardButton("🔙 رجوع", callback_data="settings")],
+    ]
+    await callback_query.message.edit_text(
+        f"إعدادات القناة: `{channel_id}`\n\nاختر القسم:",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    await callback_query.answer()
+
+
+__all__ = [
+    "main_menu_keyboard",
+]
@@ -0,0 +1,204 @@
+"""
+كاش تحليل القنوات (المعرف/الرابط/ID) وحالة البوت فيها
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Optional, Union
+
+from pyrogram.enums import ChatMemberStatus, ChatType
+from pyrogram.errors import (
+    UserNotParticipant,
+    ChatAdminRequired,
+    PeerIdInvalid,
+    UsernameNotOccupied,
+    ChannelPrivate,
+    UsernameInvalid,
+    ChannelInvalid,
+    ChatInvalid
+)
+
+from app.core.cache import TTLCache
+from app.core.invalidation import get_invalidation_bus
+from app.core.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+ChatRef = Union[int, str]
+
+# أخطاء تعني أن القناة غير موجودة أو غير متاحة، فتُخزن كنتيجة سلبية
+NOT_FOUND_ERRORS = (
+    PeerIdInvalid,
+    UsernameNotOccupied,
+    ChannelPrivate,
+    UsernameInvalid,
+    ChannelInvalid,
+    ChatInvalid,
+)
+
+_LINK = re.compile(r"^(?:https?://)?t(?:elegram)?\.me/", re.IGNORECASE)
+
+_NOT_FOUND = object()
+
+
+class ResolvedChat:
+    """The parts of a chat the bot needs, plus the bot's own membership status."""
+
+    __slots__ = ("id", "type", "title", "username", "bot_status")
+
+    def __init__(
+        self,
+        id: int,
+        type: ChatType,
+        title: Optional[str],
+        username: Optional[str],
+        bot_status: Optional[ChatMemberStatus],
+    ) -> None:
+        self.id = id
+        self.type = type
+        self.title = title
+        self.username = username
+        self.bot_status = bot_status
+
+    @property
+    def is_admin(self) -> bool:
+        return self.bot_status in (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER)
+
+
+def normalize(ref: ChatRef) -> ChatRef:
+    """Cache key for a chat reference: the numeric id, or ``@username`` in lower case."""
+    if isinstance(ref, int):
+        return ref
+    ref = ref.strip()
+    if ref.lstrip("-").isdigit():
+        return int(ref)
+    ref = _LINK.sub("", ref).lstrip("@").split("/")[0]
+    return f"@{ref.lower()}"
+
+
+class ChatResolver:
+    """Resolve chats and the bot's status once, then serve repeats from memory.
+
+    Successful lookups are cached under both the id and the username for
+    ``ttl`` seconds; chats that do not exist or are not accessible are cached
+    for ``negative_ttl``. Concurrent lookups of the same chat share one RPC.
+    ``invalidate`` is called when a ``my_chat_member`` update reports that the
+    bot's status in a chat changed; with a ``bus`` the invalidation reaches
+    every process, since only the one handling the update sees it.
+    """
+
+    NAMESPACE = "resolver"
+
+    def __init__(
+        self,
+        ttl: float = 600.0,
+        negative_ttl: float = 60.0,
+        maxsize: int = 10000,
+        bus: Optional[Any] = None,
+    ) -> None:
+        self._cache: TTLCache[ChatRef, Any] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._negative_ttl = negative_ttl
+        self._inflight: Dict[ChatRef, "asyncio.Future[Optional[ResolvedChat]]"] = {}
+        self._bus = bus
+        if bus is not None:
+            bus.subscribe(self.NAMESPACE, self._on_invalidate)
+
+    def cached(self, ref: ChatRef) -> Optional[ResolvedChat]:
+        hit = self._cache.get(normalize(ref))
+        return None if hit is _NOT_FOUND else hit
+
+    async def resolve(self, client: Any, ref: ChatRef) -> Optional[ResolvedChat]:
+        """Return the resolved chat, or None when it does not exist or cannot be reached."""
+        key = normalize(ref)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return None if hit is _NOT_FOUND else hit
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[Optional[ResolvedChat]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            resolved = await self._fetch(client, key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # نقرأ الاستثناء هنا حتى لا يُسجَّل كغير مقروء إن لم ينتظره أحد
+            future.exception()
+            raise
+        else:
+            future.set_result(resolved)
+            return resolved
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fetch(self, client: Any, key: ChatRef) -> Optional[ResolvedChat]:
+        try:
+            logger.info(f"محاولة الوصول للقناة: {key}")
+            chat = await client.get_chat(key)
+        except NOT_FOUND_ERRORS as e:
+            logger.error(f"القناة غير موجودة أو غير متاحة {key}: {type(e).__name__}: {e}")
+            self._cache.set(key, _NOT_FOUND, ttl=self._negative_ttl)
+            return None
+        logger.info(f"تم العثور على: {chat.title} (ID: {chat.id}, Type: {chat.type})")
+
+        bot_status = None
+        if chat.type in (ChatType.CHANNEL, ChatType.SUPERGROUP):
+            try:
+                member = await client.get_chat_member(chat.id, "me")
+                bot_status = member.status
+            except (UserNotParticipant, ChatAdminRequired) as e:
+                # البوت ليس عضواً أو لا يملك صلاحية رؤية الأعضاء
+                logger.warning(f"لا يمكن قراءة حالة البوت في {chat.id}: {e}")
+            logger.info(f"حالة البوت: {bot_status}")
+
+        resolved = ResolvedChat(chat.id, chat.type, chat.title, chat.username, bot_status)
+        self._store(key, resolved)
+        return resolved
+
+    def _store(self, key: ChatRef, resolved: ResolvedChat) -> None:
+        self._cache.set(key, resolved)
+        self._cache.set(resolved.id, resolved)
+        if resolved.username:
+            self._cache.set(normalize(resolved.username), resolved)
+
+    async def invalidate(self, chat_id: int, username: Optional[str] = None) -> None:
+        """Forget a chat under its id and every username it was cached under, in every process."""
+        if self._bus is None:
+            self.forget(chat_id, username)
+        else:
+            # أسماء المستخدمين لا تحتوي ":"
+            await self._bus.publish(self.NAMESPACE, f"{chat_id}:{username or ''}")
+
+    def _on_invalidate(self, key: Optional[str]) -> None:
+        if key is None:
+            self._cache.clear()
+            return
+        chat_id, username = key.split(":", 1)
+        self.forget(int(chat_id), username or None)
+
+    def forget(self, chat_id: int, username: Optional[str] = None) -> None:
+        """Drop a chat from this process's cache only."""
+        entry = self._cache.pop(chat_id)
+        usernames = {username, getattr(entry, "username", None)}
+        for name in usernames:
+            if name:
+                self._cache.pop(normalize(name))
+
+
+_settings = get_settings()
+chat_resolver = ChatResolver(
+    ttl=_settings.resolver_ttl,
+    negative_ttl=_settings.resolver_negative_ttl,
+    maxsize=_settings.cache_maxsize,
+    bus=get_invalidation_bus(),
+)
+
+
+__all__ = ["ChatResolver", "ResolvedChat", "chat_resolver", "normalize"]
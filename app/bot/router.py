@@ -0,0 +1,127 @@
+"""
+موجّه أزرار Callback المشترك بين مسار الـ webhook ومسار Pyrogram (polling)
+"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+CallbackHandler = Callable[[Any, Any], Awaitable[None]]
+
+
+class _Route:
+    __slots__ = ("name", "handler", "ack_early")
+
+    def __init__(self, name: str, handler: CallbackHandler, ack_early: bool) -> None:
+        self.name = name
+        self.handler = handler
+        self.ack_early = ack_early
+
+
+class _TrieNode:
+    __slots__ = ("children", "route")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.route: Optional[_Route] = None
+
+
+class CallbackRouter:
+    """Dispatch callback data to handlers.
+
+    Exact routes are a dict lookup; parameterized routes such as
+    ``delete_channel_<id>`` live in a character trie and the longest
+    registered prefix wins (``header_menu_`` before ``header_``).
+
+    Handlers receive ``(client, callback_query)`` where ``callback_query`` is a
+    Pyrogram ``CallbackQuery`` or any object with the same ``data``,
+    ``from_user``, ``message.edit_text`` and ``answer`` surface.
+    """
+
+    def __init__(self) -> None:
+        self._exact: Dict[str, _Route] = {}
+        self._trie = _TrieNode()
+        self._timings: Dict[str, Histogram] = {}
+
+    def exact(self, *names: str, ack_early: bool = False) -> Callable[[CallbackHandler], CallbackHandler]:
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            for name in names:
+                self._exact[name] = _Route(name, handler, ack_early)
+            return handler
+        return decorator
+
+    def prefix(self, prefix: str, ack_early: bool = False) -> Callable[[CallbackHandler], CallbackHandler]:
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            node = self._trie
+            for char in prefix:
+                node = node.children.setdefault(char, _TrieNode())
+            node.route = _Route(f"{prefix}*", handler, ack_early)
+            return handler
+        return decorator
+
+    def resolve(self, data: str) -> Optional[_Route]:
+        route = self._exact.get(data)
+        if route is not None:
+            return route
+        node = self._trie
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                route = node.route
+        return route
+
+    def acks_early(self, data: str) -> bool:
+        """Whether the route never answers with text, so it can be acked up front."""
+        route = self.resolve(data)
+        return route is not None and route.ack_early
+
+    async def dispatch(self, client: Any, callback_query: Any) -> bool:
+        """Run the handler for ``callback_query.data``; False if no route matches."""
+        data = callback_query.data or ""
+        route = self.resolve(data)
+        if route is None:
+            return False
+        timing = self._timings.get(route.name)
+        if timing is None:
+            timing = self._timings[route.name] = Histogram()
+        started = time.perf_counter()
+        failed = False
+        try:
+            await route.handler(client, callback_query)
+        except Exception as exc:  # noqa: BLE001
+            failed = True
+            logger.exception("Callback handling error for %s: %s", route.name, exc)
+            try:
+                await callback_query.answer("حدث خطأ غير متوقع", show_alert=True)
+            except Exception:  # noqa: BLE001
+                pass
+        finally:
+            timing.observe(time.perf_counter() - started, error=failed)
+        return True
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {name: h.snapshot() for name, h in sorted(self._timings.items())}
+
+    def routes(self) -> Tuple[str, ...]:
+        names = list(self._exact)
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            if node.route is not None:
+                names.append(node.route.name)
+            stack.extend(node.children.values())
+        return tuple(sorted(names))
+
+
+callback_router = CallbackRouter()
+
+
+__all__ = ["CallbackRouter", "callback_router"]
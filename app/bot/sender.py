@@ -0,0 +1,258 @@
+"""
+جدولة الرسائل الصادرة إلى Telegram ضمن حدود المعدل الموثقة
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pyrogram import Client
+from pyrogram.errors import FloodWait
+
+from app.core.cache import TTLCache
+from app.core.metrics import Histogram
+from app.core.ratelimit import TokenBucket
+from app.core.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingEdit:
+    __slots__ = ("kwargs", "future")
+
+    def __init__(self, kwargs: Dict[str, Any], future: "asyncio.Future[Any]") -> None:
+        self.kwargs = kwargs
+        self.future = future
+
+
+class _ChatSlot:
+    """Rate bucket and ordering lock of one chat; ``users`` counts callers holding or waiting on the lock."""
+
+    __slots__ = ("bucket", "lock", "users")
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SendScheduler:
+    """Rate-limited front for the bot client's outgoing calls.
+
+    Every ``send_message``/``copy_message``/``edit_message_text`` waits for a
+    token from the global bucket and from the target chat's bucket (private
+    chats and groups/channels have different limits); ``get_chat`` and
+    ``get_chat_member`` share a separate bucket for read RPCs. An edit issued while an
+    earlier edit of the same message is still waiting replaces its content, so
+    only the latest text is sent. ``FloodWait`` blocks the chat's bucket for the
+    requested time and the call is retried; the global bucket is left alone on
+    purpose, since a send FloodWait is scoped to the peer and the global bucket
+    already keeps the bot under the bot-wide limit. Any other attribute is
+    forwarded to the client, so the scheduler can be passed wherever a client
+    is expected.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        rpc_rate: float = 30.0,
+        max_retries: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self._client = client
+        self._clock = clock
+        self._sleep = sleep
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate
+        self._max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate, clock)
+        # استعلامات القراءة (get_chat وما شابه) لها دلو منفصل حتى لا تزاحم الإرسال
+        self._rpc = TokenBucket(rpc_rate, rpc_rate, clock)
+        # الدلو الخامل يمتلئ خلال ثوانٍ، فحذفه بعد دقيقة لا يغير السلوك؛
+        # أما الدلو المحجوب بـ FloodWait فيبقى حتى ينتهي الحجب (انظر _chat)
+        self._idle_ttl = 60.0
+        self._chats: TTLCache[int, _ChatSlot] = TTLCache(maxsize=100_000, ttl=self._idle_ttl, clock=clock)
+        # محادثات لها مرسل ينتظر الآن: لا تنتهي صلاحيتها ولا تُطرد ما دام أحد ينتظر قفلها
+        self._active: Dict[int, _ChatSlot] = {}
+        self._edits: Dict[Tuple[int, int], _PendingEdit] = {}
+        self._waiting = 0
+        self._wait = Histogram()
+        self._latency = Histogram()
+        self.coalesced_edits = 0
+        self.flood_waits = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _chat(self, chat_id: int) -> _ChatSlot:
+        slot = self._active.get(chat_id) or self._chats.get(chat_id)
+        if slot is None:
+            # المعرفات السالبة للمجموعات والقنوات
+            rate = self._group_rate if chat_id < 0 else self._chat_rate
+            slot = _ChatSlot(TokenBucket(rate, 1.0, self._clock))
+        self._chats.set(chat_id, slot, ttl=self._idle_ttl + slot.bucket.delay())
+        return slot
+
+    def _block(self, chat_id: Optional[int], seconds: float) -> None:
+        if chat_id is None:
+            self._rpc.block(seconds)
+            return
+        slot = self._chat(chat_id)
+        slot.bucket.block(seconds)
+        # تمديد بقاء الدلو حتى لا يُحذف وهو محجوب فيُنسى الحجب
+        self._chats.set(chat_id, slot, ttl=self._idle_ttl + seconds)
+
+    async def _take(self, *buckets: TokenBucket) -> None:
+        while True:
+            delay = max(bucket.delay() for bucket in buckets)
+            if delay <= 0:
+                break
+            await self._sleep(delay)
+        for bucket in buckets:
+            bucket.consume()
+
+    async def _acquire(self, chat_id: Optional[int]) -> None:
+        """Wait for a send slot in ``chat_id``, or for a read RPC slot when it is None."""
+        started = self._clock()
+        self._waiting += 1
+        try:
+            if chat_id is None:
+                await self._take(self._rpc)
+            else:
+                slot = self._chat(chat_id)
+                slot.users += 1
+                self._active[chat_id] = slot
+                try:
+                    # القفل يحفظ ترتيب الرسائل داخل المحادثة الواحدة
+                    async with slot.lock:
+                        await self._take(self._global, slot.bucket)
+                finally:
+                    slot.users -= 1
+                    if not slot.users:
+                        # آخر المنتظرين: تبدأ مدة الخمول من الآن
+                        del self._active[chat_id]
+                        self._chats.set(chat_id, slot, ttl=self._idle_ttl + slot.bucket.delay())
+        finally:
+            self._waiting -= 1
+        self._wait.observe(self._clock() - started)
+
+    async def _call(
+        self,
+        chat_id: Optional[int],
+        method: Callable[..., Awaitable[Any]],
+        kwargs: Dict[str, Any],
+        acquired: bool = False,
+    ) -> Any:
+        attempt = 0
+        while True:
+            if not acquired:
+                await self._acquire(chat_id)
+            acquired = False
+            started = self._clock()
+            try:
+                result = await method(**kwargs)
+            except FloodWait as exc:
+                self._latency.observe(self._clock() - started, error=True)
+                self.flood_waits += 1
+                attempt += 1
+                if attempt > self._max_retries:
+                    raise
+                seconds = float(exc.value or 1)
+                logger.warning("FloodWait %ss for chat %s, rescheduling (attempt %s)", seconds, chat_id, attempt)
+                self._block(chat_id, seconds)
+                continue
+            except Exception:
+                self._latency.observe(self._clock() - started, error=True)
+                raise
+            self._latency.observe(self._clock() - started)
+            return result
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> Any:
+        return await self._call(chat_id, self._client.send_message, dict(chat_id=chat_id, text=text, **kwargs))
+
+    async def copy_message(self, chat_id: int, from_chat_id: int, message_id: int, **kwargs: Any) -> Any:
+        return await self._call(
+            chat_id,
+            self._client.copy_message,
+            dict(chat_id=chat_id, from_chat_id=from_chat_id, message_id=message_id, **kwargs),
+        )
+
+    async def get_chat(self, chat_id: Any) -> Any:
+        return await self._call(None, self._client.get_chat, dict(chat_id=chat_id))
+
+    async def get_chat_member(self, chat_id: Any, user_id: Any) -> Any:
+        return await self._call(None, self._client.get_chat_member, dict(chat_id=chat_id, user_id=user_id))
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs: Any) -> Any:
+        key = (chat_id, message_id)
+        kwargs = dict(chat_id=chat_id, message_id=message_id, text=text, **kwargs)
+        pending = self._edits.get(key)
+        if pending is not None:
+            # تعديل أحدث لنفس الرسالة ما زال ينتظر: نستبدل محتواه وننتظر نتيجته
+            pending.kwargs = kwargs
+            self.coalesced_edits += 1
+            return await asyncio.shield(pending.future)
+
+        pending = _PendingEdit(kwargs, asyncio.get_running_loop().create_future())
+        self._edits[key] = pending
+        try:
+            try:
+                await self._acquire(chat_id)
+            finally:
+                # بعد الحصول على الدور يبدأ أي تعديل جديد انتظاراً مستقلاً
+                self._edits.pop(key, None)
+            result = await self._call(chat_id, self._client.edit_message_text, pending.kwargs, acquired=True)
+        except asyncio.CancelledError:
+            pending.future.cancel()
+            raise
+        except Exception as exc:
+            pending.future.set_exception(exc)
+        else:
+            pending.future.set_result(result)
+        return await pending.future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._waiting,
+            "pending_edits": len(self._edits),
+            "coalesced_edits": self.coalesced_edits,
+            "flood_waits": self.flood_waits,
+            "wait": self._wait.snapshot(),
+            "send": self._latency.snapshot(),
+        }
+
+
+_sender: Optional[SendScheduler] = None
+
+
+def get_sender(client: Optional[Client] = None) -> SendScheduler:
+    """Process-wide scheduler around the bot client."""
+    global _sender
+    if _sender is None:
+        if client is None:
+            from app.bot.client import get_bot_client
+
+            client = get_bot_client()
+        settings = get_settings()
+        if settings.send_transport == "http":
+            from app.bot.http_transport import HttpTransport
+            from app.core.botapi import get_bot_api
+
+            client = HttpTransport(get_bot_api(settings), client)
+        _sender = SendScheduler(
+            client,
+            global_rate=settings.send_global_rate,
+            chat_rate=settings.send_chat_rate,
+            group_rate=settings.send_group_per_minute / 60,
+            rpc_rate=settings.send_rpc_rate,
+        )
+    return _sender
+
+
+__all__ = ["SendScheduler", "get_sender"]
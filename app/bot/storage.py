@@ -0,0 +1,203 @@
+"""
+تخزين جلسة Pyrogram وذاكرة الـ peers في Postgres بدلاً من الذاكرة
+
+تبقى الجلسة (auth_key) والـ access hash للقنوات بعد إعادة التشغيل وتتشاركها كل النسخ،
+فلا يُعاد تسجيل دخول البوت ولا تحتاج القنوات المعروفة أي طلب تحليل.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pyrogram.storage import Storage
+from pyrogram.storage.sqlite_storage import get_input_peer
+
+from app.core.cache import TTLCache
+from app.core.settings import get_settings
+from app.db.pool import get_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+Peer = Tuple[int, int, str, Optional[str], Optional[str]]
+
+SESSION_FIELDS = ("dc_id", "api_id", "test_mode", "auth_key", "date", "user_id", "is_bot")
+
+_UPSERT_PEERS = """
+INSERT INTO pyrogram_peers (session_name, id, access_hash, type, username, phone_number)
+SELECT %(name)s, *
+FROM unnest(%(ids)s::bigint[], %(hashes)s::bigint[], %(types)s::text[], %(usernames)s::text[], %(phones)s::text[])
+ON CONFLICT (session_name, id) DO UPDATE SET
+    access_hash = EXCLUDED.access_hash,
+    type = EXCLUDED.type,
+    username = EXCLUDED.username,
+    phone_number = EXCLUDED.phone_number,
+    last_update_on = NOW()
+"""
+
+_TOUCH_PEERS = """
+UPDATE pyrogram_peers SET last_update_on = NOW()
+WHERE session_name = %(name)s AND id = ANY(%(ids)s::bigint[])
+"""
+
+
+class PostgresStorage(Storage):
+    """Pyrogram storage backed by the ``pyrogram_sessions``/``pyrogram_peers`` tables.
+
+    The session row is read once on ``open`` and written through on every
+    change. Peers are cached in-process and only rows whose access hash,
+    type, username or phone changed are written, because Pyrogram calls
+    ``update_peers`` after almost every RPC. Unchanged peers only get their
+    ``last_update_on`` refreshed, at most once per ``TOUCH_INTERVAL``, so
+    usernames seen recently do not expire after ``USERNAME_TTL``.
+    """
+
+    USERNAME_TTL = 8 * 60 * 60
+    TOUCH_INTERVAL = 60 * 60
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        settings = get_settings()
+        self._session: Dict[str, Any] = {}
+        self._peers: TTLCache[int, Tuple[Peer, float]] = TTLCache(
+            maxsize=settings.cache_maxsize, ttl=self.USERNAME_TTL
+        )
+
+    async def open(self) -> None:
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                "INSERT INTO pyrogram_sessions (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+                (self.name,),
+            )
+            cur = await conn.execute(
+                f"SELECT {', '.join(SESSION_FIELDS)} FROM pyrogram_sessions WHERE name = %s",
+                (self.name,),
+            )
+            row = await cur.fetchone()
+        self._session = dict(zip(SESSION_FIELDS, row))
+        if self._session["auth_key"] is not None:
+            self._session["auth_key"] = bytes(self._session["auth_key"])
+            logger.info("Loaded Pyrogram session %r from the database", self.name)
+
+    async def save(self) -> None:
+        await self.date(int(time.time()))
+
+    async def close(self) -> None:
+        self._peers.clear()
+
+    async def delete(self) -> None:
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            await conn.execute("DELETE FROM pyrogram_sessions WHERE name = %s", (self.name,))
+        self._session = {}
+        self._peers.clear()
+
+    async def update_peers(self, peers: List[Peer]) -> None:
+        now = time.time()
+        changed: Dict[int, Peer] = {}
+        touched: Dict[int, Peer] = {}
+        for peer in peers:
+            # الوقت المخزن مع الـ peer هو last_update_on كما في قاعدة البيانات
+            cached = self._peers.get(peer[0])
+            if cached is None or cached[0] != peer:
+                changed[peer[0]] = peer
+            elif now - cached[1] > self.TOUCH_INTERVAL:
+                touched[peer[0]] = peer
+            else:
+                self._peers.set(peer[0], cached)
+        if not changed and not touched:
+            return
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            if changed:
+                rows = list(changed.values())
+                await conn.execute(
+                    _UPSERT_PEERS,
+                    {
+                        "name": self.name,
+                        "ids": [p[0] for p in rows],
+                        "hashes": [p[1] for p in rows],
+                        "types": [p[2] for p in rows],
+                        "usernames": [p[3] for p in rows],
+                        "phones": [p[4] for p in rows],
+                    },
+                )
+            if touched:
+                # صف لم يتغير: نحدّث وقت الرؤية فقط حتى لا يُعد اسم المستخدم منتهياً
+                await conn.execute(_TOUCH_PEERS, {"name": self.name, "ids": list(touched)})
+        for peer in (*changed.values(), *touched.values()):
+            self._peers.set(peer[0], (peer, now))
+
+    async def _fetch_peer(self, column: str, value: Any) -> Optional[Tuple[Peer, float]]:
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT id, access_hash, type, username, phone_number, "
+                "EXTRACT(EPOCH FROM last_update_on)::float8 "
+                f"FROM pyrogram_peers WHERE session_name = %s AND {column} = %s "
+                "ORDER BY last_update_on DESC LIMIT 1",
+                (self.name, value),
+            )
+            row = await cur.fetchone()
+        if row is None:
+            return None
+        entry = (tuple(row[:5]), row[5])
+        self._peers.set(row[0], entry)
+        return entry
+
+    async def get_peer_by_id(self, peer_id: int) -> Any:
+        entry = self._peers.get(peer_id) or await self._fetch_peer("id", peer_id)
+        if entry is None:
+            raise KeyError(f"ID not found: {peer_id}")
+        return get_input_peer(*entry[0][:3])
+
+    async def get_peer_by_username(self, username: str) -> Any:
+        entry = await self._fetch_peer("username", username)
+        if entry is None:
+            raise KeyError(f"Username not found: {username}")
+        if abs(time.time() - entry[1]) > self.USERNAME_TTL:
+            raise KeyError(f"Username expired: {username}")
+        return get_input_peer(*entry[0][:3])
+
+    async def get_peer_by_phone_number(self, phone_number: str) -> Any:
+        entry = await self._fetch_peer("phone_number", phone_number)
+        if entry is None:
+            raise KeyError(f"Phone number not found: {phone_number}")
+        return get_input_peer(*entry[0][:3])
+
+    async def _accessor(self, field: str, value: Any) -> Any:
+        if value is object:
+            return self._session.get(field)
+        self._session[field] = value
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            await conn.execute(
+                f"UPDATE pyrogram_sessions SET {field} = %s WHERE name = %s",
+                (value, self.name),
+            )
+
+    async def dc_id(self, value: int = object) -> Any:
+        return await self._accessor("dc_id", value)
+
+    async def api_id(self, value: int = object) -> Any:
+        return await self._accessor("api_id", value)
+
+    async def test_mode(self, value: bool = object) -> Any:
+        return await self._accessor("test_mode", value)
+
+    async def auth_key(self, value: bytes = object) -> Any:
+        return await self._accessor("auth_key", value)
+
+    async def date(self, value: int = object) -> Any:
+        return await self._accessor("date", value)
+
+    async def user_id(self, value: int = object) -> Any:
+        return await self._accessor("user_id", value)
+
+    async def is_bot(self, value: bool = object) -> Any:
+        return await self._accessor("is_bot", value)
+
+
+__all__ = ["PostgresStorage"]
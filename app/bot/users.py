@@ -0,0 +1,94 @@
+"""
+تسجيل المستخدمين وتحديث بياناتهم
+"""
+
+import logging
+from typing import Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.settings import get_settings
+from app.db import queries
+from app.db.pool import get_pool
+from app.bot.channels import ChannelManager
+
+
+logger = logging.getLogger(__name__)
+
+
+Profile = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+_settings = get_settings()
+# آخر بيانات كُتبت لكل مستخدم في هذه العملية
+_fingerprints: TTLCache[int, Profile] = TTLCache(maxsize=_settings.cache_maxsize, ttl=_settings.cache_ttl)
+
+
+class UserManager:
+    """مدير بيانات المستخدمين"""
+
+    @staticmethod
+    def _params(
+        user_id: int,
+        username: Optional[str],
+        first_name: Optional[str],
+        last_name: Optional[str],
+        language_code: Optional[str],
+    ) -> dict:
+        return {
+            "user_id": user_id,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+            "language_code": language_code,
+        }
+
+    @staticmethod
+    def is_known(user_id: int, profile: Profile) -> bool:
+        """هل كُتبت هذه البيانات نفسها مؤخراً؟"""
+        return _fingerprints.get(user_id) == profile
+
+    @staticmethod
+    async def upsert(
+        user_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        language_code: Optional[str] = None,
+    ) -> None:
+        """تسجيل المستخدم أو تحديث بياناته، دون أي استعلام إن لم تتغير"""
+        profile = (username, first_name, last_name, language_code)
+        if UserManager.is_known(user_id, profile):
+            return
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            await queries.execute(
+                conn,
+                queries.UPSERT_USER,
+                UserManager._params(user_id, username, first_name, last_name, language_code),
+            )
+        _fingerprints.set(user_id, profile)
+
+    @staticmethod
+    async def upsert_and_count(
+        user_id: int,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        language_code: Optional[str] = None,
+    ) -> int:
+        """تسجيل المستخدم وإرجاع عدد قنواته في رحلة واحدة لقاعدة البيانات"""
+        profile = (username, first_name, last_name, language_code)
+        if UserManager.is_known(user_id, profile):
+            return await ChannelManager.get_channel_count(user_id)
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            cur = await queries.execute(
+                conn,
+                queries.UPSERT_USER_AND_COUNT,
+                UserManager._params(user_id, username, first_name, last_name, language_code),
+            )
+            result = await cur.fetchone()
+        _fingerprints.set(user_id, profile)
+        return result[0] if result else 0
+
+
+__all__ = ["UserManager"]
@@ -1,49 +1,190 @@
 import asyncio
 import logging
-from typing import Awaitable, Callable, Optional
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional
 
 
 logger = logging.getLogger(__name__)
 
 
+Job = Callable[[], Awaitable[None]]
+
+# مستويات الأولوية: الأصغر يُنفذ أولاً
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_BULK)
+
+
+class _Lane:
+    """Jobs of one key waiting to run, one FIFO per priority level."""
+
+    __slots__ = ("jobs", "running", "scheduled")
+
+    def __init__(self) -> None:
+        self.jobs: Dict[int, Deque[Job]] = {p: deque() for p in PRIORITIES}
+        self.running = False
+        # أعلى أولوية أُدرج بها المفتاح في طوابير الجاهزية (None إن لم يُدرج)
+        self.scheduled: Optional[int] = None
+
+    def head(self) -> Optional[int]:
+        for priority in PRIORITIES:
+            if self.jobs[priority]:
+                return priority
+        return None
+
+
 class BackgroundTaskQueue:
-    def __init__(self, maxsize: int = 1000) -> None:
-        self._queue: asyncio.Queue[Callable[[], Awaitable[None]]] = asyncio.Queue(maxsize=maxsize)
-        self._worker_task: Optional[asyncio.Task[None]] = None
+    """Pool of worker coroutines sharing one set of priority queues.
+
+    Jobs that share a ``key`` (user or chat id) run one at a time in
+    submission order (per priority level); any free worker picks up the next
+    key with work waiting, so a slow job only delays later jobs of its own
+    key. Jobs without a key never wait for each other. Each priority level
+    has its own capacity, so bulk work can never fill the slots needed by
+    high-priority jobs, and workers always take higher priorities first.
+    """
+
+    def __init__(self, maxsize: int = 1000, workers: int = 1) -> None:
+        self._workers = max(1, workers)
+        self._maxsize = maxsize
+        self._lanes: Dict[Hashable, _Lane] = {}
+        # المفاتيح التي لديها مهمة جاهزة ولا تُنفذ لها مهمة حالياً
+        self._ready: Dict[int, Deque[Hashable]] = {p: deque() for p in PRIORITIES}
+        self._signal = asyncio.Semaphore(0)
+        self._queued: Dict[int, int] = {p: 0 for p in PRIORITIES}
+        self._space = asyncio.Condition()
+        self._worker_tasks: List[asyncio.Task[None]] = []
         self._stop_event = asyncio.Event()
 
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def qsize(self) -> int:
+        return sum(self._queued.values())
+
+    def _full(self, priority: int) -> bool:
+        return self._maxsize > 0 and self._queued[priority] >= self._maxsize
+
+    def _schedule(self, key: Hashable, lane: _Lane) -> None:
+        priority = lane.head()
+        if lane.running or priority is None:
+            return
+        if lane.scheduled is None or priority < lane.scheduled:
+            # إدراج أقدم بأولوية أدنى يصبح قديماً ويُتجاهل عند سحبه
+            lane.scheduled = priority
+            self._ready[priority].append(key)
+            self._signal.release()
+
+    def _admit(self, job: Job, key: Optional[Hashable], priority: int) -> None:
+        if key is None:
+            # مهمة بلا مفتاح: مسار خاص بها لا ينتظر غيرها
+            key = object()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane()
+        lane.jobs[priority].append(job)
+        self._queued[priority] += 1
+        self._schedule(key, lane)
+
+    def _take(self) -> Optional[Hashable]:
+        for priority in PRIORITIES:
+            ready = self._ready[priority]
+            while ready:
+                key = ready.popleft()
+                lane = self._lanes.get(key)
+                if lane is not None and not lane.running and lane.scheduled == priority:
+                    return key
+        return None
+
+    async def _run_next(self) -> None:
+        key = self._take()
+        if key is None:
+            return
+        lane = self._lanes[key]
+        priority = lane.head()
+        assert priority is not None
+        job = lane.jobs[priority].popleft()
+        lane.running = True
+        lane.scheduled = None
+        self._queued[priority] -= 1
+        async with self._space:
+            self._space.notify_all()
+        try:
+            await job()
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Background job failed: %s", exc)
+        finally:
+            lane.running = False
+            if lane.head() is None:
+                del self._lanes[key]
+            else:
+                self._schedule(key, lane)
+
     async def start(self) -> None:
-        if self._worker_task is not None:
+        if self._worker_tasks:
             return
+        self._stop_event.clear()
 
-        async def worker() -> None:
-            logger.info("Background queue worker started")
+        async def worker(index: int) -> None:
+            logger.info("Background queue worker %d started", index)
             try:
                 while not self._stop_event.is_set():
                     try:
-                        job = await asyncio.wait_for(self._queue.get(), timeout=0.5)
+                        await asyncio.wait_for(self._signal.acquire(), timeout=0.5)
                     except asyncio.TimeoutError:
                         continue
-                    try:
-                        await job()
-                    except Exception as exc:  # noqa: BLE001
-                        logger.exception("Background job failed: %s", exc)
-                    finally:
-                        self._queue.task_done()
+                    await self._run_next()
             finally:
-                logger.info("Background queue worker stopped")
+                logger.info("Background queue worker %d stopped", index)
 
-        self._worker_task = asyncio.create_task(worker())
+        self._worker_tasks = [asyncio.create_task(worker(i)) for i in range(self._workers)]
 
     async def stop(self) -> None:
         self._stop_event.set()
-        if self._worker_task is not None:
-            await self._worker_task
-            self._worker_task = None
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks)
+            self._worker_tasks = []
 
-    def enqueue(self, coro_factory: Callable[[], Awaitable[None]]) -> None:
-        try:
-            self._queue.put_nowait(coro_factory)
-        except asyncio.QueueFull:
-            logger.warning("Background queue is full; dropping job")
+    def enqueue(
+        self,
+        coro_factory: Job,
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> bool:
+        """Queue a job without waiting; return False if its priority level is full."""
+        if self._full(priority):
+            logger.warning("Background queue is full (priority %d); rejecting job", priority)
+            return False
+        self._admit(coro_factory, key, priority)
+        return True
+
+    async def put(
+        self,
+        coro_factory: Job,
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Queue a job, waiting up to ``timeout`` seconds for capacity.
 
+        Returns False when the deadline passes so the caller can push back
+        (e.g. answer Telegram with 503 and let it redeliver the update).
+        """
+        if self._full(priority):
+            if timeout is not None and timeout <= 0:
+                logger.warning("Background queue is full (priority %d); applying backpressure", priority)
+                return False
+            try:
+                async with self._space:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: not self._full(priority)), timeout=timeout
+                    )
+                    self._admit(coro_factory, key, priority)
+                    return True
+            except asyncio.TimeoutError:
+                logger.warning("Background queue is full (priority %d); applying backpressure", priority)
+                return False
+        self._admit(coro_factory, key, priority)
+        return True
@@ -0,0 +1,238 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+from app.core.settings import Settings, get_settings
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - optional speed-up
+    _loads = json.loads
+
+
+logger = logging.getLogger(__name__)
+
+
+ChatId = Union[int, str]
+
+# مهلة القراءة لكل method بالثواني؛ getUpdates تُضاف إليها مدة الـ long polling
+READ_TIMEOUTS: Dict[str, float] = {
+    "sendMessage": 10.0,
+    "editMessageText": 10.0,
+    "copyMessage": 10.0,
+    "answerCallbackQuery": 5.0,
+    "setWebhook": 15.0,
+    "deleteWebhook": 15.0,
+    "getUpdates": 10.0,
+}
+
+
+class BotAPIError(Exception):
+    """A Bot API response with ``ok: false``."""
+
+    def __init__(self, method: str, error_code: int, description: str, retry_after: Optional[int] = None) -> None:
+        super().__init__(f"{method}: [{error_code}] {description}")
+        self.method = method
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+
+class BotAPI:
+    """One pooled HTTP client for the Telegram Bot API.
+
+    Connections are kept alive and, when the optional ``h2`` package is
+    installed, multiplexed over HTTP/2, so calls after the first skip the
+    TCP and TLS handshakes. Each method gets its own read timeout from
+    ``READ_TIMEOUTS``.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = "https://api.telegram.org",
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed, Bot API client falls back to HTTP/1.1")
+                http2 = False
+        self._url = f"{base_url.rstrip('/')}/bot{token}/"
+        self._connect_timeout = connect_timeout
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(10.0, connect=connect_timeout),
+            transport=transport,
+        )
+
+    async def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Call ``method`` with a JSON body and return its ``result``; raises ``BotAPIError``."""
+        read = timeout if timeout is not None else READ_TIMEOUTS.get(method, 10.0)
+        response = await self._client.post(
+            self._url + method,
+            json={k: v for k, v in (params or {}).items() if v is not None},
+            timeout=httpx.Timeout(read, connect=self._connect_timeout),
+        )
+        try:
+            payload = _loads(response.content)
+        except ValueError:
+            raise BotAPIError(method, response.status_code, response.text[:200]) from None
+        if not payload.get("ok"):
+            parameters = payload.get("parameters") or {}
+            raise BotAPIError(
+                method,
+                payload.get("error_code", response.status_code),
+                payload.get("description", ""),
+                parameters.get("retry_after"),
+            )
+        return payload.get("result")
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def send_message(
+        self,
+        chat_id: ChatId,
+        text: str,
+        parse_mode: Optional[str] = None,
+        entities: Optional[List[Dict[str, Any]]] = None,
+        reply_markup: Optional[Dict[str, Any]] = None,
+        disable_web_page_preview: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        return await self.call("sendMessage", {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "entities": entities,
+            "reply_markup": reply_markup,
+            "disable_web_page_preview": disable_web_page_preview,
+        })
+
+    async def edit_message_text(
+        self,
+        chat_id: ChatId,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        entities: Optional[List[Dict[str, Any]]] = None,
+        reply_markup: Optional[Dict[str, Any]] = None,
+        disable_web_page_preview: Optional[bool] = None,
+    ) -> Union[Dict[str, Any], bool]:
+        return await self.call("editMessageText", {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "entities": entities,
+            "reply_markup": reply_markup,
+            "disable_web_page_preview": disable_web_page_preview,
+        })
+
+    async def copy_message(
+        self,
+        chat_id: ChatId,
+        from_chat_id: ChatId,
+        message_id: int,
+        caption: Optional[str] = None,
+        parse_mode: Optional[str] = None,
+        caption_entities: Optional[List[Dict[str, Any]]] = None,
+        reply_markup: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return await self.call("copyMessage", {
+            "chat_id": chat_id,
+            "from_chat_id": from_chat_id,
+            "message_id": message_id,
+            "caption": caption,
+            "parse_mode": parse_mode,
+            "caption_entities": caption_entities,
+            "reply_markup": reply_markup,
+        })
+
+    async def answer_callback_query(
+        self,
+        callback_query_id: str,
+        text: Optional[str] = None,
+        show_alert: Optional[bool] = None,
+        url: Optional[str] = None,
+        cache_time: Optional[int] = None,
+    ) -> bool:
+        return await self.call("answerCallbackQuery", {
+            "callback_query_id": callback_query_id,
+            "text": text,
+            "show_alert": show_alert,
+            "url": url,
+            "cache_time": cache_time,
+        })
+
+    async def set_webhook(
+        self,
+        url: str,
+        allowed_updates: Optional[List[str]] = None,
+        secret_token: Optional[str] = None,
+        drop_pending_updates: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+    ) -> bool:
+        return await self.call("setWebhook", {
+            "url": url,
+            "allowed_updates": allowed_updates,
+            "secret_token": secret_token,
+            "drop_pending_updates": drop_pending_updates,
+            "max_connections": max_connections,
+        })
+
+    async def delete_webhook(self, drop_pending_updates: Optional[bool] = None) -> bool:
+        return await self.call("deleteWebhook", {"drop_pending_updates": drop_pending_updates})
+
+    async def get_updates(
+        self,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        timeout: int = 0,
+        allowed_updates: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Long-poll for updates; the read timeout covers the server-side wait."""
+        return await self.call(
+            "getUpdates",
+            {"offset": offset, "limit": limit, "timeout": timeout, "allowed_updates": allowed_updates},
+            timeout=READ_TIMEOUTS["getUpdates"] + timeout,
+        )
+
+
+_bot_api: Optional[BotAPI] = None
+
+
+def get_bot_api(settings: Optional[Settings] = None) -> BotAPI:
+    """Return the application-wide Bot API client."""
+    global _bot_api
+    if _bot_api is None:
+        settings = settings or get_settings()
+        _bot_api = BotAPI(
+            settings.bot_token,
+            base_url=settings.bot_api_url,
+            http2=settings.bot_api_http2,
+            max_connections=settings.bot_api_max_connections,
+        )
+    return _bot_api
+
+
+async def close_bot_api() -> None:
+    global _bot_api
+    if _bot_api is not None:
+        await _bot_api.close()
+        _bot_api = None
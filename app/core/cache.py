@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.core.settings import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded LRU mapping whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        self._data[key] = (self._clock() + (self._ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class MemoryCache:
+    """Async cache facade over a per-process ``TTLCache``."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0) -> None:
+        self._cache: TTLCache[str, Any] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.pop(key)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def _decode(obj: dict) -> Any:
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class RedisCache:
+    """Async cache shared by all processes through Redis (JSON values).
+
+    Redis failures are logged and treated as cache misses, so callers fall
+    back to the database instead of failing.
+    """
+
+    def __init__(self, redis: Any, namespace: str, ttl: float = 300.0) -> None:
+        self._redis = redis
+        self._prefix = f"cache:{namespace}:"
+        self._ttl = ttl
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self._redis.get(self._prefix + key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis cache get failed: %s", exc)
+            return None
+        if raw is None:
+            return None
+        return json.loads(raw, object_hook=_decode)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await self._redis.set(
+                self._prefix + key,
+                json.dumps(value, default=_encode),
+                px=int((self._ttl if ttl is None else ttl) * 1000),
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis cache set failed: %s", exc)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._redis.delete(*(self._prefix + key for key in keys))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis cache delete failed: %s", exc)
+
+
+def create_cache(namespace: str, settings: Optional[Settings] = None) -> Any:
+    """Build the cache selected by ``CACHE_BACKEND`` (memory or redis)."""
+    settings = settings or get_settings()
+    if settings.cache_backend == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisCache(get_redis(), namespace, ttl=settings.cache_ttl)
+    return MemoryCache(maxsize=settings.cache_maxsize, ttl=settings.cache_ttl)
@@ -0,0 +1,91 @@
+import logging
+from collections import deque
+from typing import Any, Deque, Optional, Set
+
+from app.core.settings import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDeduplicator:
+    """Remember the last ``window`` update ids seen by this process.
+
+    A ring buffer keeps insertion order for eviction and a set answers
+    membership, so both checks and inserts are O(1) with bounded memory.
+    """
+
+    def __init__(self, window: int = 10000) -> None:
+        self._order: Deque[int] = deque()
+        self._seen: Set[int] = set()
+        self._window = window
+        self.duplicates = 0
+
+    async def seen(self, update_id: int) -> bool:
+        """Record ``update_id``; return True if it was already recorded."""
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self._window:
+            self._seen.discard(self._order.popleft())
+        return False
+
+    async def forget(self, update_id: int) -> None:
+        """Drop ``update_id`` so a redelivery of it is processed again."""
+        if update_id in self._seen:
+            self._seen.discard(update_id)
+            self._order.remove(update_id)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "window": len(self._order), "duplicates": self.duplicates}
+
+
+class RedisDeduplicator:
+    """Update ids claimed with ``SET NX EX`` so every process sees them.
+
+    When Redis is unreachable the check falls back to a per-process
+    ``MemoryDeduplicator`` rather than dropping or double-processing.
+    """
+
+    def __init__(self, redis: Any, ttl: float = 3600.0, window: int = 10000, prefix: str = "update:") -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self._prefix = prefix
+        self._local = MemoryDeduplicator(window)
+        self.duplicates = 0
+
+    async def seen(self, update_id: int) -> bool:
+        try:
+            claimed = await self._redis.set(f"{self._prefix}{update_id}", 1, nx=True, px=int(self._ttl * 1000))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis dedup check failed: %s", exc)
+            return await self._local.seen(update_id)
+        if not claimed:
+            self.duplicates += 1
+            return True
+        return False
+
+    async def forget(self, update_id: int) -> None:
+        await self._local.forget(update_id)
+        try:
+            await self._redis.delete(f"{self._prefix}{update_id}")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis dedup forget failed: %s", exc)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "duplicates": self.duplicates + self._local.duplicates,
+        }
+
+
+def create_deduplicator(settings: Optional[Settings] = None) -> Any:
+    """Build the deduplicator selected by ``DEDUP_BACKEND`` (memory or redis)."""
+    settings = settings or get_settings()
+    if settings.dedup_backend == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisDeduplicator(get_redis(), ttl=settings.dedup_ttl, window=settings.dedup_window)
+    return MemoryDeduplicator(window=settings.dedup_window)
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.settings import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# يُستدعى بالمفتاح المُبطل، أو None لإفراغ كل ما في الذاكرة لهذا النطاق
+Handler = Callable[[Optional[str]], None]
+
+
+class MemoryInvalidationBus:
+    """Invalidate per-process caches in this process only (single-process deployments)."""
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def subscribe(self, namespace: str, handler: Handler) -> None:
+        self._handlers.setdefault(namespace, []).append(handler)
+
+    def _dispatch(self, namespace: str, key: Optional[str]) -> None:
+        for handler in self._handlers.get(namespace, ()):
+            try:
+                handler(key)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Cache invalidation handler for %s failed: %s", namespace, exc)
+
+    async def publish(self, namespace: str, key: str) -> None:
+        self._dispatch(namespace, key)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisInvalidationBus(MemoryInvalidationBus):
+    """Broadcast invalidations of per-process caches to every process over Redis pub/sub.
+
+    ``publish`` applies the invalidation locally at once and broadcasts it;
+    a listener task applies the ones published by other processes. Messages
+    sent while the listener was disconnected are lost, so after reconnecting
+    every subscribed namespace is emptied instead.
+    """
+
+    def __init__(self, redis: Any, channel: str = "cache:invalidate", retry_delay: float = 1.0) -> None:
+        super().__init__()
+        self._redis = redis
+        self._channel = channel
+        self._retry_delay = retry_delay
+        self._origin = uuid.uuid4().hex
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def publish(self, namespace: str, key: str) -> None:
+        self._dispatch(namespace, key)
+        try:
+            await self._redis.publish(self._channel, json.dumps([self._origin, namespace, key]))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis invalidation publish failed: %s", exc)
+
+    async def start(self) -> None:
+        if self._task is None:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(self._channel)
+            self._task = asyncio.create_task(self._listen(pubsub), name="cache-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _apply(self, data: Any) -> None:
+        try:
+            origin, namespace, key = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed invalidation message: %r", data)
+            return
+        if origin != self._origin:
+            self._dispatch(namespace, key)
+
+    async def _listen(self, pubsub: Any) -> None:
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(timeout=1.0)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Redis invalidation listener failed: %s", exc)
+                    await asyncio.sleep(self._retry_delay)
+                    # قد تكون رسائل فاتتنا أثناء الانقطاع: نفرغ كل النطاقات
+                    for namespace in list(self._handlers):
+                        self._dispatch(namespace, None)
+                    continue
+                if message is not None and message.get("type") == "message":
+                    self._apply(message["data"])
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+def create_invalidation_bus(settings: Optional[Settings] = None) -> Any:
+    """Build the bus for ``CACHE_BACKEND``: Redis pub/sub when caches are shared across processes."""
+    settings = settings or get_settings()
+    if settings.cache_backend == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisInvalidationBus(get_redis())
+    return MemoryInvalidationBus()
+
+
+_bus: Optional[Any] = None
+
+
+def get_invalidation_bus() -> Any:
+    """Return the shared invalidation bus."""
+    global _bus
+    if _bus is None:
+        _bus = create_invalidation_bus()
+    return _bus
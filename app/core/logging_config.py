@@ -1,17 +1,31 @@
 import logging
+import re
 import sys
 
 
+# توكن البوت جزء من مسار Bot API (/bot<token>/method)، فلا يجوز أن يظهر في السجلات
+_TOKEN_RE = re.compile(r"bot\d+:[A-Za-z0-9_-]+")
+
+
+class RedactingFormatter(logging.Formatter):
+    """Formatter that masks bot tokens anywhere in the record, tracebacks included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return _TOKEN_RE.sub("bot<redacted>", super().format(record))
+
+
 def configure_logging() -> None:
     root_logger = logging.getLogger()
     if root_logger.handlers:
         return
     handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
+    formatter = RedactingFormatter(
         fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s",
         datefmt="%Y-%m-%dT%H:%M:%S%z",
     )
     handler.setFormatter(formatter)
     root_logger.addHandler(handler)
     root_logger.setLevel(logging.INFO)
-
+    # httpx يسجل كل طلب بعنوانه الكامل (وفيه التوكن) على مستوى INFO
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
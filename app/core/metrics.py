@@ -0,0 +1,47 @@
+import bisect
+from typing import Dict, Sequence, Tuple
+
+
+# حدود الأعمدة بالثواني
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Cumulative latency histogram with count/sum/max, cheap enough for hot paths."""
+
+    __slots__ = ("_bounds", "_counts", "count", "total", "max", "errors")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        self._counts[bisect.bisect_left(self._bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        buckets: Dict[str, int] = {}
+        running = 0
+        for bound, n in zip(self._bounds, self._counts):
+            running += n
+            buckets[f"le_{bound:g}"] = running
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_ms": round(self.total * 1000, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": buckets,
+        }
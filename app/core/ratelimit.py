@@ -0,0 +1,44 @@
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second up to ``capacity``.
+
+    The bucket never sleeps itself: callers ask how long until a token is
+    available (``delay``) and take it (``consume``) once they are ready, which
+    lets one caller wait on several buckets at the same time.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated", "_clock")
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> float:
+        now = self._clock()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+        return now
+
+    def delay(self) -> float:
+        """Seconds until one token is available (0 when it is available now)."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def consume(self) -> None:
+        self._refill()
+        self._tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """Empty the bucket so no token is available for ``seconds`` (server-side FloodWait)."""
+        self._refill()
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
@@ -0,0 +1,24 @@
+from typing import Any, Optional
+
+from app.core.settings import get_settings
+
+
+_redis: Optional[Any] = None
+
+
+def get_redis() -> Any:
+    """Return the shared ``redis.asyncio`` client built from ``REDIS_URL``."""
+    global _redis
+    if _redis is None:
+        import redis.asyncio as aioredis
+
+        settings = get_settings()
+        _redis = aioredis.from_url(settings.redis_url)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
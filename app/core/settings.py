@@ -21,6 +21,61 @@ class Settings:
         self.redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
         self.webhook_secret: str = os.getenv("WEBHOOK_SECRET", "")
         self.webhook_path: str = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+        # webhook أو polling، و auto تختار polling عند غياب WEBHOOK_BASE
+        self.ingest_mode: str = os.getenv("INGEST_MODE", "auto").lower()
+        self.poll_timeout: int = int(os.getenv("POLL_TIMEOUT", "30"))
+        self.poll_limit: int = int(os.getenv("POLL_LIMIT", "100"))
+        # تجمع اتصالات قاعدة البيانات (المدد بالثواني)
+        self.db_pool_min: int = int(os.getenv("DB_POOL_MIN", "2"))
+        self.db_pool_max: int = int(os.getenv("DB_POOL_MAX", "10"))
+        self.db_pool_max_idle: float = float(os.getenv("DB_POOL_MAX_IDLE", "600"))
+        self.db_pool_max_lifetime: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+        self.db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        # فترة فحص الاتصالات الخاملة في الخلفية بالثواني (0 يعطّله)
+        self.db_pool_check_interval: float = float(os.getenv("DB_POOL_CHECK_INTERVAL", "60"))
+        # تعطيلها خلف PgBouncer بوضع transaction
+        self.db_prepare: bool = os.getenv("DB_PREPARE", "true").lower() in ("1", "true", "yes")
+        self.bg_workers: int = int(os.getenv("BG_WORKERS", "8"))
+        self.bg_queue_size: int = int(os.getenv("BG_QUEUE_SIZE", "1000"))
+        # مهلة انتظار مكان في الطابور قبل الرد بـ 503 ليعيد Telegram الإرسال
+        self.bg_enqueue_timeout: float = float(os.getenv("BG_ENQUEUE_TIMEOUT", "2.0"))
+        # memory: طابور داخل العملية، redis: Redis Streams مشترك بين العمليات
+        self.queue_backend: str = os.getenv("QUEUE_BACKEND", "memory").lower()
+        self.queue_stream: str = os.getenv("QUEUE_STREAM", "updates")
+        self.queue_group: str = os.getenv("QUEUE_GROUP", "workers")
+        self.queue_consumer: str = os.getenv("QUEUE_CONSUMER", "")
+        self.queue_claim_idle: float = float(os.getenv("QUEUE_CLAIM_IDLE", "60"))
+        self.queue_max_deliveries: int = int(os.getenv("QUEUE_MAX_DELIVERIES", "5"))
+        # memory: كاش داخل العملية (LRU + TTL)، redis: كاش مشترك بين العمليات
+        self.cache_backend: str = os.getenv("CACHE_BACKEND", "memory").lower()
+        self.cache_ttl: float = float(os.getenv("CACHE_TTL", "300"))
+        self.cache_maxsize: int = int(os.getenv("CACHE_MAXSIZE", "10000"))
+        # حالات المحادثة (انتظار إدخال القنوات أو الهيدر...) وتنتهي بعد STATE_TTL ثانية
+        self.state_backend: str = os.getenv("STATE_BACKEND", "memory").lower()
+        self.state_ttl: float = float(os.getenv("STATE_TTL", "900"))
+        # تجاهل التحديثات المكررة حسب update_id (إعادة الإرسال من Telegram)
+        self.dedup_backend: str = os.getenv("DEDUP_BACKEND", "memory").lower()
+        self.dedup_window: int = int(os.getenv("DEDUP_WINDOW", "10000"))
+        self.dedup_ttl: float = float(os.getenv("DEDUP_TTL", "3600"))
+        # حدود Telegram للإرسال: عام لكل بوت، ولكل محادثة خاصة، ولكل مجموعة/قناة
+        self.send_global_rate: float = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+        self.send_chat_rate: float = float(os.getenv("SEND_CHAT_RATE", "1"))
+        self.send_group_per_minute: float = float(os.getenv("SEND_GROUP_PER_MINUTE", "20"))
+        self.send_rpc_rate: float = float(os.getenv("SEND_RPC_RATE", "30"))
+        # mtproto: الإرسال عبر Pyrogram، http: عبر Bot API بعميل HTTP مشترك
+        self.send_transport: str = os.getenv("SEND_TRANSPORT", "mtproto").lower()
+        self.bot_api_url: str = os.getenv("BOT_API_URL", "https://api.telegram.org")
+        self.bot_api_http2: bool = os.getenv("BOT_API_HTTP2", "true").lower() in ("1", "true", "yes")
+        self.bot_api_max_connections: int = int(os.getenv("BOT_API_MAX_CONNECTIONS", "100"))
+        # عدد القنوات التي يُتحقق منها بالتوازي عند الإضافة الجماعية
+        self.channel_check_concurrency: int = int(os.getenv("CHANNEL_CHECK_CONCURRENCY", "8"))
+        # مدة تخزين نتائج تحليل القنوات الناجحة والفاشلة بالثواني
+        self.resolver_ttl: float = float(os.getenv("RESOLVER_TTL", "600"))
+        self.resolver_negative_ttl: float = float(os.getenv("RESOLVER_NEGATIVE_TTL", "60"))
+        # تسخين ذاكرة الـ peers عند الإقلاع: حجم الدفعة وعدد الدفعات في الثانية
+        self.peer_warmup: bool = os.getenv("PEER_WARMUP", "true").lower() in ("1", "true", "yes")
+        self.peer_warmup_batch: int = int(os.getenv("PEER_WARMUP_BATCH", "100"))
+        self.peer_warmup_rate: float = float(os.getenv("PEER_WARMUP_RATE", "1"))
 
 
 @lru_cache(maxsize=1)
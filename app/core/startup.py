@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+
+logger = logging.getLogger(__name__)
+
+
+StepFn = Callable[[], Awaitable[Any]]
+
+
+class _Step:
+    __slots__ = ("name", "fn", "after", "critical", "status", "started", "seconds", "error")
+
+    def __init__(self, name: str, fn: StepFn, after: Sequence[str], critical: bool) -> None:
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.critical = critical
+        self.status = "pending"
+        self.started: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class Startup:
+    """Run startup steps as a dependency graph, each as soon as its dependencies finish.
+
+    Steps are declared with ``add`` and may only depend on steps declared
+    before them, so the graph cannot contain cycles. ``run`` returns once
+    every critical step has finished (raising if one failed) and marks the
+    app ready; non-critical steps keep running in the background and their
+    failures are only logged. ``start`` runs the same graph as a background
+    task, so a server can answer readiness probes while it runs. Per-step
+    start offsets and durations are kept for ``stats``.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._steps: Dict[str, _Step] = {}
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self._clock = clock
+        self._started: Optional[float] = None
+        self._runner: Optional["asyncio.Task[None]"] = None
+        self.ready = False
+        self.failed = False
+        self.seconds: Optional[float] = None
+
+    def add(self, name: str, fn: StepFn, after: Sequence[str] = (), critical: bool = True) -> None:
+        if name in self._steps:
+            raise ValueError(f"Duplicate startup step {name!r}")
+        for dep in after:
+            if dep not in self._steps:
+                raise ValueError(f"Startup step {name!r} depends on undeclared step {dep!r}")
+        self._steps[name] = _Step(name, fn, after, critical)
+
+    async def _run_step(self, step: _Step) -> None:
+        try:
+            for dep in step.after:
+                await self._tasks[dep]
+        except Exception:
+            step.status = "skipped"
+            raise
+        step.status = "running"
+        step.started = self._clock()
+        try:
+            await step.fn()
+        except asyncio.CancelledError:
+            step.status = "cancelled"
+            raise
+        except Exception as exc:
+            step.status = "failed"
+            step.error = repr(exc)
+            raise
+        finally:
+            step.seconds = self._clock() - step.started
+        step.status = "done"
+
+    async def run(self) -> None:
+        self._started = self._clock()
+        for step in self._steps.values():
+            task = asyncio.create_task(self._run_step(step), name=f"startup:{step.name}")
+            if not step.critical:
+                task.add_done_callback(self._log_background)
+            self._tasks[step.name] = task
+        critical = [self._tasks[s.name] for s in self._steps.values() if s.critical]
+        try:
+            await asyncio.gather(*critical)
+        except Exception:
+            self.failed = True
+            logger.error("Startup failed: %s", self.stats()["steps"])
+            await self.stop()
+            raise
+        self.seconds = self._clock() - self._started
+        self.ready = True
+        logger.info(
+            "Ready after %.3fs: %s",
+            self.seconds,
+            ", ".join(f"{s.name}={s.seconds:.3f}s" for s in self._steps.values() if s.seconds is not None),
+        )
+
+    def start(self, on_failure: Optional[Callable[[BaseException], None]] = None) -> "asyncio.Task[None]":
+        """Run the graph in the background; ``on_failure`` gets the error of a failed critical step."""
+
+        def done(task: "asyncio.Task[None]") -> None:
+            if task.cancelled() or task.exception() is None:
+                return
+            if on_failure is not None:
+                on_failure(task.exception())
+            else:
+                logger.error("Startup failed: %r", task.exception())
+
+        self._runner = asyncio.create_task(self.run(), name="startup")
+        self._runner.add_done_callback(done)
+        return self._runner
+
+    def _log_background(self, task: "asyncio.Task[Any]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Startup step %s failed: %r", task.get_name(), task.exception())
+
+    async def stop(self) -> None:
+        """Cancel steps that are still running (e.g. on shutdown)."""
+        pending = [task for task in self._tasks.values() if not task.done()]
+        if self._runner is not None and not self._runner.done() and self._runner is not asyncio.current_task():
+            pending.append(self._runner)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        steps: Dict[str, Any] = {}
+        for step in self._steps.values():
+            steps[step.name] = {
+                "status": step.status,
+                "critical": step.critical,
+                "after": list(step.after),
+                "start": None if step.started is None or self._started is None
+                else round(step.started - self._started, 4),
+                "seconds": None if step.seconds is None else round(step.seconds, 4),
+            }
+            if step.error:
+                steps[step.name]["error"] = step.error
+        return {"ready": self.ready, "failed": self.failed, "seconds": self.seconds, "steps": steps}
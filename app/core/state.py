@@ -0,0 +1,79 @@
+import logging
+from typing import Any, Optional
+
+from app.core.cache import TTLCache
+from app.core.settings import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStateStore:
+    """Per-process conversation state; entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 900.0) -> None:
+        self._states: TTLCache[int, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, user_id: int) -> Optional[str]:
+        return self._states.get(user_id)
+
+    async def set(self, user_id: int, state: Optional[str]) -> None:
+        if state:
+            self._states.set(user_id, state)
+        else:
+            self._states.pop(user_id)
+
+
+class RedisStateStore:
+    """Conversation state shared by all processes through Redis.
+
+    Keys carry a TTL, so abandoned prompts expire on their own. Redis
+    failures are logged and read as "no state", which drops the user back
+    to the normal menu flow instead of failing the update.
+    """
+
+    def __init__(self, redis: Any, ttl: float = 900.0, prefix: str = "state:") -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self._prefix = prefix
+
+    async def get(self, user_id: int) -> Optional[str]:
+        try:
+            raw = await self._redis.get(f"{self._prefix}{user_id}")
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis state get failed: %s", exc)
+            return None
+        if isinstance(raw, bytes):
+            return raw.decode()
+        return raw
+
+    async def set(self, user_id: int, state: Optional[str]) -> None:
+        key = f"{self._prefix}{user_id}"
+        try:
+            if state:
+                await self._redis.set(key, state, px=int(self._ttl * 1000))
+            else:
+                await self._redis.delete(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Redis state set failed: %s", exc)
+
+
+def create_state_store(settings: Optional[Settings] = None) -> Any:
+    """Build the state store selected by ``STATE_BACKEND`` (memory or redis)."""
+    settings = settings or get_settings()
+    if settings.state_backend == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisStateStore(get_redis(), ttl=settings.state_ttl)
+    return MemoryStateStore(maxsize=settings.cache_maxsize, ttl=settings.state_ttl)
+
+
+_store: Optional[Any] = None
+
+
+def get_state_store() -> Any:
+    """Return the shared user state store."""
+    global _store
+    if _store is None:
+        _store = create_state_store()
+    return _store
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from app.core.background import PRIORITIES, PRIORITY_NORMAL, BackgroundTaskQueue
+from app.core.settings import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class MemoryUpdateQueue:
+    """Run update payloads through an in-process ``BackgroundTaskQueue``."""
+
+    def __init__(self, handler: UpdateHandler, maxsize: int = 1000, workers: int = 1) -> None:
+        self._handler = handler
+        self._queue = BackgroundTaskQueue(maxsize=maxsize, workers=workers)
+
+    async def start(self) -> None:
+        await self._queue.start()
+
+    async def stop(self) -> None:
+        await self._queue.stop()
+
+    def enqueue(
+        self,
+        payload: Dict[str, Any],
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+    ) -> bool:
+        return self._queue.enqueue(lambda: self._handler(payload), key=key, priority=priority)
+
+    async def put(
+        self,
+        payload: Dict[str, Any],
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        return await self._queue.put(
+            lambda: self._handler(payload), key=key, priority=priority, timeout=timeout
+        )
+
+
+class RedisStreamQueue:
+    """Durable update queue on Redis Streams with a consumer group.
+
+    Every priority level is a stream (``<stream>:<priority>``) shared by all
+    processes. Each process reads new entries with ``XREADGROUP``, runs them on
+    a local ``BackgroundTaskQueue`` (keeping per-key ordering inside the
+    process) and ``XACK``s them once the handler succeeds. Entries whose
+    handler raised, or that were left pending by a crashed or redeployed
+    consumer, are taken over with ``XAUTOCLAIM`` after ``claim_idle`` seconds.
+    An entry delivered ``max_deliveries`` times is moved to the
+    ``<stream>:dead`` stream and acknowledged instead of being retried again.
+
+    ``redis`` may be any object implementing the ``redis.asyncio`` stream
+    commands used here, which lets tests run against an in-process fake;
+    pass ``block=0`` for fakes that cannot block without stalling the loop.
+    """
+
+    def __init__(
+        self,
+        handler: UpdateHandler,
+        redis: Any,
+        stream: str = "updates",
+        group: str = "workers",
+        consumer: Optional[str] = None,
+        workers: int = 1,
+        batch: int = 32,
+        maxlen: int = 100_000,
+        claim_idle: float = 60.0,
+        block: float = 0.5,
+        max_deliveries: int = 5,
+    ) -> None:
+        self._handler = handler
+        self._redis = redis
+        self._streams: Dict[int, str] = {p: f"{stream}:{p}" for p in PRIORITIES}
+        self._dead_stream = f"{stream}:dead"
+        self._max_deliveries = max(1, max_deliveries)
+        self._group = group
+        self._consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._batch = batch
+        self._maxlen = maxlen
+        self._claim_idle_ms = int(claim_idle * 1000)
+        self._block_ms = int(block * 1000) or None
+        # الطابور المحلي لا يتجاوز دفعة واحدة حتى تبقى البقية في Redis
+        self._local = BackgroundTaskQueue(maxsize=batch * len(PRIORITIES), workers=workers)
+        self._in_flight: Set[Tuple[str, str]] = set()
+        self._stop_event = asyncio.Event()
+        self._tasks: List[asyncio.Task[None]] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._stop_event.clear()
+        await self._ensure_groups()
+        await self._local.start()
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._claim_loop()),
+        ]
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+        # ما لم يُنفذ محلياً يبقى معلقاً في Redis ويُعاد تسليمه لمستهلك آخر
+        await self._local.stop()
+
+    async def put(
+        self,
+        payload: Dict[str, Any],
+        key: Optional[Hashable] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        fields = {"payload": json.dumps(payload), "key": "" if key is None else str(key)}
+        add = self._redis.xadd(self._streams[priority], fields, maxlen=self._maxlen, approximate=True)
+        try:
+            if timeout is not None and timeout > 0:
+                await asyncio.wait_for(add, timeout=timeout)
+            else:
+                await add
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to enqueue update to Redis stream: %s", exc)
+            return False
+        return True
+
+    async def _ensure_groups(self) -> None:
+        for stream in self._streams.values():
+            try:
+                # "0" حتى تُستهلك التحديثات المتراكمة أثناء التوقف
+                await self._redis.xgroup_create(stream, self._group, id="0", mkstream=True)
+            except Exception as exc:  # noqa: BLE001
+                if "BUSYGROUP" not in str(exc):
+                    raise
+
+    async def _submit(self, priority: int, entry_id: Any, fields: Dict[Any, Any]) -> None:
+        stream = self._streams[priority]
+        entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        marker = (stream, entry_id)
+        if marker in self._in_flight:
+            return
+        fields = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in fields.items()
+        }
+        try:
+            payload = json.loads(fields["payload"])
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Dropping malformed stream entry %s %s: %s", stream, entry_id, exc)
+            await self._redis.xack(stream, self._group, entry_id)
+            return
+        key = fields.get("key") or None
+
+        async def job() -> None:
+            try:
+                await self._handler(payload)
+            except Exception as exc:  # noqa: BLE001
+                # بلا XACK: يبقى معلقاً ويُعاد تسليمه عبر XAUTOCLAIM
+                logger.exception("Update %s %s failed, left pending for redelivery: %s", stream, entry_id, exc)
+                return
+            finally:
+                self._in_flight.discard(marker)
+            await self._redis.xack(stream, self._group, entry_id)
+
+        self._in_flight.add(marker)
+        await self._local.put(job, key=key, priority=priority)
+
+    async def _read_loop(self) -> None:
+        by_stream = {name: p for p, name in self._streams.items()}
+        while not self._stop_event.is_set():
+            if self._local.qsize() >= self._batch:
+                await asyncio.sleep(0.05)
+                continue
+            try:
+                response = await self._redis.xreadgroup(
+                    self._group,
+                    self._consumer,
+                    {name: ">" for name in self._streams.values()},
+                    count=self._batch,
+                    block=self._block_ms,
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Redis stream read failed: %s", exc)
+                await asyncio.sleep(1.0)
+                continue
+            if not response and self._block_ms is None:
+                await asyncio.sleep(0.05)
+                continue
+            entries = []
+            for name, messages in response or []:
+                name = name.decode() if isinstance(name, bytes) else name
+                for entry_id, fields in messages:
+                    entries.append((by_stream[name], entry_id, fields))
+            # الأولوية الأعلى أولاً ضمن الدفعة
+            entries.sort(key=lambda e: e[0])
+            for priority, entry_id, fields in entries:
+                await self._submit(priority, entry_id, fields)
+
+    async def _claim_loop(self) -> None:
+        interval = max(1.0, self._claim_idle_ms / 2000)
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            for priority, stream in self._streams.items():
+                try:
+                    await self._dead_letter(stream)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Redis stream dead-letter check failed: %s", exc)
+                try:
+                    await self._reclaim(priority, stream)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Redis stream claim failed: %s", exc)
+
+    async def _reclaim(self, priority: int, stream: str) -> None:
+        """Claim every entry idle for ``claim_idle``, following the XAUTOCLAIM cursor page by page."""
+        start_id: Any = "0-0"
+        while not self._stop_event.is_set():
+            result = await self._redis.xautoclaim(
+                stream,
+                self._group,
+                self._consumer,
+                min_idle_time=self._claim_idle_ms,
+                start_id=start_id,
+                count=self._batch,
+            )
+            messages = result[1] if len(result) > 1 else []
+            if messages:
+                logger.info("Reclaimed %d pending updates from %s", len(messages), stream)
+            for entry_id, fields in messages:
+                if fields is None:
+                    continue
+                await self._submit(priority, entry_id, fields)
+            start_id = result[0]
+            # المؤشر 0-0 يعني أن الفحص بلغ نهاية قائمة المعلقات
+            if start_id in (b"0-0", "0-0"):
+                return
+
+    async def _dead_letter(self, stream: str) -> None:
+        """Move idle entries that already used up ``max_deliveries`` to the dead-letter stream."""
+        start = "-"
+        while not self._stop_event.is_set():
+            pending = await self._redis.xpending_range(
+                stream, self._group, min=start, max="+", count=self._batch, idle=self._claim_idle_ms
+            )
+            for info in pending:
+                await self._dead_letter_one(stream, info)
+            if len(pending) < self._batch:
+                return
+            last = pending[-1]["message_id"]
+            # الصفحة التالية تبدأ بعد آخر معرف (حد غير شامل)
+            start = "(" + (last.decode() if isinstance(last, bytes) else last)
+
+    async def _dead_letter_one(self, stream: str, info: Dict[str, Any]) -> None:
+        if info["times_delivered"] < self._max_deliveries:
+            return
+        entry_id = info["message_id"]
+        entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        if (stream, entry_id) in self._in_flight:
+            return
+        entries = await self._redis.xrange(stream, min=entry_id, max=entry_id)
+        fields = dict(entries[0][1]) if entries else {}
+        fields.update({"stream": stream, "entry_id": entry_id, "deliveries": info["times_delivered"]})
+        await self._redis.xadd(self._dead_stream, fields, maxlen=self._maxlen, approximate=True)
+        await self._redis.xack(stream, self._group, entry_id)
+        logger.error(
+            "Update %s %s failed %s times; moved to %s",
+            stream, entry_id, info["times_delivered"], self._dead_stream,
+        )
+
+
+def create_update_queue(handler: UpdateHandler, settings: Optional[Settings] = None) -> Any:
+    """Build the update queue selected by ``QUEUE_BACKEND`` (memory or redis)."""
+    settings = settings or get_settings()
+    if settings.queue_backend == "redis":
+        from app.core.redis_client import get_redis
+
+        return RedisStreamQueue(
+            handler,
+            get_redis(),
+            stream=settings.queue_stream,
+            group=settings.queue_group,
+            consumer=settings.queue_consumer or None,
+            workers=settings.bg_workers,
+            claim_idle=settings.queue_claim_idle,
+            max_deliveries=settings.queue_max_deliveries,
+        )
+    return MemoryUpdateQueue(handler, maxsize=settings.bg_queue_size, workers=settings.bg_workers)
@@ -1,14 +1,19 @@
 import logging
 import asyncio
-import psycopg
+from typing import List, Tuple
 
-from app.core.settings import get_settings
+from psycopg import AsyncConnection
+from psycopg.errors import UndefinedTable
+
+from app.db.pool import get_pool
 
 
 logger = logging.getLogger(__name__)
 
 
-SCHEMA_SQL = """
+# الترحيلات المرقمة: لا يُعدَّل ترحيل بعد نشره، بل يُضاف ترحيل جديد بالرقم التالي
+MIGRATIONS: List[Tuple[int, str, str]] = [
+    (1, "initial schema", """
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     user_id BIGINT UNIQUE NOT NULL,
@@ -95,18 +100,153 @@ BEGIN
 END$$;
 
 CREATE INDEX IF NOT EXISTS idx_channel_settings_user_channel ON channel_settings(user_id, channel_id);
+"""),
+    (2, "users.channel_count", """
+-- عدد قنوات كل مستخدم محفوظ في صفه وتحدّثه المشغلات
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'users' AND column_name = 'channel_count'
+  ) THEN
+    ALTER TABLE users ADD COLUMN channel_count INTEGER NOT NULL DEFAULT 0;
+    UPDATE users u SET channel_count = c.cnt
+    FROM (SELECT user_id, COUNT(*) AS cnt FROM channels GROUP BY user_id) c
+    WHERE u.user_id = c.user_id;
+  END IF;
+END$$;
+
+CREATE OR REPLACE FUNCTION channels_count_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE users u SET channel_count = u.channel_count + n.cnt
+  FROM (SELECT user_id, COUNT(*) AS cnt FROM inserted_rows GROUP BY user_id) n
+  WHERE u.user_id = n.user_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION channels_count_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE users u SET channel_count = GREATEST(u.channel_count - d.cnt, 0)
+  FROM (SELECT user_id, COUNT(*) AS cnt FROM deleted_rows GROUP BY user_id) d
+  WHERE u.user_id = d.user_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname = 'channels_count_insert'
+  ) THEN
+    CREATE TRIGGER channels_count_insert
+    AFTER INSERT ON channels
+    REFERENCING NEW TABLE AS inserted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION channels_count_inserted();
+  END IF;
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger WHERE tgname = 'channels_count_delete'
+  ) THEN
+    CREATE TRIGGER channels_count_delete
+    AFTER DELETE ON channels
+    REFERENCING OLD TABLE AS deleted_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION channels_count_deleted();
+  END IF;
+END$$;
+"""),
+    (3, "pyrogram session and peers", """
+CREATE TABLE IF NOT EXISTS pyrogram_sessions (
+    name TEXT PRIMARY KEY,
+    dc_id INTEGER NOT NULL DEFAULT 2,
+    api_id INTEGER,
+    test_mode BOOLEAN,
+    auth_key BYTEA,
+    date BIGINT NOT NULL DEFAULT 0,
+    user_id BIGINT,
+    is_bot BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS pyrogram_peers (
+    session_name TEXT NOT NULL REFERENCES pyrogram_sessions(name) ON DELETE CASCADE,
+    id BIGINT NOT NULL,
+    access_hash BIGINT,
+    type TEXT NOT NULL,
+    username TEXT,
+    phone_number TEXT,
+    last_update_on TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (session_name, id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pyrogram_peers_username ON pyrogram_peers(session_name, username);
+"""),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# مفتاح القفل الاستشاري المشترك بين النسخ المتزامنة
+MIGRATION_LOCK_ID = 727_001
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
 """
 
 
+async def _current_version(conn: AsyncConnection) -> int:
+    try:
+        cur = await conn.execute("SELECT MAX(version) FROM schema_migrations")
+        row = await cur.fetchone()
+        return row[0] or 0
+    except UndefinedTable:
+        await conn.rollback()
+        return 0
+
+
+async def _apply_pending(conn: AsyncConnection) -> None:
+    """Apply missing migrations, one transaction each, while holding the advisory lock."""
+    await conn.commit()
+    await conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    try:
+        async with conn.transaction():
+            await conn.execute(SCHEMA_MIGRATIONS_SQL)
+        # نسخة أخرى ربما طبّقت الترحيلات أثناء انتظار القفل
+        cur = await conn.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in await cur.fetchall()}
+        await conn.commit()
+        for version, name, sql in MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info("Applying migration %s: %s", version, name)
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name),
+                )
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        await conn.commit()
+
+
 async def run_migrations() -> None:
-    settings = get_settings()
-    async with await psycopg.AsyncConnection.connect(settings.database_url) as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(SCHEMA_SQL)
-            await conn.commit()
-            logger.info("Database schema ensured")
+    """Bring the schema to ``LATEST_VERSION``.
+
+    When nothing is pending this is a single ``SELECT`` on a pooled connection.
+    """
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        current = await _current_version(conn)
+        if current >= LATEST_VERSION:
+            logger.info("Database schema up to date (version %s)", current)
+            return
+        await _apply_pending(conn)
+        logger.info("Database schema migrated to version %s", LATEST_VERSION)
 
 
 if __name__ == "__main__":
     asyncio.run(run_migrations())
-
@@ -1,24 +1,107 @@
-from psycopg_pool import AsyncConnectionPool
+import asyncio
+import logging
+import time
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 from psycopg import AsyncConnection
-from typing import Optional
+from typing import Any, Dict, Optional
 
+from app.core.metrics import Histogram
 from app.core.settings import get_settings
 
 
-_pool: Optional[AsyncConnectionPool] = None
+logger = logging.getLogger(__name__)
 
 
-async def get_pool() -> AsyncConnectionPool:
-    global _pool
+class InstrumentedPool(AsyncConnectionPool):
+    """Connection pool that records how long callers wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquire_wait = Histogram()
+
+    async def getconn(self, timeout: Optional[float] = None) -> AsyncConnection:
+        started = time.perf_counter()
+        try:
+            conn = await super().getconn(timeout=timeout)
+        except PoolTimeout:
+            self.acquire_wait.observe(time.perf_counter() - started, error=True)
+            raise
+        self.acquire_wait.observe(time.perf_counter() - started)
+        return conn
+
+
+_pool: Optional[InstrumentedPool] = None
+_pool_lock = asyncio.Lock()
+_check_task: Optional["asyncio.Task[None]"] = None
+
+
+def _reconnect_failed(pool: AsyncConnectionPool) -> None:
+    logger.error("Database pool %s failed to reconnect within its reconnect timeout", pool.name)
+
+
+async def _check_periodically(pool: InstrumentedPool, interval: float) -> None:
+    # فحص الاتصالات الخاملة في الخلفية بدل فحص كل اتصال عند تسليمه
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await pool.check()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Database pool check failed: %s", exc)
+
+
+async def get_pool() -> InstrumentedPool:
+    global _pool, _check_task
     if _pool is None:
-        settings = get_settings()
-        _pool = AsyncConnectionPool(conninfo=settings.database_url, min_size=1, max_size=10)
+        async with _pool_lock:
+            if _pool is None:
+                settings = get_settings()
+                pool = InstrumentedPool(
+                    conninfo=settings.database_url,
+                    min_size=settings.db_pool_min,
+                    max_size=settings.db_pool_max,
+                    max_idle=settings.db_pool_max_idle,
+                    max_lifetime=settings.db_pool_max_lifetime,
+                    timeout=settings.db_pool_timeout,
+                    reconnect_failed=_reconnect_failed,
+                    # بدون تحضير تلقائي للعبارات عند تعطيل DB_PREPARE
+                    kwargs=None if settings.db_prepare else {"prepare_threshold": None},
+                    open=False,
+                )
+                # فتح min_size اتصالات مسبقاً حتى لا يدفع أول طلب كلفة الاتصال
+                try:
+                    await pool.open(wait=True, timeout=settings.db_pool_timeout)
+                except BaseException:
+                    # تجمّع نصف مفتوح يُبقي عمّاله يحاولون الاتصال: نغلقه قبل إعادة الخطأ
+                    await pool.close()
+                    raise
+                if settings.db_pool_check_interval > 0:
+                    _check_task = asyncio.create_task(
+                        _check_periodically(pool, settings.db_pool_check_interval), name="db-pool-check"
+                    )
+                _pool = pool
     return _pool
 
 
+def pool_stats() -> Dict[str, Any]:
+    """Pool counters plus the acquire wait-time histogram."""
+    if _pool is None:
+        return {"open": False}
+    return {
+        "open": True,
+        "stats": _pool.get_stats(),
+        "acquire_wait": _pool.acquire_wait.snapshot(),
+    }
+
+
 async def close_pool() -> None:
-    global _pool
+    global _pool, _check_task
+    if _check_task is not None:
+        _check_task.cancel()
+        try:
+            await _check_task
+        except asyncio.CancelledError:
+            pass
+        _check_task = None
     if _pool is not None:
         await _pool.close()
         _pool = None
-
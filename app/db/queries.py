@@ -0,0 +1,100 @@
+"""Hot SQL statements, declared once and run as server-side prepared statements.
+
+psycopg keeps prepared statements per connection, so each pooled connection
+parses and plans a statement the first time it runs it and then only binds
+parameters. Set ``DB_PREPARE=false`` behind a transaction-mode PgBouncer,
+where session state such as prepared statements is not preserved.
+"""
+
+from typing import Any, Union
+
+from psycopg import AsyncConnection, AsyncCursor, sql
+
+from app.core.settings import get_settings
+
+
+Query = Union[str, sql.Composable]
+
+
+USER_CHANNEL_COUNT = "SELECT channel_count FROM users WHERE user_id = %s"
+
+USER_STATS = "SELECT created_at, channel_count FROM users WHERE user_id = %s"
+
+USER_CHANNELS = """
+SELECT channel_id, channel_username, channel_title, is_admin, created_at
+FROM channels
+WHERE user_id = %s
+ORDER BY created_at DESC
+"""
+
+CHANNEL_SETTINGS = """
+SELECT header_enabled, header_text, footer_enabled, footer_text, parse_mode
+FROM channel_settings
+WHERE user_id = %s AND channel_id = %s
+"""
+
+UPSERT_CHANNEL = """
+INSERT INTO channels (user_id, channel_id, channel_username, channel_title, is_admin)
+VALUES (%s, %s, %s, %s, TRUE)
+ON CONFLICT (user_id, channel_id) DO UPDATE SET
+    channel_username = EXCLUDED.channel_username,
+    channel_title = EXCLUDED.channel_title,
+    is_admin = TRUE,
+    updated_at = NOW()
+"""
+
+DELETE_CHANNEL = "DELETE FROM channels WHERE user_id = %s AND channel_id = %s"
+
+# إدراج/تحديث القنوات ثم إنشاء إعداداتها الافتراضية في عبارة واحدة
+# (لا نلمس إعدادات قناة أُضيفت سابقاً)
+UPSERT_CHANNELS_FROM_ARRAYS = """
+WITH input AS (
+    SELECT *
+    FROM unnest(%(ids)s::bigint[], %(usernames)s::text[], %(titles)s::text[])
+        AS t(channel_id, channel_username, channel_title)
+), upserted AS (
+    INSERT INTO channels (user_id, channel_id, channel_username, channel_title, is_admin)
+    SELECT %(user_id)s, channel_id, channel_username, channel_title, TRUE
+    FROM input
+    ON CONFLICT (user_id, channel_id) DO UPDATE SET
+        channel_username = EXCLUDED.channel_username,
+        channel_title = EXCLUDED.channel_title,
+        is_admin = TRUE,
+        updated_at = NOW()
+    RETURNING channel_id
+)
+INSERT INTO channel_settings (user_id, channel_id)
+SELECT %(user_id)s, channel_id
+FROM upserted
+ON CONFLICT (user_id, channel_id) DO NOTHING
+"""
+
+# الصف لا يُعاد كتابته إن لم تتغير البيانات فعلاً
+UPSERT_USER = """
+INSERT INTO users (user_id, username, first_name, last_name, language_code)
+VALUES (%(user_id)s, %(username)s, %(first_name)s, %(last_name)s, %(language_code)s)
+ON CONFLICT (user_id) DO UPDATE SET
+    username = EXCLUDED.username,
+    first_name = EXCLUDED.first_name,
+    last_name = EXCLUDED.last_name,
+    language_code = EXCLUDED.language_code
+WHERE (users.username, users.first_name, users.last_name, users.language_code)
+    IS DISTINCT FROM (EXCLUDED.username, EXCLUDED.first_name, EXCLUDED.last_name, EXCLUDED.language_code)
+"""
+
+# عبارات WITH المعدِّلة تُنفذ دائماً حتى إن لم يُقرأ ناتجها؛
+# والاستعلام الرئيسي يرى الصف قبل الإدراج، فالمستخدم الجديد يُرجع 0
+UPSERT_USER_AND_COUNT = f"""
+WITH upserted AS (
+{UPSERT_USER}
+)
+SELECT COALESCE((SELECT channel_count FROM users WHERE user_id = %(user_id)s), 0)
+"""
+
+
+PREPARE: bool = get_settings().db_prepare
+
+
+async def execute(target: Union[AsyncConnection, AsyncCursor], query: Query, params: Any = None) -> AsyncCursor:
+    """Run ``query`` on a connection or cursor as a prepared statement."""
+    return await target.execute(query, params, prepare=PREPARE)
@@ -0,0 +1,80 @@
+"""Adapters exposing raw webhook update dicts through the Pyrogram object surface
+used by the shared bot handlers (``from_user``, ``message.edit_text``, ``answer``)."""
+
+from typing import Any, Dict, Optional
+
+from pyrogram import Client
+
+
+class WebhookUser:
+    __slots__ = ("id", "first_name", "last_name", "username", "language_code")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.id: int = int(data["id"])
+        self.first_name: Optional[str] = data.get("first_name")
+        self.last_name: Optional[str] = data.get("last_name")
+        self.username: Optional[str] = data.get("username")
+        self.language_code: Optional[str] = data.get("language_code")
+
+
+class WebhookMessage:
+    """A message the bot can edit or reply to, addressed by chat/message id."""
+
+    __slots__ = ("_client", "chat_id", "id")
+
+    def __init__(self, client: Client, chat_id: int, message_id: int) -> None:
+        self._client = client
+        self.chat_id = chat_id
+        self.id = message_id
+
+    async def edit_text(self, text: str, reply_markup: Any = None, parse_mode: Any = None, **kwargs: Any) -> Any:
+        return await self._client.edit_message_text(
+            chat_id=self.chat_id,
+            message_id=self.id,
+            text=text,
+            reply_markup=reply_markup,
+            parse_mode=parse_mode,
+            **kwargs,
+        )
+
+    async def reply_text(self, text: str, **kwargs: Any) -> Any:
+        return await self._client.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+
+class WebhookTextMessage(WebhookMessage):
+    """An incoming text message for the header/footer input flows."""
+
+    __slots__ = ("from_user", "text")
+
+    def __init__(self, client: Client, chat_id: int, message_id: int, from_user: WebhookUser, text: str) -> None:
+        super().__init__(client, chat_id, message_id)
+        self.from_user = from_user
+        self.text = text
+
+
+class WebhookCallbackQuery:
+    """Webhook ``callback_query`` with a Pyrogram-like ``answer``.
+
+    Telegram accepts one answer per query, so ``answer`` becomes a no-op once
+    the query was acknowledged (either here or in the webhook response).
+    """
+
+    __slots__ = ("_client", "id", "data", "from_user", "message", "answered")
+
+    def __init__(self, client: Client, data: Dict[str, Any], answered: bool = False) -> None:
+        origin = data.get("message") or {}
+        self._client = client
+        self.id: Optional[str] = data.get("id")
+        self.data: str = data.get("data", "") or ""
+        self.from_user = WebhookUser(data.get("from") or {})
+        self.message = WebhookMessage(client, (origin.get("chat") or {}).get("id"), origin.get("message_id"))
+        self.answered = answered
+
+    async def answer(self, text: Optional[str] = None, show_alert: bool = False, **kwargs: Any) -> None:
+        if self.answered or not self.id:
+            return
+        self.answered = True
+        try:
+            await self._client.answer_callback_query(self.id, text=text, show_alert=show_alert, **kwargs)
+        except Exception:  # noqa: BLE001
+            pass
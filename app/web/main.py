@@ -1,20 +1,38 @@
+import asyncio
 import logging
-from typing import Any, Dict, Optional
-import httpx
+import os
+import signal
+from typing import Any, Dict, Optional, Set, Tuple
 
 from fastapi import FastAPI, Request, Response, status
-from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from fastapi.responses import JSONResponse
 from pyrogram.enums import ParseMode
 
 from app.core.logging_config import configure_logging
 from app.core.settings import get_settings
-from app.core.background import BackgroundTaskQueue
+from app.core.botapi import BotAPIError, close_bot_api, get_bot_api
+from app.core.background import PRIORITY_BULK, PRIORITY_HIGH, PRIORITY_NORMAL
+from app.core.redis_client import close_redis
+from app.core.dedup import create_deduplicator
+from app.core.invalidation import get_invalidation_bus
+from app.core.startup import Startup
+from app.core.state import get_state_store
+from app.core.update_queue import create_update_queue
 from app.bot.client import get_bot_client
 from app.db.migrate import run_migrations
-from app.bot.channels import ChannelManager
-from app.bot.header import header_menu, handle_header_callback, handle_header_text_input
-from app.bot.footer import footer_menu, handle_footer_callback, handle_footer_text_input
-from app.db.pool import get_pool, close_pool
+from app.bot.channels import ChannelManager, add_channels_from_input, channels_menu_markup
+from app.bot.header import handle_header_text_input
+from app.bot.footer import handle_footer_text_input
+from app.bot.menus import main_menu_keyboard
+from app.bot.resolver import chat_resolver
+from app.bot.router import callback_router
+from app.bot.sender import get_sender
+from app.bot.users import UserManager
+from app.workers.peer_warmup import progress as peer_warmup_progress, start_peer_warmup, stop_peer_warmup
+from app.web.adapters import WebhookCallbackQuery, WebhookTextMessage
+from app.web.polling import UpdatePoller, ingest_mode
+from app.web.updates import ChatMemberUpdate, IncomingMessage, Update, loads
+from app.db.pool import get_pool, close_pool, pool_stats
 
 
 configure_logging()
@@ -22,29 +40,18 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 settings = get_settings()
-bg_queue = BackgroundTaskQueue()
-
-# حالات المستخدمين للإدخال التفاعلي عبر webhook
-user_states: Dict[int, str] = {}
 
 
+# حالات المستخدمين للإدخال التفاعلي عبر webhook (تنتهي بعد STATE_TTL)
 async def set_user_state(client: Any, user_id: int, state: Optional[str]) -> None:
-    if state:
-        user_states[user_id] = state
-    else:
-        user_states.pop(user_id, None)
+    await get_state_store().set(user_id, state)
 
 
 async def get_user_state(client: Any, user_id: int) -> Optional[str]:
-    return user_states.get(user_id)
+    return await get_state_store().get(user_id)
 
 
-@app.on_event("startup")
-async def on_startup() -> None:
-    await run_migrations()
-    await get_pool()
-    await bg_queue.start()
-
+async def start_bot() -> None:
     bot = get_bot_client()
     await bot.start()
 
@@ -53,132 +60,106 @@ async def on_startup() -> None:
     setattr(bot, "set_user_state", functools.partial(set_user_state, bot))
     setattr(bot, "get_user_state", functools.partial(get_user_state, bot))
 
-    if settings.webhook_base and settings.bot_token:
-        webhook_url = f"{settings.webhook_base.rstrip('/')}{settings.webhook_path}"
-        try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                data = {
-                    "url": webhook_url,
-                    "allowed_updates": "[\"message\",\"callback_query\"]",
-                    "drop_pending_updates": "true",
-                    "max_connections": "40",
-                }
-                if settings.webhook_secret:
-                    data["secret_token"] = settings.webhook_secret
-                resp = await client.post(
-                    f"https://api.telegram.org/bot{settings.bot_token}/setWebhook",
-                    data=data,
-                    headers={"Content-Type": "application/x-www-form-urlencoded"},
-                )
-            ok = False
-            try:
-                payload = resp.json()
-                ok = bool(payload.get("ok"))
-            except Exception:
-                payload = {"status_code": resp.status_code, "text": resp.text}
-            if ok:
-                logger.info("Webhook set to %s", webhook_url)
-            else:
-                logger.error("Failed to set webhook: %s", payload)
-        except Exception as exc:  # noqa: BLE001
-            logger.exception("Failed to call setWebhook: %s", exc)
+    # تحليل القنوات المحفوظة مسبقاً حتى لا يدفع أول نشر كلفة التحليل
+    start_peer_warmup(bot)
+
+
+async def set_webhook() -> None:
+    if not (settings.webhook_base and settings.bot_token):
+        return
+    webhook_url = f"{settings.webhook_base.rstrip('/')}{settings.webhook_path}"
+    try:
+        await get_bot_api().set_webhook(
+            webhook_url,
+            allowed_updates=ALLOWED_UPDATES,
+            secret_token=settings.webhook_secret or None,
+            drop_pending_updates=True,
+            max_connections=40,
+        )
+        logger.info("Webhook set to %s", webhook_url)
+    except BotAPIError as exc:
+        logger.error("Failed to set webhook: %s", exc)
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Failed to call setWebhook: %s", exc)
+
+
+startup = Startup()
+
+ALLOWED_UPDATES = ["message", "callback_query", "my_chat_member"]
+
+
+@app.on_event("startup")
+async def on_startup() -> None:
+    # الخطوات المستقلة تعمل بالتوازي؛ التطبيق "جاهز" بعد انتهاء الخطوات الحرجة
+    startup.add("pool", get_pool)
+    startup.add("migrations", run_migrations, after=("pool",))
+    # جلسة Pyrogram محفوظة في جداول الترحيل 3
+    startup.add("bot", start_bot, after=("migrations",))
+    # الطابور المحلي فارغ حتى الجاهزية (الـ webhook يرد بـ 503 قبلها) فلا ينتظر البوت؛
+    # أما طابور Redis فيبدأ فوراً بمعالجة ما تراكم فيه، فيحتاج البوت جاهزاً
+    startup.add("queue", update_queue.start, after=("bot",) if settings.queue_backend == "redis" else ())
+    # بدونه تبقى نسخ العمليات الأخرى قديمة حتى انتهاء TTL فقط، فلا يؤخر الجاهزية
+    startup.add("invalidation", get_invalidation_bus().start, critical=False)
+    if poller is not None:
+        # بدون استقبال التحديثات لا فائدة من التطبيق، فالـ polling خطوة حرجة
+        startup.add("polling", poller.start, after=("bot", "queue"))
+    else:
+        # استدعاء HTTP لا يعتمد على شيء، ولا يؤخر الجاهزية
+        startup.add("webhook", set_webhook, critical=False)
+    # في الخلفية: uvicorn لا يخدم أي طلب قبل عودة هذا الحدث، و/ready يجب أن يجيب أثناء الإقلاع
+    startup.start(on_failure=_startup_failed)
+
+
+def _startup_failed(exc: BaseException) -> None:
+    # خطوة حرجة فشلت: لا فائدة من البقاء، فننهي العملية ليعيد المشرف تشغيلها كما قبل
+    logger.critical("Startup failed, shutting down: %r", exc)
+    os.kill(os.getpid(), signal.SIGTERM)
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await startup.stop()
+    if poller is not None:
+        await poller.stop()
+    await stop_peer_warmup()
     bot = get_bot_client()
     try:
         await bot.stop()
     except Exception:  # noqa: BLE001
         pass
-    await bg_queue.stop()
+    await update_queue.stop()
+    await get_invalidation_bus().stop()
     await close_pool()
-
-
-@app.post(settings.webhook_path)
-async def telegram_webhook(request: Request) -> Response:
-    """Receive Telegram updates and handle minimal /start welcome via Pyrogram send_message."""
-    bot = get_bot_client()
-    # Optional verification of Telegram secret token header
-    if settings.webhook_secret:
-        received_secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
-        if received_secret != settings.webhook_secret:
-            return Response(status_code=status.HTTP_403_FORBIDDEN)
-
-    try:
-        update: Dict[str, Any] = await request.json()
-    except Exception:  # noqa: BLE001
-        return Response(status_code=status.HTTP_400_BAD_REQUEST)
-
-    message: Optional[Dict[str, Any]] = update.get("message")
-    if message is not None:
-        chat = message.get("chat") or {}
-        from_user = message.get("from") or {}
-        chat_id = chat.get("id")
-        text = message.get("text", "") or ""
-
-        if chat_id is not None:
-            # Enqueue background processing to avoid blocking webhook
-            async def job() -> None:
-                pool = await get_pool()
-                async with pool.connection() as conn:
-                    async with conn.cursor() as cur:
-                        await cur.execute(
-                            """
-                            INSERT INTO users (user_id, username, first_name, last_name, language_code)
-                            VALUES (%s, %s, %s, %s, %s)
-                            ON CONFLICT (user_id) DO UPDATE SET
-                                username = EXCLUDED.username,
-                                first_name = EXCLUDED.first_name,
-                                last_name = EXCLUDED.last_name,
-                                language_code = EXCLUDED.language_code
-                            """,
-                            (
-                                int(from_user.get("id", chat_id)),
-                                from_user.get("username"),
-                                from_user.get("first_name"),
-                                from_user.get("last_name"),
-                                from_user.get("language_code"),
-                            ),
-                        )
-
-                if text.startswith("/start"):
-                    # احصاء القنوات للمستخدم
-                    user_id = int(from_user.get("id", chat_id))
-                    channel_count = 0
-                    pool2 = await get_pool()
-                    async with pool2.connection() as conn2:
-                        async with conn2.cursor() as cur2:
-                            await cur2.execute(
-                                "SELECT COUNT(*) FROM channels WHERE user_id = %s",
-                                (user_id,)
-                            )
-                            row = await cur2.fetchone()
-                            channel_count = (row[0] if row else 0) or 0
-
-                    # لوحة المفاتيح الرئيسية
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("📡 قنواتي", callback_data="channels_menu"),
-                            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add")
-                        ],
-                        [
-                            InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list"),
-                            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete")
-                        ],
-                        [
-                            InlineKeyboardButton("📊 الإحصائيات", callback_data="stats"),
-                            InlineKeyboardButton("⚙️ الإعدادات", callback_data="settings")
-                        ],
-                        [
-                            InlineKeyboardButton("📖 المساعدة", callback_data="help"),
-                            InlineKeyboardButton("ℹ️ حول البوت", callback_data="about")
-                        ]
-                    ]
-
-                    # رسالة ترحيب مع إحصائيات مختصرة
-                    first_name = from_user.get("first_name") or ""
-                    welcome_text = f"""
+    await close_redis()
+    await close_bot_api()
+
+
+async def handle_message_update(message: IncomingMessage) -> None:
+    """Process one incoming message update (runs on the update queue)."""
+    # كل الإرسال يمر عبر المجدول لتجنب FloodWait
+    bot = get_sender()
+    chat_id = message.chat.id
+    from_user = message.from_user
+    text = message.text
+    if chat_id is None:
+        return
+
+    profile = dict(
+        user_id=int(message.sender_id),
+        username=from_user.username if from_user else None,
+        first_name=from_user.first_name if from_user else None,
+        last_name=from_user.last_name if from_user else None,
+        language_code=from_user.language_code if from_user else None,
+    )
+
+    if text.startswith("/start"):
+        # تسجيل المستخدم وإحصاء قنواته في استعلام واحد
+        user_id = profile["user_id"]
+        channel_count = await UserManager.upsert_and_count(**profile)
+
+        # رسالة ترحيب مع إحصائيات مختصرة
+        first_name = profile["first_name"] or ""
+        welcome_text = f"""
 ╭━━━━━━━━━━━━━━━━━━━━━╮
     🤖 **مرحباً بك في بوت إدارة القنوات**
 ╰━━━━━━━━━━━━━━━━━━━━━╯
@@ -199,602 +180,305 @@ async def telegram_webhook(request: Request) -> Response:
 ⬇️ **اختر من القائمة أدناه:**
 """
 
-                    await bot.send_message(
-                        chat_id=chat_id,
-                        text=welcome_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                else:
-                    # معالجة إدخال القنوات عندما يكون المستخدم في حالة انتظار
-                    user_id = int(from_user.get("id", chat_id)) if from_user.get("id") else None
-                    current_state = await get_user_state(bot, user_id) if user_id is not None else None
-
-                    # أمر /channels لفتح قائمة القنوات مباشرة
-                    if text.startswith("/channels"):
-                        count = await ChannelManager.get_channel_count(user_id)
-                        keyboard = [
-                            [
-                                InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add"),
-                                InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list")
-                            ],
-                            [
-                                InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete"),
-                                InlineKeyboardButton("📊 الإحصائيات", callback_data="channel_stats")
-                            ],
-                            [InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="main_menu")]
-                        ]
-                        text_menu = f"""
-╭━━━━━━━━━━━━━━━━━━━━━╮
-    📡 **إدارة القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
+        await bot.send_message(
+            chat_id=chat_id,
+            text=welcome_text,
+            reply_markup=main_menu_keyboard(),
+            parse_mode=ParseMode.MARKDOWN
+        )
+    else:
+        await UserManager.upsert(**profile)
+        # معالجة إدخال القنوات عندما يكون المستخدم في حالة انتظار
+        user_id = from_user.id if from_user else None
+        current_state = await get_user_state(bot, user_id) if user_id is not None else None
+
+        # أمر /channels لفتح قائمة القنوات مباشرة
+        if text.startswith("/channels"):
+            count = await ChannelManager.get_channel_count(user_id)
+            text_menu, markup = channels_menu_markup(count)
+            await bot.send_message(
+                chat_id=chat_id,
+                text=text_menu,
+                reply_markup=markup,
+                parse_mode=ParseMode.MARKDOWN
+            )
+        # إلغاء العملية
+        elif current_state == "waiting_channels" and text.startswith("/cancel"):
+            await set_user_state(bot, user_id, None)
+            await bot.send_message(chat_id=chat_id, text="❌ تم إلغاء العملية")
+        # تدفقات إدخال نص الهيدر/الفوتر
+        elif current_state and current_state.startswith(("header_edit:", "footer_edit:")):
+            incoming = WebhookTextMessage(bot, chat_id, message.message_id, from_user, text)
+            await handle_header_text_input(bot, incoming)
+            await handle_footer_text_input(bot, incoming)
+        # معالجة الإدخال عندما يكون بانتظار القنوات
+        elif current_state == "waiting_channels":
+            channels_to_check = []
+            # معالجة الرسائل المحولة
+            fwd_chat = message.forward_from_chat
+            if fwd_chat and fwd_chat.type in ["channel", "supergroup"]:
+                channels_to_check = [int(fwd_chat.id)]
+            elif text:
+                channels_to_check = await ChannelManager.extract_channel_info(text)
+                if not channels_to_check:
+                    await bot.send_message(chat_id=chat_id, text="⚠️ لم أتمكن من استخراج أي قنوات من النص المرسل!")
+                    return
+            else:
+                await bot.send_message(chat_id=chat_id, text="⚠️ يرجى إرسال نص أو توجيه رسالة من قناة!")
+                return
 
-📊 **الإحصائيات:**
-• القنوات المضافة: **{count}**
-• الحد الأقصى: **50** قناة
+            # التحقق المتوازي والحفظ الجماعي المشترك مع مسار Pyrogram
+            await add_channels_from_input(bot, user_id, chat_id, channels_to_check)
 
-━━━━━━━━━━━━━━━━━━━━━
-📝 **طرق إضافة القنوات:**
 
-• معرف القناة: @username
-• رابط القناة: t.me/username
-• معرف رقمي: -100xxxxxxxxx
-• توجيه رسالة من القناة
+async def handle_callback_update(callback_query: Dict[str, Any]) -> None:
+    """Process one callback query update (runs on the update queue)."""
+    bot = get_sender()
+    origin_message = callback_query.get("message") or {}
+    if (
+        (callback_query.get("from") or {}).get("id") is None
+        or (origin_message.get("chat") or {}).get("id") is None
+        or origin_message.get("message_id") is None
+    ):
+        return
 
-━━━━━━━━━━━━━━━━━━━━━
-⚠️ **تنبيه:** يجب أن يكون البوت مشرفاً في القناة
+    data = callback_query.get("data", "") or ""
+    # الأزرار التي أُكدت مسبقاً في رد الـ webhook لا تقبل إجابة ثانية
+    query = WebhookCallbackQuery(bot, callback_query, answered=callback_router.acks_early(data))
+    if not await callback_router.dispatch(bot, query):
+        await query.answer()
 
-⬇️ **اختر من القائمة:**
-"""
-                        await bot.send_message(
-                            chat_id=chat_id,
-                            text=text_menu,
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                    # إلغاء العملية
-                    elif current_state == "waiting_channels" and text.startswith("/cancel"):
-                        await set_user_state(bot, user_id, None)
-                        await bot.send_message(chat_id=chat_id, text="❌ تم إلغاء العملية")
-                    # معالجة الإدخال عندما يكون بانتظار القنوات
-                    elif current_state == "waiting_channels":
-                        # تدفقات إدخال نص الهيدر/الفوتر
-                        await handle_header_text_input(bot, type("obj", (), {"from_user": type("u", (), {"id": user_id}), "text": text, "reply_text": lambda **kwargs: bot.send_message(chat_id=chat_id, **kwargs)})())
-                        await handle_footer_text_input(bot, type("obj", (), {"from_user": type("u", (), {"id": user_id}), "text": text, "reply_text": lambda **kwargs: bot.send_message(chat_id=chat_id, **kwargs)})())
-                        channels_to_check = []
-                        # معالجة الرسائل المحولة
-                        fwd_chat = message.get("forward_from_chat")
-                        if fwd_chat and fwd_chat.get("type") in ["channel", "supergroup"]:
-                            channels_to_check = [int(fwd_chat.get("id"))]
-                        elif text:
-                            channels_to_check = await ChannelManager.extract_channel_info(text)
-                            if not channels_to_check:
-                                await bot.send_message(chat_id=chat_id, text="⚠️ لم أتمكن من استخراج أي قنوات من النص المرسل!")
-                                return
-                        else:
-                            await bot.send_message(chat_id=chat_id, text="⚠️ يرجى إرسال نص أو توجيه رسالة من قناة!")
-                            return
-
-                        processing = await bot.send_message(chat_id=chat_id, text="⏳ جاري معالجة القنوات...")
-
-                        added_channels = []
-                        failed_channels = []
-                        for channel_info in channels_to_check:
-                            is_admin, chat_obj = await ChannelManager.check_bot_admin(bot, channel_info)
-                            if not chat_obj:
-                                failed_channels.append(f"{channel_info} - قناة غير موجودة")
-                                continue
-                            if not is_admin:
-                                failed_channels.append(f"{chat_obj.title} - البوت ليس مشرفاً")
-                                continue
-                            success = await ChannelManager.add_channel(
-                                user_id,
-                                chat_obj.id,
-                                chat_obj.username,
-                                chat_obj.title
-                            )
-                            if success:
-                                added_channels.append(chat_obj.title)
-                            else:
-                                failed_channels.append(f"{chat_obj.title} - خطأ في الحفظ")
-
-                        result_text = """╭━━━━━━━━━━━━━━━━━━━━━╮
-    📊 **نتيجة العملية**
-╰━━━━━━━━━━━━━━━━━━━━━╯
 
-"""
-                        if added_channels:
-                            result_text += f"✅ **تم إضافة بنجاح: {len(added_channels)}**\n"
-                            for ch in added_channels:
-                                result_text += f"  └ {ch}\n"
-                            result_text += "\n"
-                        if failed_channels:
-                            result_text += f"❌ **فشل الإضافة: {len(failed_channels)}**\n"
-                            for ch in failed_channels:
-                                result_text += f"  └ {ch}\n"
-                            result_text += "\n"
-                        if not added_channels and not failed_channels:
-                            result_text += "⚠️ **لم يتم إضافة أي قناة!**\n"
-                        result_text += "━━━━━━━━━━━━━━━━━━━━━"
-
-                        await set_user_state(bot, user_id, None)
-                        keyboard = [[InlineKeyboardButton("🔙 رجوع للقنوات", callback_data="channels_menu")]]
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=processing.id,
-                            text=result_text,
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-
-            bg_queue.enqueue(job)
-
-    # معالجة أزرار الـ CallbackQuery
-    callback_query: Optional[Dict[str, Any]] = update.get("callback_query")
-    if callback_query is not None:
-        callback_id = callback_query.get("id")
-        data = callback_query.get("data", "") or ""
-        from_user = callback_query.get("from") or {}
-        origin_message = callback_query.get("message") or {}
-        origin_chat = origin_message.get("chat") or {}
-        chat_id = origin_chat.get("id")
-        message_id = origin_message.get("message_id")
-        user_id = int(from_user.get("id")) if from_user.get("id") is not None else None
-
-        async def answer_cbq(text: Optional[str] = None, show_alert: bool = False) -> None:
-            try:
-                if callback_id:
-                    await bot.answer_callback_query(callback_id, text=text, show_alert=show_alert)
-            except Exception:
-                pass
-
-        if chat_id is not None and message_id is not None and user_id is not None:
-            try:
-                if data == "channels_menu":
-                    # إظهار قائمة القنوات
-                    count = await ChannelManager.get_channel_count(user_id)
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add"),
-                            InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list")
-                        ],
-                        [
-                            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete"),
-                            InlineKeyboardButton("📊 الإحصائيات", callback_data="channel_stats")
-                        ],
-                        [InlineKeyboardButton("🔙 القائمة الرئيسية", callback_data="main_menu")]
-                    ]
-                    text = f"""
-╭━━━━━━━━━━━━━━━━━━━━━╮
-    📡 **إدارة القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
+async def handle_my_chat_member_update(my_chat_member: ChatMemberUpdate) -> None:
+    """Forget the cached chat once the bot's status in it changed."""
+    chat = my_chat_member.chat
+    if chat.id is not None:
+        await chat_resolver.invalidate(int(chat.id), chat.username)
 
-📊 **الإحصائيات:**
-• القنوات المضافة: **{count}**
-• الحد الأقصى: **50** قناة
 
-━━━━━━━━━━━━━━━━━━━━━
-📝 **طرق إضافة القنوات:**
+async def process_update(payload: Dict[str, Any]) -> None:
+    """Dispatch a raw Telegram update taken from the update queue."""
+    update = Update(payload)
+    if update.message is not None:
+        await handle_message_update(update.message)
+    if update.callback_query is not None:
+        # المعالجات المشتركة تحتاج واجهة Pyrogram الكاملة للزر
+        await handle_callback_update(payload["callback_query"])
+    if update.my_chat_member is not None:
+        await handle_my_chat_member_update(update.my_chat_member)
 
-• معرف القناة: @username
-• رابط القناة: t.me/username
-• معرف رقمي: -100xxxxxxxxx
-• توجيه رسالة من القناة
 
-━━━━━━━━━━━━━━━━━━━━━
-⚠️ **تنبيه:** يجب أن يكون البوت مشرفاً في القناة
+# مهام الردود المرسلة في الخلفية (نحتفظ بمرجع حتى لا تُجمع قبل انتهائها)
+_reply_tasks: Set["asyncio.Task[None]"] = set()
 
-⬇️ **اختر من القائمة:**
-"""
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "main_menu":
-                    # العودة للقائمة الرئيسية
-                    first_name = from_user.get("first_name") or ""
-                    pool2 = await get_pool()
-                    async with pool2.connection() as conn2:
-                        async with conn2.cursor() as cur2:
-                            await cur2.execute(
-                                "SELECT COUNT(*) FROM channels WHERE user_id = %s",
-                                (user_id,)
-                            )
-                            row = await cur2.fetchone()
-                            channel_count = (row[0] if row else 0) or 0
-
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("📡 قنواتي", callback_data="channels_menu"),
-                            InlineKeyboardButton("➕ إضافة قناة", callback_data="channels_add")
-                        ],
-                        [
-                            InlineKeyboardButton("📋 عرض القنوات", callback_data="channels_list"),
-                            InlineKeyboardButton("🗑 حذف قناة", callback_data="channels_delete")
-                        ],
-                        [
-                            InlineKeyboardButton("📊 الإحصائيات", callback_data="stats"),
-                            InlineKeyboardButton("⚙️ الإعدادات", callback_data="settings")
-                        ],
-                        [
-                            InlineKeyboardButton("📖 المساعدة", callback_data="help"),
-                            InlineKeyboardButton("ℹ️ حول البوت", callback_data="about")
-                        ]
-                    ]
-
-                    main_text = f"""
-╭━━━━━━━━━━━━━━━━━━━━━╮
-    🤖 **القائمة الرئيسية**
-╰━━━━━━━━━━━━━━━━━━━━━╯
 
-👤 **المستخدم:** {first_name}
-📡 **القنوات المضافة:** {channel_count}
+async def _send_reply(reply: Dict[str, Any]) -> None:
+    try:
+        await get_bot_api().call(reply.pop("method"), reply)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to send polling reply: %s", exc)
+
+
+async def submit_update(payload: Dict[str, Any]) -> str:
+    """Polling counterpart of ``telegram_webhook``: ``"queued"``, ``"ignored"`` or ``"rejected"``."""
+    result, reply = await route_update(payload)
+    if reply is not None:
+        # في وضع الـ webhook ينفذ Telegram الـ method المرسل في الرد؛ هنا ننفذه بأنفسنا
+        # في الخلفية حتى لا تنتظر بقية الدفعة رحلة HTTP لكل زر
+        task = asyncio.create_task(_send_reply(reply))
+        _reply_tasks.add(task)
+        task.add_done_callback(_reply_tasks.discard)
+    return result
+
+
+deduplicator = create_deduplicator()
+poller: Optional[UpdatePoller] = None
+if ingest_mode(settings) == "polling":
+    poller = UpdatePoller(
+        get_bot_api(),
+        submit_update,
+        deduplicator,
+        limit=settings.poll_limit,
+        timeout=settings.poll_timeout,
+        allowed_updates=ALLOWED_UPDATES,
+        # طابور Redis دائم، فالتحديث المقبول فيه يُعد منتهياً
+        wait_for_processing=settings.queue_backend != "redis",
+    )
+update_queue = create_update_queue(process_update if poller is None else poller.track(process_update))
 
-━━━━━━━━━━━━━━━━━━━━━
-⬇️ **اختر من القائمة أدناه:**
-"""
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=main_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "channels_list":
-                    channels = await ChannelManager.get_user_channels(user_id)
-                    if not channels:
-                        await answer_cbq("لا توجد قنوات مضافة بعد!", show_alert=True)
-                    else:
-                        text = """╭━━━━━━━━━━━━━━━━━━━━━╮
-    📋 **قنواتك المضافة**
-╰━━━━━━━━━━━━━━━━━━━━━╯\n\n"""
-                        for i, channel in enumerate(channels, 1):
-                            title = channel.get("channel_title") or "بدون اسم"
-                            username = channel.get("channel_username") or ""
-                            channel_id_val = channel.get("channel_id")
-                            text += f"**{i}.** {title}\n"
-                            if username:
-                                text += f"   └ @{username}\n"
-                            text += f"   └ ID: `{channel_id_val}`\n"
-                            text += "━━━━━━━━━━━━━━━━━━━━━\n"
-
-                        keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            text=text,
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                        await answer_cbq()
-
-                elif data == "channels_add":
-                    # عرض تعليمات إضافة القنوات وتعيين حالة انتظار
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=(
-                            """
-╭━━━━━━━━━━━━━━━━━━━━━╮
-    ➕ **إضافة قنوات جديدة**
-╰━━━━━━━━━━━━━━━━━━━━━╯
 
-📝 **أرسل القنوات بإحدى الطرق:**
+@app.post(settings.webhook_path)
+async def telegram_webhook(request: Request) -> Response:
+    """Receive Telegram updates and hand them to the update queue; no handler work runs here."""
+    # Optional verification of Telegram secret token header
+    if settings.webhook_secret:
+        received_secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if received_secret != settings.webhook_secret:
+            return Response(status_code=status.HTTP_403_FORBIDDEN)
 
-1️⃣ معرف القناة: @channel_username
-2️⃣ رابط القناة: t.me/channel_username
-3️⃣ معرف رقمي: -1001234567890
-4️⃣ توجيه رسالة من القناة
+    try:
+        payload: Dict[str, Any] = loads(await request.body())
+        update = Update(payload)
+    except Exception:  # noqa: BLE001
+        return Response(status_code=status.HTTP_400_BAD_REQUEST)
 
-━━━━━━━━━━━━━━━━━━━━━
-💡 **نصائح:**
-• يمكنك إرسال عدة قنوات دفعة واحدة
-• ضع كل قناة في سطر منفصل
-• تأكد من أن البوت مشرف في القناة
+    if not startup.ready:
+        # البوت أو الطابور لم يجهزا بعد: يعيد Telegram الإرسال لاحقاً
+        return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
 
-━━━━━━━━━━━━━━━━━━━━━
-❌ للإلغاء أرسل: /cancel
-"""
-                        ),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await set_user_state(bot, user_id, "waiting_channels")
-                    await answer_cbq()
-
-                elif data == "channels_delete":
-                    channels = await ChannelManager.get_user_channels(user_id)
-                    if not channels:
-                        await answer_cbq("لا توجد قنوات لحذفها!", show_alert=True)
-                    else:
-                        keyboard = []
-                        for ch in channels:
-                            title = ch.get("channel_title") or f"ID: {ch.get('channel_id')}"
-                            keyboard.append([
-                                InlineKeyboardButton(
-                                    f"🗑 {title}",
-                                    callback_data=f"delete_channel_{ch.get('channel_id')}"
-                                )
-                            ])
-                        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")])
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            text=(
-                                """╭━━━━━━━━━━━━━━━━━━━━━╮
-    🗑 **حذف القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
+    # Telegram يعيد إرسال التحديث إن تأخر ردنا: نؤكد المكرر فوراً دون أي عمل
+    update_id = update.update_id
+    if update_id is not None and await deduplicator.seen(update_id):
+        return Response(status_code=status.HTTP_200_OK)
 
-⚠️ **اختر القناة التي تريد حذفها:**
-"""
-                            ),
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-                        await answer_cbq()
-
-                elif data.startswith("delete_channel_"):
-                    channel_id_val = int(data.replace("delete_channel_", ""))
-                    if await ChannelManager.remove_channel(user_id, channel_id_val):
-                        await answer_cbq("✅ تم حذف القناة بنجاح!", show_alert=True)
-                    else:
-                        await answer_cbq("❌ فشل حذف القناة!", show_alert=True)
-                    # إعادة فتح قائمة الحذف لتحديثها
-                    channels = await ChannelManager.get_user_channels(user_id)
-                    if not channels:
-                        # العودة للقائمة إذا لم يتبق قنوات
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            text="لا توجد قنوات متبقية.",
-                            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]])
-                        )
-                    else:
-                        keyboard = []
-                        for ch in channels:
-                            title = ch.get("channel_title") or f"ID: {ch.get('channel_id')}"
-                            keyboard.append([
-                                InlineKeyboardButton(
-                                    f"🗑 {title}",
-                                    callback_data=f"delete_channel_{ch.get('channel_id')}"
-                                )
-                            ])
-                        keyboard.append([InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")])
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            text=(
-                                """╭━━━━━━━━━━━━━━━━━━━━━╮
-    🗑 **حذف القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
+    try:
+        response = await enqueue_update(payload, update)
+    except Exception:
+        # Telegram سيعيد الإرسال بعد الخطأ 500، فلا يجوز أن يُسقط كمكرر
+        if update_id is not None:
+            await deduplicator.forget(update_id)
+        raise
+    if response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE and update_id is not None:
+        # لم يُقبل التحديث، فيجب معالجة إعادة إرساله
+        await deduplicator.forget(update_id)
+    return response
+
+
+async def enqueue_update(payload: Dict[str, Any], update: Optional[Update] = None) -> Response:
+    """Queue one update by type and priority; the response is what Telegram should get."""
+    result, reply = await route_update(payload, update)
+    if result == "rejected":
+        # الطابور ممتلئ: نطلب من Telegram إعادة إرسال التحديث لاحقاً
+        return Response(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "1"},
+        )
+    if reply is not None:
+        # تأكيد فوري عبر رد الـ webhook نفسه دون أي طلب إضافي لـ Telegram
+        return JSONResponse(reply)
+    return Response(status_code=status.HTTP_200_OK)
 
-⚠️ **اختر القناة التي تريد حذفها:**
-"""
-                            ),
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode=ParseMode.MARKDOWN
-                        )
-
-                elif data == "channel_stats":
-                    channels = await ChannelManager.get_user_channels(user_id)
-                    count = len(channels)
-                    stats_text = f"""╭━━━━━━━━━━━━━━━━━━━━━╮
-    📊 **إحصائيات القنوات**
-╰━━━━━━━━━━━━━━━━━━━━━╯
 
-📈 **الملخص:**
-• إجمالي القنوات: **{count}**
-• القنوات النشطة: **{count}**
-• الحد الأقصى: **50** قناة
-• المتبقي: **{50 - count}** قناة
+async def route_update(
+    payload: Dict[str, Any], update: Optional[Update] = None
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Queue one update by type and priority.
 
-━━━━━━━━━━━━━━━━━━━━━
-"""
-                    if channels:
-                        stats_text += "\n📋 **تفاصيل القنوات:**\n\n"
-                        for i, ch in enumerate(channels[:5], 1):
-                            title = ch.get("channel_title") or "بدون اسم"
-                            stats_text += f"{i}. {title}\n"
-                        if count > 5:
-                            stats_text += f"\n... و {count - 5} قناة أخرى"
-                    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="channels_menu")]]
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=stats_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "stats":
-                    # إحصائيات المستخدم العامة
-                    pool2 = await get_pool()
-                    async with pool2.connection() as conn2:
-                        async with conn2.cursor() as cur2:
-                            await cur2.execute(
-                                "SELECT COUNT(*) FROM channels WHERE user_id = %s",
-                                (user_id,)
-                            )
-                            row = await cur2.fetchone()
-                            channel_count = (row[0] if row else 0) or 0
-                            await cur2.execute(
-                                "SELECT created_at FROM users WHERE user_id = %s",
-                                (user_id,)
-                            )
-                            urow = await cur2.fetchone()
-                            created_at = urow[0] if urow else None
-
-                    stats_text = f"""
-📊 **الإحصائيات الخاصة بك**
-
-👤 **الاسم:** {from_user.get('first_name') or ''}
-🆔 **المعرف:** `{user_id}`
-📡 **عدد القنوات:** {channel_count}
-📅 **تاريخ التسجيل:** {created_at.strftime('%Y-%m-%d') if created_at else 'غير معروف'}
+    Returns ``("queued" | "ignored" | "rejected", reply)`` where ``reply`` is a
+    Bot API call to make right away (the early ``answerCallbackQuery``).
+    """
+    bot = get_bot_client()
+    update = update or Update(payload)
+    message = update.message
+    if message is not None and message.chat.id is not None:
+        # Enqueue background processing to avoid blocking webhook
+        # /start أولاً، وإضافة القنوات الجماعية بأقل أولوية
+        sender_id = message.sender_id
+        if message.text.startswith("/start"):
+            priority = PRIORITY_HIGH
+        elif await get_user_state(bot, sender_id) == "waiting_channels":
+            priority = PRIORITY_BULK
+        else:
+            priority = PRIORITY_NORMAL
+        # نفس المستخدم يُعالج بالترتيب، والمستخدمون المختلفون بالتوازي
+        accepted = await update_queue.put(
+            payload,
+            key=sender_id,
+            priority=priority,
+            timeout=settings.bg_enqueue_timeout,
+        )
+        return ("queued" if accepted else "rejected"), None
+
+    # معالجة أزرار الـ CallbackQuery خارج مسار الطلب
+    callback_query = update.callback_query
+    if callback_query is not None:
+        accepted = await update_queue.put(
+            payload,
+            key=callback_query.user_id,
+            priority=PRIORITY_HIGH,
+            timeout=settings.bg_enqueue_timeout,
+        )
+        if not accepted:
+            return "rejected", None
+        if callback_query.id and callback_router.acks_early(callback_query.data):
+            return "queued", {"method": "answerCallbackQuery", "callback_query_id": callback_query.id}
+        return "queued", None
+
+    # تغيّر حالة البوت في قناة: يُرتب مع رسائل المستخدم الذي غيّرها
+    my_chat_member = update.my_chat_member
+    if my_chat_member is not None:
+        accepted = await update_queue.put(
+            payload,
+            key=my_chat_member.user_id,
+            priority=PRIORITY_HIGH,
+            timeout=settings.bg_enqueue_timeout,
+        )
+        return ("queued" if accepted else "rejected"), None
+
+    return "ignored", None
 
-━━━━━━━━━━━━━━━━━━━━━
-"""
-                    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")]]
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=stats_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "help":
-                    help_text = (
-                        """
-📖 **دليل الاستخدام**
 
-━━━━━━━━━━━━━━━━━━━━━
-🔹 **الأوامر المتاحة:**
+@app.get("/")
+async def health() -> Dict[str, str]:
+    return {"status": "ok"}
 
-• /start - بدء البوت وعرض القائمة
-• /channels - إدارة القنوات
-• /cancel - إلغاء العملية الحالية
 
-━━━━━━━━━━━━━━━━━━━━━
-🔹 **كيفية إضافة قناة:**
+def is_ready() -> bool:
+    """Critical startup steps finished and, when polling, the poller is still alive."""
+    return startup.ready and (poller is None or poller.running)
 
-1. اضغط على "➕ إضافة قناة"
-2. أرسل معرف القناة بإحدى الطرق:
-   • @username
-   • رابط القناة
-   • ID القناة
-   • توجيه رسالة من القناة
 
-⚠️ **ملاحظة:** يجب أن يكون البوت مشرفاً في القناة
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """503 until the critical startup steps finished (or if the poller died), with per-step timings."""
+    stats = startup.stats()
+    stats["ready"] = is_ready()
+    return JSONResponse(
+        stats,
+        status_code=status.HTTP_200_OK if stats["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
 
-━━━━━━━━━━━━━━━━━━━━━
-🔹 **للدعم والمساعدة:**
-تواصل مع المطور: @YourUsername
-"""
-                    )
-                    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")]]
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=help_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "about":
-                    about_text = (
-                        """
-ℹ️ **حول البوت**
 
-━━━━━━━━━━━━━━━━━━━━━
-🤖 **بوت إدارة القنوات**
-الإصدار: 1.0.0
+@app.get("/metrics/startup")
+async def startup_metrics() -> Dict[str, Any]:
+    """Startup graph progress: readiness and per-step status and timings."""
+    stats = startup.stats()
+    stats["ready"] = is_ready()
+    return stats
 
-هذا البوت يساعدك في:
-• إدارة قنواتك بسهولة
-• تنظيم المحتوى
-• متابعة الإحصائيات
 
-━━━━━━━━━━━━━━━━━━━━━
-👨‍💻 **تطوير:**
-تم التطوير بواسطة فريق التطوير
+@app.get("/metrics/callbacks")
+async def callback_metrics() -> Dict[str, Any]:
+    """Per-route callback handler timings, to spot hot menus."""
+    return callback_router.stats()
 
-📅 **آخر تحديث:**
-2025-09-10
 
-━━━━━━━━━━━━━━━━━━━━━
-"""
-                    )
-                    keyboard = [[InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")]]
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=about_text,
-                        reply_markup=InlineKeyboardMarkup(keyboard),
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    await answer_cbq()
-
-                elif data == "settings":
-                    # عرض اختيار قناة لإدارة الإعدادات
-                    pool2 = await get_pool()
-                    async with pool2.connection() as conn2:
-                        async with conn2.cursor() as cur2:
-                            await cur2.execute(
-                                "SELECT channel_id, channel_title FROM channels WHERE user_id = %s ORDER BY created_at DESC",
-                                (user_id,)
-                            )
-                            rows = await cur2.fetchall()
-                    if not rows:
-                        await answer_cbq("لا توجد قنوات لإعدادها", show_alert=True)
-                    else:
-                        kb = []
-                        for cid, title in rows:
-                            display = title or f"{cid}"
-                            kb.append([InlineKeyboardButton(f"⚙️ {display}", callback_data=f"settings_channel_{cid}")])
-                        kb.append([InlineKeyboardButton("🔙 رجوع", callback_data="main_menu")])
-                        await bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=message_id,
-                            text=(
-                                """
-╭━━━━━━━━━━━━━━━━━━━━━╮
-   ⚙️ إعدادات القنوات
-╰━━━━━━━━━━━━━━━━━━━━━╯
+@app.get("/metrics/db")
+async def db_metrics() -> Dict[str, Any]:
+    """Connection pool counters and acquire wait times."""
+    return pool_stats()
 
-اختر قناة لإدارة الهيدر/الفوتر
-"""
-                            ),
-                            reply_markup=InlineKeyboardMarkup(kb),
-                            parse_mode=ParseMode.MARKDOWN,
-                        )
-                        await answer_cbq()
-                elif data.startswith("settings_channel_"):
-                    cid = int(data.split("_")[-1])
-                    kb = [
-                        [InlineKeyboardButton("🧩 الهيدر", callback_data=f"header_menu_{cid}")],
-                        [InlineKeyboardButton("🧩 الفوتر", callback_data=f"footer_menu_{cid}")],
-                        [InlineKeyboardButton("🔙 رجوع", callback_data="settings")],
-                    ]
-                    await bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=message_id,
-                        text=f"إعدادات القناة: `{cid}`\n\nاختر القسم:",
-                        reply_markup=InlineKeyboardMarkup(kb),
-                        parse_mode=ParseMode.MARKDOWN,
-                    )
-                    await answer_cbq()
-                elif data.startswith("header_menu_"):
-                    cid = int(data.split("_")[-1])
-                    await header_menu(bot, type("obj", (), {"edit_text": lambda *args, **kwargs: bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=args[0] if args else kwargs.get('text'), reply_markup=kwargs.get('reply_markup'), parse_mode=kwargs.get('parse_mode'))})(), user_id, cid)
-                    await answer_cbq()
-                elif data.startswith("footer_menu_"):
-                    cid = int(data.split("_")[-1])
-                    await footer_menu(bot, type("obj", (), {"edit_text": lambda *args, **kwargs: bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=args[0] if args else kwargs.get('text'), reply_markup=kwargs.get('reply_markup'), parse_mode=kwargs.get('parse_mode'))})(), user_id, cid)
-                    await answer_cbq()
-                elif data.startswith("header_"):
-                    await handle_header_callback(bot, type("obj", (), {"data": data, "from_user": type("u", (), {"id": user_id}), "message": type("m", (), {"edit_text": lambda *args, **kwargs: bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=args[0] if args else kwargs.get('text'), reply_markup=kwargs.get('reply_markup'), parse_mode=kwargs.get('parse_mode'))})()})())
-                elif data.startswith("footer_"):
-                    await handle_footer_callback(bot, type("obj", (), {"data": data, "from_user": type("u", (), {"id": user_id}), "message": type("m", (), {"edit_text": lambda *args, **kwargs: bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=args[0] if args else kwargs.get('text'), reply_markup=kwargs.get('reply_markup'), parse_mode=kwargs.get('parse_mode'))})()})()))
-                else:
-                    await answer_cbq()
-            except Exception as exc:  # noqa: BLE001
-                logger.exception("Callback handling error: %s", exc)
-                await answer_cbq("حدث خطأ غير متوقع", show_alert=True)
 
-    return Response(status_code=status.HTTP_200_OK)
+@app.get("/metrics/sender")
+async def sender_metrics() -> Dict[str, Any]:
+    """Outgoing send queue depth, rate-limit wait times and FloodWait count."""
+    return get_sender().stats()
 
 
-@app.get("/")
-async def health() -> Dict[str, str]:
-    return {"status": "ok"}
+@app.get("/metrics/warmup")
+async def warmup_metrics() -> Dict[str, Any]:
+    """Progress of the startup peer cache warm-up."""
+    return peer_warmup_progress
+
+
+@app.get("/metrics/polling")
+async def polling_metrics() -> Dict[str, Any]:
+    """getUpdates offset, in-flight updates and batch timings (polling mode only)."""
+    return poller.stats() if poller is not None else {"mode": "webhook"}
+
+
+@app.get("/metrics/dedup")
+async def dedup_metrics() -> Dict[str, Any]:
+    """Redelivered webhook updates acknowledged without processing."""
+    return deduplicator.stats()
 
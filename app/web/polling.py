@@ -0,0 +1,244 @@
+"""Long-polling ingestion: ``getUpdates`` batches fed through the webhook pipeline.
+
+Used when ``INGEST_MODE`` is ``polling`` (or ``auto`` without ``WEBHOOK_BASE``),
+so the app runs without a public HTTPS endpoint. Every update goes through
+the same dedup check and ``route_update`` routing as ``telegram_webhook``.
+
+Each ``getUpdates`` asks for the updates after the highest one fetched so
+far, so running handlers never make the same updates come back; passing
+that offset confirms the earlier updates to Telegram. An update the queue
+rejected (full) or whose submission failed is fetched again, since the
+next poll starts from it. On ``stop`` the oldest update that is not done
+yet is confirmed: handled, when the poller wraps the in-process queue's
+handler (``track``), or durably queued when the update queue lives in
+Redis. Updates of the last batch that were still running then come back
+after a restart; with the in-process queue, updates confirmed by an
+earlier poll are lost if the process dies before handling them.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.botapi import BotAPI
+from app.core.metrics import Histogram
+from app.core.settings import Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# نتيجة التسليم: "queued" أو "ignored" (لا يُعالج، كتحديث بلا chat) أو "rejected" (الطابور ممتلئ)
+Submit = Callable[[Dict[str, Any]], Awaitable[str]]
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def ingest_mode(settings: Settings) -> str:
+    """Resolve ``INGEST_MODE``: ``auto`` polls unless ``WEBHOOK_BASE`` is set."""
+    if settings.ingest_mode in ("webhook", "polling"):
+        return settings.ingest_mode
+    return "webhook" if settings.webhook_base else "polling"
+
+
+class UpdatePoller:
+    """Fetch updates with ``getUpdates`` and submit them in order.
+
+    ``submit`` returns ``"rejected"`` when the update queue is full, and an
+    update whose submission raises is retried up to ``max_attempts`` times;
+    in both cases the poller backs off and fetches the same update again.
+    When ``wait_for_processing`` is set, queued updates count as done only
+    once the handler wrapped by ``track`` returns; ignored ones are done at
+    once. Only ``offset`` (confirmed on ``stop``) waits for them: fetching
+    continues from ``fetch_offset`` while they run.
+    """
+
+    def __init__(
+        self,
+        api: BotAPI,
+        submit: Submit,
+        deduplicator: Any,
+        limit: int = 100,
+        timeout: int = 30,
+        allowed_updates: Optional[List[str]] = None,
+        wait_for_processing: bool = True,
+        retry_delay: float = 1.0,
+        max_attempts: int = 5,
+    ) -> None:
+        self._api = api
+        self._submit = submit
+        self._dedup = deduplicator
+        self._limit = limit
+        self._timeout = timeout
+        self._allowed_updates = allowed_updates
+        self._wait_for_processing = wait_for_processing
+        self._retry_delay = retry_delay
+        self._max_attempts = max_attempts
+        self._pending: Set[int] = set()
+        self._attempts: Dict[int, int] = {}
+        # مؤشر الجلب: بعد أعلى تحديث جُلب وسُلّم
+        self._next_offset: Optional[int] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._stopping = False
+        self._batch = Histogram()
+        self.polls = 0
+        self.updates = 0
+        self.duplicates = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        """Whether the polling task is alive (False before ``start`` and if it died)."""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def offset(self) -> Optional[int]:
+        """The offset that confirms only finished updates: the oldest update not done yet."""
+        if self._pending:
+            return min(self._pending)
+        return self._next_offset
+
+    @property
+    def fetch_offset(self) -> Optional[int]:
+        """The offset for the next ``getUpdates``: right after the last submitted update."""
+        return self._next_offset
+
+    def track(self, handler: Handler) -> Handler:
+        """Wrap the update queue's handler so finished updates release the offset."""
+        async def tracked(payload: Dict[str, Any]) -> None:
+            try:
+                await handler(payload)
+            finally:
+                self._pending.discard(payload.get("update_id"))
+
+        return tracked
+
+    async def start(self) -> None:
+        # getUpdates لا يعمل ما دام الـ webhook مضبوطاً
+        await self._api.delete_webhook(drop_pending_updates=False)
+        self._stopping = False
+        self._task = asyncio.create_task(self._loop(), name="update-poller")
+        self._task.add_done_callback(self._log_exit)
+        logger.info("Polling for updates (limit %s, timeout %ss)", self._limit, self._timeout)
+
+    def _log_exit(self, task: "asyncio.Task[None]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.critical("Update poller stopped: %r", task.exception())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # httpx قد يبتلع الإلغاء أثناء الطلب، فالحلقة تتحقق من هذا العلم أيضاً
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # تأكيد ما انتهى من التحديثات حتى لا تُعاد بعد إعادة التشغيل
+        if self.offset is not None:
+            try:
+                await self._api.get_updates(offset=self.offset, limit=1, timeout=0)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Failed to confirm polling offset %s: %s", self.offset, exc)
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                batch = await self._api.get_updates(
+                    offset=self._next_offset,
+                    limit=self._limit,
+                    timeout=self._timeout,
+                    allowed_updates=self._allowed_updates,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("getUpdates failed: %s", exc)
+                await asyncio.sleep(self._retry_delay)
+                continue
+            self.polls += 1
+            if not batch:
+                continue
+            try:
+                await self.process_batch(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                # لا يجوز أن يتوقف الاستقبال بصمت
+                logger.exception("Processing a polled batch failed: %s", exc)
+                await asyncio.sleep(self._retry_delay)
+
+    async def _submit_one(self, update: Dict[str, Any]) -> Optional[str]:
+        """Submit one fresh update; None when it failed and will be fetched again."""
+        update_id = update["update_id"]
+        if self._wait_for_processing:
+            # قبل التسليم: قد ينتهي المعالج قبل أن يعود submit
+            self._pending.add(update_id)
+        try:
+            result = await self._submit(update)
+        except asyncio.CancelledError:
+            self._pending.discard(update_id)
+            await self._dedup.forget(update_id)
+            raise
+        except Exception as exc:  # noqa: BLE001
+            self._pending.discard(update_id)
+            self.failures += 1
+            attempts = self._attempts[update_id] = self._attempts.get(update_id, 0) + 1
+            if attempts >= self._max_attempts:
+                # تحديث يفشل دائماً لا يجوز أن يحجب ما بعده إلى الأبد
+                logger.exception("Dropping update %s after %s failed attempts: %s", update_id, attempts, exc)
+                self._attempts.pop(update_id, None)
+                self.dropped += 1
+                return "ignored"
+            logger.exception("Submitting update %s failed (attempt %s): %s", update_id, attempts, exc)
+            await self._dedup.forget(update_id)
+            return None
+        self._attempts.pop(update_id, None)
+        if result == "rejected":
+            # الطابور ممتلئ: نعيد جلب نفس التحديث لاحقاً
+            self._pending.discard(update_id)
+            await self._dedup.forget(update_id)
+            return None
+        if result != "queued":
+            # لم يدخل الطابور، فلن يمر بـ track ويُعد منتهياً الآن
+            self._pending.discard(update_id)
+        return result
+
+    async def process_batch(self, batch: List[Dict[str, Any]]) -> int:
+        """Submit the fresh updates of ``batch`` in order; returns how many were new."""
+        started = time.perf_counter()
+        fresh = 0
+        for update in batch:
+            update_id = update["update_id"]
+            if await self._dedup.seen(update_id):
+                # أُعيد تسليمه (بعد إعادة التشغيل مثلاً) وقد عولج من قبل
+                self.duplicates += 1
+                self._next_offset = max(self._next_offset or 0, update_id + 1)
+                continue
+            if await self._submit_one(update) is None:
+                # الجلب التالي يبدأ من هذا التحديث فلا يُؤكد لـ Telegram قبل تسليمه
+                self._next_offset = update_id
+                await asyncio.sleep(self._retry_delay)
+                break
+            fresh += 1
+            self.updates += 1
+            self._next_offset = max(self._next_offset or 0, update_id + 1)
+        self._batch.observe(time.perf_counter() - started)
+        return fresh
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "offset": self.offset,
+            "fetch_offset": self.fetch_offset,
+            "in_flight": len(self._pending),
+            "polls": self.polls,
+            "updates": self.updates,
+            "duplicates": self.duplicates,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "batch": self._batch.snapshot(),
+        }
@@ -0,0 +1,97 @@
+"""Lean typed views over the Telegram update fields the webhook actually uses.
+
+Updates are decoded with orjson when it is installed (stdlib json otherwise)
+and mapped onto ``__slots__`` classes that copy only the handful of fields
+the handlers read, instead of walking nested dicts with repeated ``.get()``.
+The raw dict is still what goes on the update queue, since the Redis
+backend serialises payloads.
+"""
+
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+
+    def loads(raw: Union[bytes, str]) -> Any:
+        return orjson.loads(raw)
+except ImportError:  # pragma: no cover - optional speed-up
+    import json
+
+    def loads(raw: Union[bytes, str]) -> Any:
+        return json.loads(raw)
+
+from app.web.adapters import WebhookUser
+
+
+class Chat:
+    __slots__ = ("id", "type", "username", "title")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.id: Optional[int] = data.get("id")
+        self.type: Optional[str] = data.get("type")
+        self.username: Optional[str] = data.get("username")
+        self.title: Optional[str] = data.get("title")
+
+
+class IncomingMessage:
+    """A private message sent to the bot."""
+
+    __slots__ = ("message_id", "chat", "from_user", "text", "forward_from_chat")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        sender = data.get("from")
+        forwarded = data.get("forward_from_chat")
+        self.message_id: Optional[int] = data.get("message_id")
+        self.chat = Chat(data.get("chat") or {})
+        self.from_user: Optional[WebhookUser] = WebhookUser(sender) if sender else None
+        self.text: str = data.get("text") or ""
+        self.forward_from_chat: Optional[Chat] = Chat(forwarded) if forwarded else None
+
+    @property
+    def sender_id(self) -> Optional[int]:
+        """The author's id, falling back to the chat id like the Bot API does for private chats."""
+        return self.from_user.id if self.from_user is not None else self.chat.id
+
+
+class CallbackQueryRef:
+    """Just the routing fields of a ``callback_query``; handlers use ``WebhookCallbackQuery``."""
+
+    __slots__ = ("id", "data", "user_id")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.id: Optional[str] = data.get("id")
+        self.data: str = data.get("data") or ""
+        self.user_id: Optional[int] = (data.get("from") or {}).get("id")
+
+
+class ChatMemberUpdate:
+    __slots__ = ("chat", "user_id")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.chat = Chat(data.get("chat") or {})
+        self.user_id: Optional[int] = (data.get("from") or {}).get("id")
+
+
+class Update:
+    """One webhook update; only the kinds we subscribe to are mapped."""
+
+    __slots__ = ("update_id", "message", "callback_query", "my_chat_member")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        message = data.get("message")
+        callback_query = data.get("callback_query")
+        my_chat_member = data.get("my_chat_member")
+        self.update_id: Optional[int] = data.get("update_id")
+        self.message = IncomingMessage(message) if message is not None else None
+        self.callback_query = CallbackQueryRef(callback_query) if callback_query is not None else None
+        self.my_chat_member = ChatMemberUpdate(my_chat_member) if my_chat_member is not None else None
+
+
+__all__ = [
+    "loads",
+    "Chat",
+    "IncomingMessage",
+    "CallbackQueryRef",
+    "ChatMemberUpdate",
+    "Update",
+]
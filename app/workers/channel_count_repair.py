@@ -0,0 +1,55 @@
+"""
+إصلاح عمود users.channel_count إن انحرف عن العدد الفعلي في جدول channels
+
+التشغيل: python -m app.workers.channel_count_repair
+"""
+
+import asyncio
+import logging
+
+from app.core.logging_config import configure_logging
+from app.db.pool import close_pool, get_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+REPAIR_SQL = """
+UPDATE users u
+SET channel_count = actual.cnt
+FROM (
+    SELECT u2.user_id, COUNT(c.id) AS cnt
+    FROM users u2
+    LEFT JOIN channels c ON c.user_id = u2.user_id
+    GROUP BY u2.user_id
+) actual
+WHERE u.user_id = actual.user_id
+  AND u.channel_count IS DISTINCT FROM actual.cnt
+RETURNING u.user_id
+"""
+
+
+async def repair_channel_counts() -> int:
+    """Recompute every user's channel_count; returns the number of rows fixed."""
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(REPAIR_SQL)
+            fixed = cur.rowcount
+    if fixed:
+        logger.warning("Repaired channel_count for %s users", fixed)
+    else:
+        logger.info("channel_count is consistent")
+    return fixed
+
+
+async def main() -> None:
+    configure_logging()
+    try:
+        await repair_channel_counts()
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+تسخين ذاكرة الـ peers: تحليل القنوات المحفوظة التي لا يعرف البوت الـ access hash لها بعد
+
+يعمل كمهمة خلفية عند الإقلاع، أو يدوياً: python -m app.workers.peer_warmup
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from psycopg import AsyncConnection
+from pyrogram import Client, raw, utils
+from pyrogram.errors import FloodWait, RPCError
+
+from app.core.logging_config import configure_logging
+from app.core.ratelimit import TokenBucket
+from app.core.settings import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# القنوات المحفوظة التي ليس لها صف في pyrogram_peers لهذه الجلسة
+MISSING_PEERS_SQL = """
+SELECT DISTINCT c.channel_id
+FROM channels c
+WHERE NOT EXISTS (
+    SELECT 1 FROM pyrogram_peers p
+    WHERE p.session_name = %s AND p.id = c.channel_id
+)
+"""
+
+# آخر نتيجة تسخين في هذه العملية
+progress: Dict[str, Any] = {"state": "idle"}
+
+_task: Optional["asyncio.Task[Any]"] = None
+
+
+async def _get_channels(client: Client, bucket: TokenBucket, ids: List[int]) -> int:
+    """Resolve ``ids`` with one ``channels.GetChannels``; returns how many failed.
+
+    Pyrogram stores every chat in the response through ``update_peers``. A
+    batch rejected because of one bad id is split in half until the bad ids
+    are isolated.
+    """
+    while True:
+        wait = bucket.delay()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        bucket.consume()
+        try:
+            # للبوتات access_hash=0 مقبول للقنوات التي البوت عضو فيها
+            await client.invoke(
+                raw.functions.channels.GetChannels(
+                    id=[raw.types.InputChannel(channel_id=utils.get_channel_id(i), access_hash=0) for i in ids]
+                )
+            )
+            return 0
+        except FloodWait as exc:
+            logger.warning("FloodWait %ss during peer warm-up", exc.value)
+            bucket.block(float(exc.value or 1))
+        except RPCError as exc:
+            if len(ids) == 1:
+                logger.debug("Could not resolve channel %s: %s", ids[0], exc)
+                return 1
+            middle = len(ids) // 2
+            return await _get_channels(client, bucket, ids[:middle]) + await _get_channels(client, bucket, ids[middle:])
+
+
+async def warm_up_peers(client: Client) -> Dict[str, Any]:
+    """Resolve every stored channel missing from the peer cache, in rate-limited batches."""
+    settings = get_settings()
+    session_name = client.storage.name
+    bucket = TokenBucket(settings.peer_warmup_rate)
+    started = time.monotonic()
+    progress.clear()
+    progress.update(state="running", resolved=0, failed=0, batches=0)
+
+    # اتصال مستقل عن التجمع: المؤشر يبقى مفتوحاً طوال التسخين المحدود بالمعدل
+    async with await AsyncConnection.connect(settings.database_url) as conn:
+        async with conn.cursor(name="peer_warmup") as cur:
+            cur.itersize = settings.peer_warmup_batch
+            await cur.execute(MISSING_PEERS_SQL, (session_name,))
+            while True:
+                rows = await cur.fetchmany(settings.peer_warmup_batch)
+                if not rows:
+                    break
+                ids = [row[0] for row in rows]
+                failed = await _get_channels(client, bucket, ids)
+                progress["resolved"] += len(ids) - failed
+                progress["failed"] += failed
+                progress["batches"] += 1
+                logger.info(
+                    "Peer warm-up: %s resolved, %s failed after %s batches",
+                    progress["resolved"], progress["failed"], progress["batches"],
+                )
+
+    progress.update(state="done", seconds=round(time.monotonic() - started, 3))
+    logger.info("Peer warm-up finished: %s", progress)
+    return dict(progress)
+
+
+async def _run(client: Client) -> None:
+    try:
+        await warm_up_peers(client)
+    except asyncio.CancelledError:
+        progress["state"] = "cancelled"
+        raise
+    except Exception:  # noqa: BLE001
+        progress["state"] = "failed"
+        logger.exception("Peer warm-up failed")
+
+
+def start_peer_warmup(client: Client) -> None:
+    """Run the warm-up in the background when ``PEER_WARMUP`` is enabled."""
+    global _task
+    if get_settings().peer_warmup and (_task is None or _task.done()):
+        _task = asyncio.create_task(_run(client))
+
+
+async def stop_peer_warmup() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+async def main() -> None:
+    configure_logging()
+    from app.bot.client import get_bot_client
+    from app.db.migrate import run_migrations
+    from app.db.pool import close_pool
+
+    await run_migrations()
+    bot = get_bot_client()
+    await bot.start()
+    try:
+        await warm_up_peers(bot)
+    finally:
+        await bot.stop()
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Benchmark Bot API calls against a local stand-in server.
+
+Usage: python benchmarks/bot_api_transport.py [calls] [concurrency]
+
+Starts a minimal fake Bot API (uvicorn, HTTP/1.1) on localhost and times
+sendMessage three ways: a throwaway httpx.AsyncClient per call (how
+setWebhook used to be called), the shared pooled ``BotAPI`` client, and
+the same client through ``HttpTransport`` (Pyrogram markdown parsed to
+entities plus keyboard conversion). MTProto cannot be stood in for
+locally, so it is not part of this comparison.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pyrogram.enums import ParseMode  # noqa: E402
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+from app.bot.http_transport import HttpTransport  # noqa: E402
+from app.core.botapi import BotAPI  # noqa: E402
+
+TOKEN = "123:bench"
+RESPONSE = (
+    b'{"ok":true,"result":{"message_id":1,"date":1760000000,'
+    b'"chat":{"id":1,"type":"private"},"text":"ok"}}'
+)
+
+
+async def fake_bot_api(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": RESPONSE})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(label: str, call, calls: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{calls / elapsed:>10.0f} req/s{elapsed / calls * 1e3:>10.2f} ms/req")
+
+
+async def main(calls: int, concurrency: int) -> None:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(fake_bot_api, port=port, log_level="warning", access_log=False))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    params = {"chat_id": 1, "text": "hello"}
+
+    async def throwaway() -> None:
+        async with httpx.AsyncClient(timeout=10) as client:
+            (await client.post(f"{base}/bot{TOKEN}/sendMessage", json=params)).json()
+
+    api = BotAPI(TOKEN, base_url=base, http2=False)
+    transport = HttpTransport(api, client=None)
+    markup = InlineKeyboardMarkup([[InlineKeyboardButton("📡 القنوات", callback_data="channels_menu")]])
+
+    print(f"{calls} calls, concurrency {concurrency}")
+    await run("throwaway client per call", throwaway, calls, concurrency)
+    await run("shared BotAPI", lambda: api.send_message(1, "hello"), calls, concurrency)
+    await run(
+        "HttpTransport (markdown)",
+        lambda: transport.send_message(1, "**مرحباً** `123`", parse_mode=ParseMode.MARKDOWN, reply_markup=markup),
+        calls,
+        concurrency,
+    )
+
+    await api.close()
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    ))
@@ -0,0 +1,124 @@
+"""Measure long-polling ingestion throughput against a fake Bot API server.
+
+Usage: python benchmarks/polling_throughput.py [updates] [limit]
+
+A local uvicorn app answers getUpdates from a fixed backlog of text
+messages, honouring ``offset`` and ``limit`` like Telegram. ``UpdatePoller``
+feeds them through dedup into a ``MemoryUpdateQueue`` whose handler only
+yields, so the numbers cover fetch, decode, dedup, queueing and offset
+commits rather than the bot's own handlers.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.botapi import BotAPI  # noqa: E402
+from app.core.dedup import MemoryDeduplicator  # noqa: E402
+from app.core.update_queue import MemoryUpdateQueue  # noqa: E402
+from app.web.polling import UpdatePoller  # noqa: E402
+
+TOKEN = "123:bench"
+
+
+def make_backlog(count: int) -> list:
+    return [
+        {
+            "update_id": 1000 + i,
+            "message": {
+                "message_id": i,
+                "from": {"id": 1 + i % 500, "is_bot": False, "first_name": "مستخدم"},
+                "chat": {"id": 1 + i % 500, "type": "private"},
+                "date": 1760000000,
+                "text": f"رسالة {i}",
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def fake_bot_api(backlog: list):
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        params = json.loads(body or b"{}")
+        result = True
+        if scope["path"].endswith("/getUpdates"):
+            offset = params.get("offset") or 0
+            limit = params.get("limit") or 100
+            result = [u for u in backlog if u["update_id"] >= offset][:limit]
+            if not result and params.get("timeout"):
+                await asyncio.sleep(0.05)
+        payload = json.dumps({"ok": True, "result": result}).encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": payload})
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main(count: int, limit: int) -> None:
+    backlog = make_backlog(count)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(fake_bot_api(backlog), port=port, log_level="warning", access_log=False))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    handled = 0
+    finished = asyncio.Event()
+
+    async def handler(payload: dict) -> None:
+        nonlocal handled
+        await asyncio.sleep(0)
+        handled += 1
+        if handled == count:
+            finished.set()
+
+    async def submit(update: dict) -> str:
+        accepted = await queue.put(update, key=update["message"]["from"]["id"], timeout=2.0)
+        return "queued" if accepted else "rejected"
+
+    api = BotAPI(TOKEN, base_url=f"http://127.0.0.1:{port}", http2=False)
+    poller = UpdatePoller(api, submit, MemoryDeduplicator(window=count * 2), limit=limit, timeout=1)
+    queue = MemoryUpdateQueue(poller.track(handler), maxsize=limit * 10, workers=8)
+    await queue.start()
+    started = time.perf_counter()
+    await poller.start()
+    await finished.wait()
+    elapsed = time.perf_counter() - started
+    await poller.stop()
+    await queue.stop()
+
+    stats = poller.stats()
+    print(f"{count} updates, limit {limit}: {elapsed:.2f}s, {count / elapsed:.0f} updates/s, "
+          f"{stats['polls']} polls, {stats['duplicates']} re-fetched, final offset {stats['offset']}")
+    await api.close()
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+    ))
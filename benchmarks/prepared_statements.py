@@ -0,0 +1,69 @@
+"""Compare ad-hoc and prepared execution of the hot queries in app.db.queries.
+
+Usage: DATABASE_URL=postgresql://... python benchmarks/prepared_statements.py [iterations]
+
+Seeds a throwaway user with a few channels inside a transaction that is
+rolled back at the end, so it can be pointed at any migrated database.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from psycopg import AsyncConnection
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.db import queries  # noqa: E402
+
+USER_ID = -727_017
+CHANNEL_ID = -1_000_727_017
+
+
+async def timed(conn: AsyncConnection, query: str, params, iterations: int, prepare: bool) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cur = await conn.execute(query, params, prepare=prepare)
+        if cur.description:
+            await cur.fetchall()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int) -> None:
+    conn = await AsyncConnection.connect(os.environ["DATABASE_URL"], prepare_threshold=None)
+    try:
+        await conn.execute(
+            queries.UPSERT_USER,
+            {"user_id": USER_ID, "username": "bench", "first_name": None, "last_name": None, "language_code": "ar"},
+        )
+        for i in range(5):
+            await conn.execute(
+                queries.UPSERT_CHANNEL, (USER_ID, CHANNEL_ID - i, f"bench{i}", f"Bench {i}")
+            )
+        await conn.execute(
+            "INSERT INTO channel_settings (user_id, channel_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (USER_ID, CHANNEL_ID),
+        )
+        cases = [
+            ("USER_CHANNEL_COUNT", queries.USER_CHANNEL_COUNT, (USER_ID,)),
+            ("USER_STATS", queries.USER_STATS, (USER_ID,)),
+            ("USER_CHANNELS", queries.USER_CHANNELS, (USER_ID,)),
+            ("CHANNEL_SETTINGS", queries.CHANNEL_SETTINGS, (USER_ID, CHANNEL_ID)),
+            ("UPSERT_USER_AND_COUNT", queries.UPSERT_USER_AND_COUNT, {
+                "user_id": USER_ID, "username": "bench", "first_name": None,
+                "last_name": None, "language_code": "ar",
+            }),
+        ]
+        print(f"{'query':<24}{'ad-hoc us':>12}{'prepared us':>14}{'speedup':>10}")
+        for name, query, params in cases:
+            adhoc = await timed(conn, query, params, iterations, prepare=False)
+            prepared = await timed(conn, query, params, iterations, prepare=True)
+            print(f"{name:<24}{adhoc:>12.1f}{prepared:>14.1f}{adhoc / prepared:>9.2f}x")
+    finally:
+        await conn.rollback()
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,97 @@
+"""Compare the old dict-walking webhook decode with app.web.updates.
+
+Usage: python benchmarks/webhook_decoding.py [iterations]
+
+"dict" is stdlib json plus the ``.get()`` chains and per-request
+``type("obj", ...)`` stand-ins the webhook used to build; "typed" is
+``updates.loads`` plus the ``__slots__`` models. Reports time and bytes
+allocated per update for a text message and a callback query.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.web import updates  # noqa: E402
+
+MESSAGE = json.dumps({
+    "update_id": 912345678,
+    "message": {
+        "message_id": 4411,
+        "from": {"id": 123456789, "is_bot": False, "first_name": "أحمد", "last_name": "علي",
+                 "username": "ahmed", "language_code": "ar"},
+        "chat": {"id": 123456789, "first_name": "أحمد", "last_name": "علي", "username": "ahmed", "type": "private"},
+        "date": 1760000000,
+        "text": "@news_channel\nhttps://t.me/another_channel\n-1001234567890",
+    },
+}).encode()
+
+CALLBACK = json.dumps({
+    "update_id": 912345679,
+    "callback_query": {
+        "id": "4382bfdwdsb323b2d9",
+        "from": {"id": 123456789, "is_bot": False, "first_name": "أحمد", "username": "ahmed", "language_code": "ar"},
+        "message": {"message_id": 4410, "chat": {"id": 123456789, "type": "private"}, "date": 1760000000, "text": "..."},
+        "chat_instance": "-8807416283474316046",
+        "data": "channels_menu",
+    },
+}).encode()
+
+
+def dict_path(raw: bytes) -> tuple:
+    update = json.loads(raw)
+    message = update.get("message")
+    if message is not None:
+        chat_id = (message.get("chat") or {}).get("id")
+        from_user = message.get("from") or {}
+        text = message.get("text", "") or ""
+        sender_id = from_user.get("id", chat_id)
+        obj = type("obj", (), {"from_user": type("u", (), {"id": sender_id}), "text": text})()
+        return update.get("update_id"), sender_id, obj
+    callback_query = update.get("callback_query")
+    if callback_query is not None:
+        data = callback_query.get("data", "") or ""
+        user_id = (callback_query.get("from") or {}).get("id")
+        return update.get("update_id"), user_id, data
+    return None, None, None
+
+
+def typed_path(raw: bytes) -> tuple:
+    update = updates.Update(updates.loads(raw))
+    if update.message is not None:
+        return update.update_id, update.message.sender_id, update.message
+    if update.callback_query is not None:
+        return update.update_id, update.callback_query.user_id, update.callback_query.data
+    return None, None, None
+
+
+def measure(fn, raw: bytes, iterations: int) -> tuple:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(raw)
+    elapsed = (time.perf_counter() - started) / iterations * 1e6
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    fn(raw)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(iterations: int) -> None:
+    print("json backend:", "orjson" if hasattr(updates, "orjson") else "stdlib json")
+    print(f"{'update':<10}{'path':<8}{'us/update':>12}{'peak bytes':>12}")
+    for name, raw in (("message", MESSAGE), ("callback", CALLBACK)):
+        for label, fn in (("dict", dict_path), ("typed", typed_path)):
+            elapsed, peak = measure(fn, raw, iterations)
+            print(f"{name:<10}{label:<8}{elapsed:>12.2f}{peak:>12}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,187 @@
+"""
+اختبارات طابور المهام الخلفية: الترتيب لكل مفتاح والتوازي والأولويات والضغط العكسي
+"""
+
+import asyncio
+
+from app.core.background import PRIORITY_BULK, PRIORITY_HIGH, PRIORITY_NORMAL, BackgroundTaskQueue
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def test_jobs_of_one_key_run_in_order():
+    async def run():
+        queue = BackgroundTaskQueue(workers=4)
+        order = []
+        running = 0
+        overlap = False
+
+        def job(i):
+            async def go():
+                nonlocal running, overlap
+                running += 1
+                overlap = overlap or running > 1
+                # المهام الأولى أبطأ، فأي تنفيذ متوازٍ كان سيقلب الترتيب
+                await asyncio.sleep(0.02 if i < 3 else 0)
+                order.append(i)
+                running -= 1
+
+            return go
+
+        for i in range(10):
+            assert queue.enqueue(job(i), key=42)
+        await queue.start()
+        try:
+            await _wait_for(lambda: len(order) == 10)
+            assert order == list(range(10))
+            assert not overlap
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_different_keys_run_in_parallel():
+    async def run():
+        queue = BackgroundTaskQueue(workers=3)
+        release = asyncio.Event()
+        started = []
+        finished = []
+
+        def job(key):
+            async def go():
+                started.append(key)
+                await release.wait()
+                finished.append(key)
+
+            return go
+
+        await queue.start()
+        try:
+            for key in (1, 2, 3):
+                queue.enqueue(job(key), key=key)
+            # مهمة ثانية للمفتاح 1 تنتظر انتهاء الأولى
+            queue.enqueue(job("1b"), key=1)
+            await _wait_for(lambda: len(started) == 3)
+            assert sorted(started) == [1, 2, 3]
+            release.set()
+            await _wait_for(lambda: len(finished) == 4)
+            assert finished.index(1) < finished.index("1b")
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_slow_key_does_not_block_other_keys():
+    async def run():
+        queue = BackgroundTaskQueue(workers=2)
+        release = asyncio.Event()
+        done = []
+
+        async def slow():
+            await release.wait()
+            done.append("slow")
+
+        def fast(i):
+            async def go():
+                done.append(i)
+
+            return go
+
+        await queue.start()
+        try:
+            queue.enqueue(slow, key="a")
+            queue.enqueue(fast("a2"), key="a")
+            for i in range(5):
+                queue.enqueue(fast(i), key="b")
+            await _wait_for(lambda: len(done) == 5)
+            assert done == [0, 1, 2, 3, 4]
+            release.set()
+            await _wait_for(lambda: len(done) == 7)
+            assert done[5:] == ["slow", "a2"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_higher_priority_runs_first():
+    async def run():
+        queue = BackgroundTaskQueue(workers=1)
+        order = []
+
+        def job(name):
+            async def go():
+                order.append(name)
+
+            return go
+
+        queue.enqueue(job("bulk"), key=1, priority=PRIORITY_BULK)
+        queue.enqueue(job("normal"), key=2, priority=PRIORITY_NORMAL)
+        queue.enqueue(job("high"), key=3, priority=PRIORITY_HIGH)
+        # مهمة عالية الأولوية لمفتاح ينتظر مهمة منخفضة تتقدمها أيضاً
+        queue.enqueue(job("bulk-1b"), key=1, priority=PRIORITY_BULK)
+        queue.enqueue(job("high-1"), key=1, priority=PRIORITY_HIGH)
+        await queue.start()
+        try:
+            await _wait_for(lambda: len(order) == 5)
+            assert order[:2] == ["high", "high-1"] or order[:2] == ["high-1", "high"]
+            assert order[2] == "normal"
+            assert order[3:] == ["bulk", "bulk-1b"]
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_full_priority_level_rejects():
+    async def run():
+        queue = BackgroundTaskQueue(maxsize=2, workers=1)
+
+        async def noop():
+            pass
+
+        assert queue.enqueue(noop, priority=PRIORITY_BULK)
+        assert queue.enqueue(noop, priority=PRIORITY_BULK)
+        assert not queue.enqueue(noop, priority=PRIORITY_BULK)
+        # لكل مستوى سعته، فامتلاء المهام الكبيرة لا يحجب العالية
+        assert queue.enqueue(noop, priority=PRIORITY_HIGH)
+        assert queue.qsize() == 3
+        assert not await queue.put(noop, priority=PRIORITY_BULK, timeout=0)
+        assert not await queue.put(noop, priority=PRIORITY_BULK, timeout=0.05)
+        assert queue.qsize() == 3
+
+    asyncio.run(run())
+
+
+def test_put_waits_for_capacity():
+    async def run():
+        queue = BackgroundTaskQueue(maxsize=1, workers=1)
+        done = []
+
+        def job(i):
+            async def go():
+                done.append(i)
+
+            return go
+
+        assert queue.enqueue(job(0), key=1)
+        waiter = asyncio.create_task(queue.put(job(1), key=1, timeout=2.0))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        await queue.start()
+        try:
+            assert await waiter
+            await _wait_for(lambda: len(done) == 2)
+            assert done == [0, 1]
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+"""
+اختبار عدم ظهور توكن البوت في السجلات
+"""
+
+import asyncio
+import io
+import logging
+
+import httpx
+
+from app.core import logging_config
+from app.core.botapi import BotAPI
+
+TOKEN = "123456:SECRET-token_value"
+
+
+def test_bot_token_never_reaches_the_logs(monkeypatch):
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved = (root.handlers[:], root.level, {n: logging.getLogger(n).level for n in ("httpx", "httpcore")})
+    root.handlers = []
+    monkeypatch.setattr(logging_config.sys, "stdout", stream)
+    try:
+        logging_config.configure_logging()
+
+        def respond(request):
+            if request.url.path.endswith("/getMe"):
+                return httpx.Response(200, json={"ok": True, "result": {"id": 123456}})
+            return httpx.Response(500, text="gateway error")
+
+        async def run():
+            api = BotAPI(TOKEN, http2=False, transport=httpx.MockTransport(respond))
+            try:
+                await api.call("getMe")
+                try:
+                    await api.call("getUpdates")
+                except Exception:  # noqa: BLE001
+                    logging.getLogger("test").exception("getUpdates failed")
+                # حتى رسالة تحمل العنوان الكامل صراحةً تُخفى
+                logging.getLogger("test").warning("Calling %s", api._url + "sendMessage")
+            finally:
+                await api.close()
+
+        asyncio.run(run())
+    finally:
+        root.handlers, level, levels = saved
+        root.setLevel(level)
+        for name, value in levels.items():
+            logging.getLogger(name).setLevel(value)
+
+    output = stream.getvalue()
+    assert "getUpdates failed" in output
+    assert "bot<redacted>/sendMessage" in output
+    assert "SECRET" not in output
+    assert TOKEN not in output
@@ -0,0 +1,198 @@
+"""
+اختبارات استقبال التحديثات عبر getUpdates مع Bot API وهمي يحاكي دلالات offset
+"""
+
+import asyncio
+
+from app.core.dedup import MemoryDeduplicator
+from app.web.polling import UpdatePoller
+
+
+class FakeBotAPI:
+    """``getUpdates`` like Telegram: passing ``offset`` confirms (forgets) every update below it."""
+
+    def __init__(self, update_ids=()) -> None:
+        self.updates = [{"update_id": i} for i in update_ids]
+        self.calls = []
+
+    def add(self, *update_ids):
+        self.updates.extend({"update_id": i} for i in update_ids)
+
+    async def delete_webhook(self, drop_pending_updates=False):
+        return True
+
+    async def get_updates(self, offset=None, limit=100, timeout=0, allowed_updates=None):
+        self.calls.append((offset, limit))
+        if offset is not None:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            await asyncio.sleep(0.01)
+        return self.updates[:limit]
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def _poller(api, submit, **kwargs):
+    kwargs.setdefault("retry_delay", 0.01)
+    return UpdatePoller(api, submit, MemoryDeduplicator(window=1000), limit=10, timeout=1, **kwargs)
+
+
+def test_updates_are_submitted_in_order_without_refetching():
+    async def run():
+        api = FakeBotAPI(range(1, 26))
+        submitted = []
+
+        async def submit(update):
+            submitted.append(update["update_id"])
+            return "queued"
+
+        poller = _poller(api, submit, wait_for_processing=False)
+        await poller.start()
+        await _wait_for(lambda: len(submitted) == 25)
+        api.add(26, 27)
+        await _wait_for(lambda: len(submitted) == 27)
+        await poller.stop()
+
+        assert submitted == list(range(1, 28))
+        assert poller.duplicates == 0
+        offsets = [offset for offset, _ in api.calls if offset is not None]
+        assert offsets == sorted(offsets)
+        # تأكيد الإيقاف يشمل كل ما عولج
+        assert api.calls[-1] == (28, 1)
+
+    asyncio.run(run())
+
+
+def test_slow_update_does_not_hold_back_fetching():
+    async def run():
+        api = FakeBotAPI(range(1, 6))
+        release = asyncio.Event()
+        handled = []
+        tasks = set()
+
+        async def handler(payload):
+            if payload["update_id"] == 2:
+                await release.wait()
+            handled.append(payload["update_id"])
+
+        async def submit(update):
+            task = asyncio.create_task(tracked(update))
+            tasks.add(task)
+            return "queued"
+
+        poller = _poller(api, submit)
+        tracked = poller.track(handler)
+        await poller.start()
+        await _wait_for(lambda: len(handled) == 4)
+        api.add(*range(6, 16))
+        await _wait_for(lambda: len(handled) == 14)
+        assert 2 not in handled
+        # لا يُعاد جلب شيء رغم أن التحديث 2 ما زال قيد المعالجة
+        assert poller.duplicates == 0
+        assert poller.offset == 2
+        assert poller.fetch_offset == 16
+        assert poller.stats()["in_flight"] == 1
+
+        release.set()
+        await _wait_for(lambda: len(handled) == 15)
+        assert poller.offset == 16
+        await poller.stop()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_stop_confirms_the_oldest_unfinished_update():
+    async def run():
+        api = FakeBotAPI(range(1, 6))
+        release = asyncio.Event()
+        tasks = set()
+
+        async def handler(payload):
+            if payload["update_id"] >= 3:
+                await release.wait()
+
+        async def submit(update):
+            tasks.add(asyncio.create_task(tracked(update)))
+            return "queued"
+
+        poller = _poller(api, submit)
+        tracked = poller.track(handler)
+        await poller.start()
+        await _wait_for(lambda: poller.fetch_offset == 6)
+        await poller.stop()
+        assert api.calls[-1] == (3, 1)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_rejected_update_is_fetched_again():
+    async def run():
+        api = FakeBotAPI(range(1, 6))
+        submitted = []
+        rejected = []
+
+        async def submit(update):
+            if update["update_id"] == 3 and not rejected:
+                rejected.append(3)
+                return "rejected"
+            submitted.append(update["update_id"])
+            return "queued"
+
+        poller = _poller(api, submit, wait_for_processing=False)
+        await poller.start()
+        await _wait_for(lambda: len(submitted) == 5)
+        await poller.stop()
+
+        assert submitted == [1, 2, 3, 4, 5]
+        # الجلب بعد الرفض يبدأ من التحديث المرفوض فلا يُؤكد قبل تسليمه
+        assert (3, 10) in api.calls
+        assert poller.duplicates == 0
+
+    asyncio.run(run())
+
+
+def test_failing_submission_is_retried_then_dropped():
+    async def run():
+        api = FakeBotAPI(range(1, 4))
+        submitted = []
+
+        async def submit(update):
+            if update["update_id"] == 2:
+                raise RuntimeError("boom")
+            submitted.append(update["update_id"])
+            return "queued"
+
+        poller = _poller(api, submit, wait_for_processing=False, max_attempts=3)
+        await poller.start()
+        await _wait_for(lambda: submitted == [1, 3])
+        assert poller.running
+        await poller.stop()
+        assert poller.failures == 3
+        assert poller.dropped == 1
+
+    asyncio.run(run())
+
+
+def test_ignored_updates_do_not_hold_the_offset():
+    async def run():
+        api = FakeBotAPI(range(1, 4))
+
+        async def submit(update):
+            return "ignored"
+
+        poller = _poller(api, submit)
+        await poller.start()
+        await _wait_for(lambda: poller.fetch_offset == 4)
+        assert poller.offset == 4
+        await poller.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,167 @@
+"""
+اختبارات جدولة الإرسال بساعة وهمية: حدود المعدل وFloodWait ودمج التعديلات
+"""
+
+import asyncio
+import heapq
+import itertools
+
+from pyrogram.errors import FloodWait
+
+from app.bot.sender import SendScheduler
+
+
+class FakeClock:
+    """Virtual time: ``sleep`` parks the caller until ``run`` advances the clock to its deadline."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self._sleepers = []
+        self._order = itertools.count()
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + max(delay, 0.0), next(self._order), future))
+        await future
+
+    async def run(self, *coros):
+        tasks = [asyncio.ensure_future(c) for c in coros]
+        while True:
+            # نترك كل المهام تتقدم حتى تتوقف عند sleep أو تنتهي
+            for _ in range(20):
+                await asyncio.sleep(0)
+            if all(task.done() for task in tasks):
+                return [task.result() for task in tasks]
+            assert self._sleepers, "tasks are blocked on something other than the clock"
+            wake_at, _, future = heapq.heappop(self._sleepers)
+            self.now = max(self.now, wake_at)
+            future.set_result(None)
+
+
+class FakeClient:
+    def __init__(self, clock: FakeClock, flood_waits=()) -> None:
+        self.clock = clock
+        self.calls = []
+        self._flood_waits = list(flood_waits)
+
+    async def _record(self, method, **kwargs):
+        self.calls.append((self.clock.now, method, kwargs))
+        if self._flood_waits:
+            raise FloodWait(value=self._flood_waits.pop(0))
+        return len(self.calls)
+
+    async def send_message(self, **kwargs):
+        return await self._record("send_message", **kwargs)
+
+    async def edit_message_text(self, **kwargs):
+        return await self._record("edit_message_text", **kwargs)
+
+
+def _scheduler(clock, client=None, **kwargs):
+    client = client or FakeClient(clock)
+    return SendScheduler(client, clock=clock, sleep=clock.sleep, **kwargs), client
+
+
+def _times(client, method="send_message"):
+    return [at for at, name, _ in client.calls if name == method]
+
+
+def test_private_chat_rate():
+    async def run():
+        clock = FakeClock()
+        sender, client = _scheduler(clock, chat_rate=1.0)
+        await clock.run(*(sender.send_message(7, f"m{i}") for i in range(3)))
+        assert _times(client) == [0.0, 1.0, 2.0]
+        # الترتيب داخل المحادثة محفوظ
+        assert [kw["text"] for _, _, kw in client.calls] == ["m0", "m1", "m2"]
+
+    asyncio.run(run())
+
+
+def test_group_rate():
+    async def run():
+        clock = FakeClock()
+        sender, client = _scheduler(clock, group_rate=20 / 60)
+        await clock.run(*(sender.send_message(-100123, f"m{i}") for i in range(3)))
+        assert _times(client) == [0.0, 3.0, 6.0]
+
+    asyncio.run(run())
+
+
+def test_global_rate_across_chats():
+    async def run():
+        clock = FakeClock()
+        sender, client = _scheduler(clock, global_rate=2.0, chat_rate=1.0)
+        await clock.run(*(sender.send_message(chat_id, "hi") for chat_id in range(1, 5)))
+        assert _times(client) == [0.0, 0.0, 0.5, 1.0]
+
+    asyncio.run(run())
+
+
+def test_flood_wait_reschedules_the_chat():
+    async def run():
+        clock = FakeClock()
+        client = FakeClient(clock, flood_waits=[5])
+        sender, _ = _scheduler(clock, client, chat_rate=1.0, global_rate=30.0)
+        result, other = await clock.run(sender.send_message(7, "blocked"), sender.send_message(8, "free"))
+        times = [(at, kw["chat_id"]) for at, _, kw in client.calls]
+        # المحادثة المحجوبة تُعاد بعد 5 ثوانٍ، والمحادثات الأخرى لا تتأثر
+        assert times == [(0.0, 7), (0.0, 8), (5.0, 7)]
+        assert result == 3 and other == 2
+        assert sender.flood_waits == 1
+
+    asyncio.run(run())
+
+
+def test_flood_wait_gives_up_after_max_retries():
+    async def run():
+        clock = FakeClock()
+        client = FakeClient(clock, flood_waits=[1, 1])
+        sender, _ = _scheduler(clock, client, max_retries=1)
+        try:
+            await clock.run(sender.send_message(7, "x"))
+        except FloodWait:
+            pass
+        else:
+            raise AssertionError("FloodWait was not raised")
+        assert len(client.calls) == 2
+
+    asyncio.run(run())
+
+
+def test_edits_of_one_message_are_coalesced():
+    async def run():
+        clock = FakeClock()
+        sender, client = _scheduler(clock, chat_rate=1.0)
+        results = await clock.run(
+            sender.send_message(7, "first"),
+            *(sender.edit_message_text(7, 42, f"v{i}") for i in range(4)),
+        )
+        edits = [(at, kw["text"]) for at, name, kw in client.calls if name == "edit_message_text"]
+        # أول تعديل ينتظر الدور، وما يصل أثناء انتظاره يستبدل محتواه
+        assert edits == [(1.0, "v3")]
+        assert len(set(results[1:])) == 1
+        assert sender.coalesced_edits == 3
+
+    asyncio.run(run())
+
+
+def test_chat_slot_outlives_its_ttl_while_callers_wait():
+    async def run():
+        clock = FakeClock()
+        sender, client = _scheduler(clock, chat_rate=0.01)
+
+        async def late():
+            # بعد انقضاء مدة الدلو لو حُسبت دون احتساب المنتظرين
+            await clock.sleep(170)
+            await sender.send_message(7, "late")
+
+        await clock.run(*(sender.send_message(7, f"m{i}") for i in range(3)), late())
+        assert [kw["text"] for _, _, kw in client.calls] == ["m0", "m1", "m2", "late"]
+        assert _times(client) == [0.0, 100.0, 200.0, 300.0]
+        assert not sender._active
+
+    asyncio.run(run())
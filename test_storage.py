@@ -0,0 +1,98 @@
+"""
+اختبارات تخزين الـ peers في Postgres؛ تُتخطى إن لم تتوفر قاعدة بيانات عبر DATABASE_URL
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("psycopg")
+
+from app.bot.storage import PostgresStorage  # noqa: E402
+from app.core.settings import get_settings  # noqa: E402
+from app.db.migrate import run_migrations  # noqa: E402
+from app.db.pool import close_pool, get_pool  # noqa: E402
+
+SESSION = "test-storage"
+PEER = (-1001234567890, 987654321, "channel", "news_channel", None)
+
+
+def _run(scenario):
+    if not os.getenv("DATABASE_URL", "").startswith(("postgres://", "postgresql://")):
+        pytest.skip("DATABASE_URL does not point to Postgres")
+
+    get_settings.cache_clear()
+
+    async def run():
+        try:
+            await run_migrations()
+        except Exception as exc:  # noqa: BLE001
+            await close_pool()
+            pytest.skip(f"database unavailable: {exc}")
+        pool = await get_pool()
+        storage = PostgresStorage(SESSION)
+        try:
+            await storage.open()
+            await scenario(storage, pool)
+        finally:
+            async with pool.connection() as conn:
+                await conn.execute("DELETE FROM pyrogram_sessions WHERE name = %s", (SESSION,))
+            await close_pool()
+
+    asyncio.run(run())
+
+
+async def _age_peer(pool, hours):
+    async with pool.connection() as conn:
+        await conn.execute(
+            "UPDATE pyrogram_peers SET last_update_on = NOW() - make_interval(hours => %s) "
+            "WHERE session_name = %s AND id = %s",
+            (hours, SESSION, PEER[0]),
+        )
+
+
+async def _last_update_age(pool):
+    async with pool.connection() as conn:
+        cur = await conn.execute(
+            "SELECT EXTRACT(EPOCH FROM NOW() - last_update_on) FROM pyrogram_peers "
+            "WHERE session_name = %s AND id = %s",
+            (SESSION, PEER[0]),
+        )
+        return float((await cur.fetchone())[0])
+
+
+def test_username_lookup_after_ttl_when_peer_is_still_seen():
+    async def scenario(storage, pool):
+        await storage.update_peers([PEER])
+        await _age_peer(pool, 9)
+        # تحميل الـ peer من القاعدة بوقته القديم، كما بعد إعادة التشغيل
+        storage._peers.clear()
+        await storage.get_peer_by_id(PEER[0])
+        with pytest.raises(KeyError):
+            await storage.get_peer_by_username("news_channel")
+
+        # Pyrogram يرى القناة من جديد دون أي تغيير فيها
+        await storage.update_peers([PEER])
+        assert await _last_update_age(pool) < 60
+        peer = await storage.get_peer_by_username("news_channel")
+        assert peer.channel_id == 1234567890
+
+    _run(scenario)
+
+
+def test_unchanged_peer_is_touched_at_most_once_per_interval():
+    async def scenario(storage, pool):
+        await storage.update_peers([PEER])
+        await _age_peer(pool, 2)
+        # الذاكرة تعرف أنه كُتب للتو، فلا كتابة جديدة قبل مرور TOUCH_INTERVAL
+        await storage.update_peers([PEER])
+        assert await _last_update_age(pool) > 3600
+
+        entry = storage._peers.get(PEER[0])
+        storage._peers.set(PEER[0], (entry[0], time.time() - storage.TOUCH_INTERVAL - 1))
+        await storage.update_peers([PEER])
+        assert await _last_update_age(pool) < 60
+
+    _run(scenario)
@@ -0,0 +1,164 @@
+"""
+اختبارات طابور التحديثات على Redis Streams باستخدام fakeredis داخل العملية
+"""
+
+import asyncio
+
+from fakeredis import aioredis
+
+from app.core.update_queue import RedisStreamQueue
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        result = predicate()
+        if asyncio.iscoroutine(result):
+            result = await result
+        if result:
+            return
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+def _queue(handler, redis, **kwargs):
+    return RedisStreamQueue(handler, redis, consumer="test", block=0, claim_idle=0.05, **kwargs)
+
+
+async def _pending(redis, stream="updates:1"):
+    return (await redis.xpending(stream, "workers"))["pending"]
+
+
+def test_acks_after_success():
+    async def run():
+        redis = aioredis.FakeRedis()
+        handled = []
+
+        async def handler(payload):
+            handled.append(payload["update_id"])
+
+        queue = _queue(handler, redis)
+        await queue.start()
+        try:
+            assert await queue.put({"update_id": 1}, key=7)
+            assert await queue.put({"update_id": 2}, key=7)
+            await _wait_for(lambda: len(handled) == 2)
+            await asyncio.sleep(0.05)
+            assert handled == [1, 2]
+            assert await _pending(redis) == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_failed_update_is_redelivered():
+    async def run():
+        redis = aioredis.FakeRedis()
+        attempts = []
+
+        async def handler(payload):
+            attempts.append(payload["update_id"])
+            if len(attempts) == 1:
+                raise RuntimeError("boom")
+
+        queue = _queue(handler, redis)
+        await queue.start()
+        try:
+            assert await queue.put({"update_id": 1})
+            await _wait_for(lambda: len(attempts) == 1)
+            await asyncio.sleep(0.05)
+            assert await _pending(redis) == 1
+            await _wait_for(lambda: len(attempts) == 2)
+            await asyncio.sleep(0.05)
+            assert await _pending(redis) == 0
+            assert await redis.xlen("updates:dead") == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_dead_letters_after_max_deliveries():
+    async def run():
+        redis = aioredis.FakeRedis()
+        attempts = []
+
+        async def handler(payload):
+            attempts.append(payload["update_id"])
+            raise RuntimeError("boom")
+
+        queue = _queue(handler, redis, max_deliveries=2)
+        await queue.start()
+        try:
+            assert await queue.put({"update_id": 1})
+            await _wait_for(lambda: redis.xlen("updates:dead"))
+            assert await _pending(redis) == 0
+            (_, fields), = await redis.xrange("updates:dead")
+            assert fields[b"stream"] == b"updates:1"
+            assert int(fields[b"deliveries"]) == 2
+            assert len(attempts) == 2
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_reclaims_more_than_one_batch_of_stale_entries():
+    async def run():
+        redis = aioredis.FakeRedis()
+        handled = []
+
+        async def handler(payload):
+            handled.append(payload["update_id"])
+
+        # مستهلك آخر قرأ التحديثات ثم توقف دون تأكيدها
+        await redis.xgroup_create("updates:1", "workers", id="0", mkstream=True)
+        for update_id in range(7):
+            await redis.xadd("updates:1", {"payload": '{"update_id": %d}' % update_id, "key": ""})
+        await redis.xreadgroup("workers", "crashed", {"updates:1": ">"}, count=10)
+        await asyncio.sleep(0.1)
+
+        queue = _queue(handler, redis, batch=2)
+        await queue.start()
+        try:
+            # جولة استرداد واحدة (كل ثانية) تكفي لكل الصفحات
+            await _wait_for(lambda: len(handled) == 7, timeout=1.8)
+            await asyncio.sleep(0.05)
+            assert sorted(handled) == list(range(7))
+            assert await _pending(redis) == 0
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_dead_letters_past_the_first_page():
+    async def run():
+        redis = aioredis.FakeRedis()
+        handled = []
+
+        async def handler(payload):
+            handled.append(payload["update_id"])
+
+        await redis.xgroup_create("updates:1", "workers", id="0", mkstream=True)
+        for update_id in range(5):
+            await redis.xadd("updates:1", {"payload": '{"update_id": %d}' % update_id, "key": ""})
+        # الصفحة الأولى تسليم واحد فقط، والأخير استنفد محاولاته
+        await redis.xreadgroup("workers", "crashed", {"updates:1": ">"}, count=10)
+        last_id = (await redis.xrange("updates:1"))[-1][0]
+        for _ in range(2):
+            await redis.xclaim("updates:1", "workers", "crashed", 0, [last_id])
+        await asyncio.sleep(0.1)
+
+        queue = _queue(handler, redis, batch=2, max_deliveries=3)
+        await queue.start()
+        try:
+            await _wait_for(lambda: redis.xlen("updates:dead"), timeout=1.8)
+            await _wait_for(lambda: len(handled) == 4)
+            assert sorted(handled) == [0, 1, 2, 3]
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())